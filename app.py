@@ -1,16 +1,19 @@
+import click
 from flask import Flask, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 from config import Config
+from utils.partitions import include_object as partition_include_object
 
-import random
-from datetime import datetime, timedelta
-from faker import Faker
+# CATATAN: Jangan import library berat (pandas, scikit-learn, faker) di level modul.
+# Library tersebut di-import di dalam fungsi analitik/seeder agar worker yang hanya
+# melayani POS tidak ikut menanggung waktu boot & memorinya.
 
 # Inisialisasi Extension di luar fungsi create_app agar bisa diimport
 db = SQLAlchemy()
-migrate = Migrate()
+# include_object: partisi transaksi PostgreSQL tidak dianggap perubahan skema saat autogenerate
+migrate = Migrate(include_object=partition_include_object)
 login_manager = LoginManager()
 
 def create_app(config_class=Config):
@@ -23,6 +26,10 @@ def create_app(config_class=Config):
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Silakan login untuk mengakses halaman ini.'
+
+    # Instrumentasi latensi & query SQL per endpoint (hanya aktif jika METRICS_ENABLED)
+    from utils.metrics import init_metrics
+    init_metrics(app, db)
     
     # --- 1. SETUP FILTER TEMPLATE (FORMAT RUPIAH) ---
     @app.template_filter('rp')
@@ -58,7 +65,7 @@ def create_app(config_class=Config):
     from models.product import Product
     from models.transaction import Transaction, TransactionItem
     from models.analytics import CustomerSegment, CustomerSegmentMembership, Promotion
-    from models.settings import AppSetting
+    from models.settings import AppSetting, DomainVersion
     
     @login_manager.user_loader
     def load_user(user_id):
@@ -115,12 +122,145 @@ def create_app(config_class=Config):
     
     # --- 5. CLI COMMAND: SEED DB ---
     @app.cli.command("seed-db")
-    def seed_db_command():
-        """Isi database dengan data dummy, jalankan K-Means, dan buat promosi."""
-        from utils.seeder import run_seeding
+    @click.option('--customers', type=click.IntRange(min=1), default=None,
+                  help='Mode bulk: jumlah pelanggan yang dibangkitkan.')
+    @click.option('--transactions', type=click.IntRange(min=1), default=None,
+                  help='Mode bulk: jumlah transaksi (default 10x jumlah pelanggan).')
+    @click.option('--seed', type=int, default=42, show_default=True,
+                  help='Seed random agar dataset bisa direproduksi.')
+    def seed_db_command(customers, transactions, seed):
+        """Isi database dengan data dummy, jalankan K-Means, dan buat promosi.
+
+        Tanpa opsi: data contoh standar (~1000 pelanggan).
+        Dengan --customers/--transactions: mode bulk cepat untuk dataset load-test.
+        """
         # `db` sudah diinisialisasi di scope luar create_app, jadi bisa di-pass
-        run_seeding(db)
+        if customers is None and transactions is None:
+            from utils.seeder import run_seeding
+            run_seeding(db)
+            return
+
+        from utils.seeder import run_bulk_seeding
+        n_customers = customers or 1000
+        run_bulk_seeding(db, n_customers=n_customers,
+                         n_transactions=transactions or n_customers * 10, seed=seed)
+
+    # --- 6. CLI COMMAND: SEGMENTASI SKOR RFM (untuk cron/scheduler) ---
+    @app.cli.command("segment-rfm")
+    @click.option('--bins', type=click.IntRange(min=3, max=10), default=5, show_default=True,
+                  help='Jumlah kuantil per dimensi R/F/M (minimal 3 agar keempat segmen bisa terisi).')
+    def segment_rfm_command(bins):
+        """Perbarui segmen pelanggan dengan skor kuantil RFM (cukup ringan untuk dijalankan tiap jam)."""
+        import time
+        from utils.segmentation import run_rfm_segmentation
+        from utils.feature_store import export_run_features
+
+        start = time.perf_counter()
+        result = run_rfm_segmentation(db, n_bins=bins)
+        if result is None:
+            print("⚠️  Tidak ada transaksi, segmentasi dilewati.")
+            return
+        run, written = result
+        db.session.commit()
+        export_run_features(db, run)
+        print(f"✅ {run.customer_count:,} pelanggan disegmentasi ke {run.n_clusters} segmen "
+              f"dalam {time.perf_counter() - start:.1f} detik (run #{run.id}).")
+        print(f"   Membership: {written['inserted']:,} ditambah, {written['deleted']:,} dihapus, "
+              f"{written['unchanged']:,} tetap.")
+
+    # --- 7. CLI COMMAND: BACKTEST SEGMENTASI PER AKHIR BULAN ---
+    @app.cli.command("rfm-backtest")
+    @click.option('--months', type=click.IntRange(min=1), default=12, show_default=True,
+                  help='Jumlah akhir bulan terakhir yang dianalisis.')
+    @click.option('--engine', type=click.Choice(['kmeans', 'rfm']), default='kmeans', show_default=True,
+                  help='Engine segmentasi di setiap titik waktu.')
+    @click.option('--clusters', type=click.IntRange(min=2), default=3, show_default=True,
+                  help='Jumlah cluster (hanya untuk engine kmeans).')
+    @click.option('--top', type=click.IntRange(min=1), default=5, show_default=True,
+                  help='Jumlah perpindahan segmen terbesar yang ditampilkan per bulan.')
+    def rfm_backtest_command(months, engine, clusters, top):
+        """Segmentasi ulang di setiap akhir bulan dan tampilkan perpindahan pelanggan antar segmen."""
+        from datetime import datetime
+        from utils.rfm_backtest import month_ends, run_backtest
+
+        # `months` akhir bulan terakhir yang sudah lewat
+        now = datetime.now()
+        start = datetime(now.year - months // 12 - 1, now.month, 1)
+        cutoffs = [cutoff for cutoff in month_ends(start, now) if cutoff <= now][-months:]
+
+        periods = run_backtest(cutoffs, engine=engine, n_clusters=clusters)
+        if not periods:
+            print("⚠️  Tidak ada transaksi untuk di-backtest.")
+            return
+
+        for period in periods:
+            segments = ', '.join(f"{name}: {count:,}" for name, count in sorted(period['segments'].items()))
+            print(f"📅 {period['as_of']:%Y-%m-%d}  {period['customers']:,} pelanggan  [{segments}]")
+            moves = sorted(period['transitions'].items(), key=lambda item: -item[1])[:top]
+            if moves:
+                print(f"    tetap di segmen yang sama: {period['stayed']:,}")
+            for (source, target), count in moves:
+                print(f"    {source} → {target}: {count:,}")
+
+
+    # --- 8. CLI COMMAND: INDEX PRODUK YANG SERING DIBELI BERSAMA ---
+    @app.cli.command("refresh-associations")
+    @click.option('--full', is_flag=True, default=False,
+                  help='Bangun ulang dari seluruh riwayat (default: hanya transaksi baru).')
+    def refresh_associations_command(full):
+        """Perbarui index co-occurrence produk untuk saran "sering dibeli bersama" di POS."""
+        import time
+        from utils.product_associations import refresh_associations
+
+        start = time.perf_counter()
+        build = refresh_associations(db, full=full)
+        if build is None:
+            print("✅ Tidak ada transaksi baru, index sudah terbaru.")
+            return
+        db.session.commit()
+        mode = 'penuh' if build.full_rebuild else 'inkremental'
+        print(f"✅ Refresh {mode}: {build.transaction_count:,} transaksi diproses, "
+              f"{build.product_count:,} produk diperbarui dalam {time.perf_counter() - start:.1f} detik "
+              f"(s/d transaksi #{build.last_transaction_id}).")
+
+    # --- 9. CLI COMMAND: BELANJAAN BIASA PER PELANGGAN ---
+    @app.cli.command("refresh-baskets")
+    def refresh_baskets_command():
+        """Hitung ulang belanjaan biasa tiap pelanggan untuk isi keranjang sekali klik di POS."""
+        import time
+        from utils.usual_basket import refresh_usual_baskets
+
+        start = time.perf_counter()
+        result = refresh_usual_baskets(db)
+        db.session.commit()
+        print(f"✅ {result['customers']:,} pelanggan punya belanjaan biasa, {result['updated']:,} baris diperbarui "
+              f"dalam {time.perf_counter() - start:.1f} detik.")
+
+    # --- 10. CLI COMMAND: PARTISI BULANAN TRANSAKSI (PostgreSQL, untuk cron bulanan) ---
+    @app.cli.command("create-partitions")
+    @click.option('--months', type=click.IntRange(min=0), default=None,
+                  help='Jumlah bulan ke depan yang disiapkan (default 3).')
+    @click.option('--since', type=click.DateTime(formats=['%Y-%m']), default=None,
+                  help='Bulan awal YYYY-MM, mis. sebelum mengimpor transaksi lama (default: bulan ini).')
+    def create_partitions_command(months, since):
+        """Buat partisi bulanan transactions/transaction_items yang belum ada."""
+        from utils.partitions import (DEFAULT_MONTHS_AHEAD, default_partition_rows,
+                                      ensure_partitions, is_partitioned)
 
+        if not is_partitioned(db):
+            print("ℹ️  Tabel transaksi tidak terpartisi (bukan PostgreSQL atau migrasi belum dijalankan).")
+            return
+        created = ensure_partitions(db, months_ahead=DEFAULT_MONTHS_AHEAD if months is None else months,
+                                    since=since.date() if since else None)
+        db.session.commit()
+        if not created:
+            print("✅ Semua partisi sudah ada.")
+        for month, moved in created:
+            note = f" ({moved:,} transaksi dipindahkan dari partisi default)" if moved else ""
+            print(f"✅ Partisi {month:%Y-%m} dibuat{note}.")
+        leftover = default_partition_rows(db)
+        if leftover:
+            print(f"⚠️  {leftover:,} transaksi masih di partisi default; jalankan dengan --since (bulan lama) atau --months (bulan jauh ke depan).")
 
     return app
 
@@ -0,0 +1,152 @@
+"""
+Benchmark uang Decimal (kolom Numeric(12, 2), perilaku lama) vs rupiah utuh (BIGINT + int).
+
+Dua jalur panas diukur dengan data sintetis, tanpa database aplikasi:
+  - checkout : hitung subtotal item + diskon persentase untuk banyak keranjang
+               (Decimal(str(price)) per item + quantize vs int + utils.money.percent_of)
+  - laporan  : omset harian (GROUP BY tanggal, SUM) dan fetch total per transaksi lewat
+               SQLAlchemy, dari tabel Numeric(12, 2) vs BigInteger di database yang sama
+
+Penggunaan:
+    python benchmark_money.py                                  # SQLite in-memory
+    python benchmark_money.py --transactions 500000
+    python benchmark_money.py --database-url postgresql://...  # tabel sementara bench_money_*
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import (BigInteger, Column, DateTime, Integer, MetaData, Numeric, Table,
+                        create_engine, func, select)
+
+from utils.money import money_sum, percent_of, to_basis_points
+
+RUNS = 5
+CART_ITEMS = 8
+CENT = Decimal('0.01')
+
+
+def best_of(fn):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+# --- Checkout ---
+
+def checkout_decimal(carts, percent):
+    value = Decimal(str(percent))
+    for cart in carts:
+        total = Decimal('0')
+        for price, qty in cart:
+            total += Decimal(str(price)) * qty
+        discount = min(total * (value / 100), total).quantize(CENT, rounding=ROUND_HALF_UP)
+        total - discount
+
+
+def checkout_int(carts, percent):
+    basis_points = to_basis_points(percent)
+    for cart in carts:
+        total = 0
+        for price, qty in cart:
+            total += price * qty
+        discount = min(percent_of(total, basis_points), total)
+        total - discount
+
+
+def bench_checkout(n_carts):
+    rng = random.Random(42)
+    carts = [[(rng.randint(10, 500) * 100, rng.randint(1, 3)) for _ in range(CART_ITEMS)]
+             for _ in range(n_carts)]
+    decimal_carts = [[(Decimal(price), qty) for price, qty in cart] for cart in carts]
+    return (best_of(lambda: checkout_decimal(decimal_carts, 12.5)),
+            best_of(lambda: checkout_int(carts, 12.5)))
+
+
+# --- Laporan ---
+
+def build_tables(engine, n_transactions):
+    metadata = MetaData()
+    tables = {
+        kind: Table(
+            f'bench_money_{kind}', metadata,
+            Column('id', Integer, primary_key=True),
+            Column('created_at', DateTime, nullable=False),
+            Column('total_amount', column_type, nullable=False),
+            Column('discount_amount', column_type, nullable=False)
+        )
+        for kind, column_type in (('numeric', Numeric(12, 2)), ('bigint', BigInteger))
+    }
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    rng = random.Random(7)
+    start = datetime(2025, 1, 1)
+    rows = []
+    for i in range(n_transactions):
+        gross = rng.randint(10, 2000) * 100
+        discount = percent_of(gross, 1000) if rng.random() < 0.3 else 0
+        rows.append({
+            'id': i + 1,
+            'created_at': start + timedelta(minutes=rng.randint(0, 60 * 24 * 365)),
+            'total_amount': gross - discount,
+            'discount_amount': discount
+        })
+    with engine.begin() as conn:
+        for table in tables.values():
+            conn.execute(table.insert(), rows)
+    return metadata, tables
+
+
+def report_queries(engine, table, summed):
+    tx_date = func.date(table.c.created_at)
+    daily = select(tx_date, func.count(table.c.id), summed(table.c.total_amount))\
+        .group_by(tx_date).order_by(tx_date)
+    detail = select(table.c.id, table.c.total_amount + table.c.discount_amount,
+                    table.c.discount_amount, table.c.total_amount)
+
+    def run():
+        with engine.connect() as conn:
+            conn.execute(daily).all()
+            for _ in conn.execution_options(yield_per=2000).execute(detail):
+                pass
+    return run
+
+
+def bench_report(engine, n_transactions):
+    metadata, tables = build_tables(engine, n_transactions)
+    try:
+        before = best_of(report_queries(engine, tables['numeric'], func.sum))
+        after = best_of(report_queries(engine, tables['bigint'], money_sum))
+    finally:
+        metadata.drop_all(engine)
+    return before, after
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', default='sqlite://')
+    parser.add_argument('--transactions', type=int, default=200000)
+    parser.add_argument('--carts', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"⏱️  Checkout: {args.carts} keranjang x {CART_ITEMS} item, diskon 12,5% (best of {RUNS})...")
+    checkout = bench_checkout(args.carts)
+    print(f"⏱️  Laporan: {args.transactions} transaksi di {args.database_url.split(':')[0]} (best of {RUNS})...")
+    report = bench_report(create_engine(args.database_url), args.transactions)
+
+    print("=" * 70)
+    print(f"{'Jalur':<28}{'Decimal (ms)':>14}{'Integer (ms)':>14}{'Speed-up':>12}")
+    print("-" * 70)
+    for label, (before, after) in (('Checkout (pricing)', checkout), ('Laporan (omset + detail)', report)):
+        print(f"{label:<28}{before * 1000:>14.0f}{after * 1000:>14.0f}{before / after:>11.1f}x")
+    print("-" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark waktu import & memori (RSS) satu worker saat boot.
+
+Setiap skenario dijalankan di proses Python baru (seperti worker gunicorn baru):
+  - lazy  : hanya `import app` (perilaku saat ini)
+  - eager : `import app` + pandas, scikit-learn, faker (perilaku lama, import di level modul)
+
+Penggunaan:
+    python benchmark_startup.py            # tampilkan perbandingan
+    python benchmark_startup.py --check    # guard: gagal jika `import app` memuat library berat
+"""
+import json
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ('pandas', 'sklearn', 'faker')
+RUNS = 5
+
+# Kode yang dijalankan di proses anak. RSS dibaca dari /proc (Linux) atau resource (fallback).
+PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+import app
+if {eager}:
+    import pandas, sklearn.cluster, sklearn.preprocessing, sklearn.metrics, faker
+elapsed = time.perf_counter() - start
+
+rss_kb = None
+try:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                rss_kb = int(line.split()[1])
+except OSError:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss_kb //= 1024
+
+heavy = sorted(m for m in {heavy} if m in sys.modules)
+print(json.dumps({{'seconds': elapsed, 'rss_kb': rss_kb, 'heavy_loaded': heavy}}))
+"""
+
+
+def run_probe(eager):
+    env = dict(os.environ)
+    # create_app() butuh URI database; engine tidak tersambung saat import
+    env.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+    env.setdefault('SECRET_KEY', 'benchmark')
+    code = PROBE.format(eager=eager, heavy=HEAVY_MODULES)
+    output = subprocess.check_output(
+        [sys.executable, '-c', code], env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def summarize(eager):
+    results = [run_probe(eager) for _ in range(RUNS)]
+    seconds = sorted(r['seconds'] for r in results)
+    rss = sorted(r['rss_kb'] for r in results)
+    return {
+        'median_seconds': seconds[len(seconds) // 2],
+        'median_rss_mb': rss[len(rss) // 2] / 1024,
+        'heavy_loaded': results[0]['heavy_loaded']
+    }
+
+
+def main():
+    if '--check' in sys.argv:
+        loaded = run_probe(eager=False)['heavy_loaded']
+        if loaded:
+            print(f"❌ `import app` memuat library berat: {', '.join(loaded)}")
+            sys.exit(1)
+        print("✅ `import app` tidak memuat pandas, sklearn, maupun faker.")
+        return
+
+    print(f"⏱️  Mengukur startup worker ({RUNS}x per skenario)...")
+    lazy = summarize(eager=False)
+    eager = summarize(eager=True)
+
+    print("=" * 70)
+    print(f"{'Skenario':<28}{'Import (ms)':>14}{'RSS (MB)':>12}  Library berat")
+    print("-" * 70)
+    for label, res in (('Eager (sebelum)', eager), ('Lazy (sesudah)', lazy)):
+        print(f"{label:<28}{res['median_seconds'] * 1000:>14.0f}{res['median_rss_mb']:>12.1f}  "
+              f"{', '.join(res['heavy_loaded']) or '-'}")
+    print("-" * 70)
+    print(f"Hemat per worker: {(eager['median_seconds'] - lazy['median_seconds']) * 1000:.0f} ms, "
+          f"{eager['median_rss_mb'] - lazy['median_rss_mb']:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
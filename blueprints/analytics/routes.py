@@ -3,28 +3,27 @@ from flask_login import login_required
 from blueprints.analytics import bp
 from models.customer import Customer
 from models.transaction import Transaction, TransactionItem
-from models.analytics import CustomerSegment, CustomerSegmentMembership, Promotion
+from models.product import ProductAssociation, ProductAssociationBuild
+from models.analytics import CustomerSegment, CustomerSegmentMembership, Promotion, SegmentationRun, SegmentStatistic
 from app import db
 from datetime import datetime
-import pandas as pd
 from utils.decorators import admin_required
-from sqlalchemy import func, desc
+from utils.http_cache import conditional_response
+from utils.segment_stats import RFM_METRICS, segment_rfm_query, segment_summary_rows, latest_segment_statistics, latest_run, segment_discount_total
+from utils.segmentation import persist_segmentation, run_rfm_segmentation
+from utils.feature_store import export_run_features, load_latest_features
+from utils.feature_builder import EXTRA_FEATURES, CATEGORY_SHARES, resolve_feature_columns
+from utils.money import money_sum
+from utils.pagination import paginate
+from sqlalchemy import func, desc, and_
 from sqlalchemy.orm import joinedload
-from decimal import Decimal
 
 @bp.route('/')
 @admin_required
 @login_required
 def dashboard():
-    segments_data = db.session.query(
-        CustomerSegment,
-        func.count(CustomerSegmentMembership.id).label('member_count')
-    ).outerjoin(
-        CustomerSegmentMembership, CustomerSegment.id == CustomerSegmentMembership.segment_id
-    ).group_by(CustomerSegment.id).all()
-    
     segment_stats = []
-    for segment, count in segments_data:
+    for segment, count in _segment_member_counts():
         segment_stats.append({
             'id': segment.id,
             'name': segment.segment_name,
@@ -35,6 +34,28 @@ def dashboard():
     
     return render_template('analytics/dashboard.html', segment_stats=segment_stats)
 
+def _segment_member_counts():
+    """
+    (segment, jumlah member) per segmen. Dibaca dari snapshot run segmentasi terakhir;
+    query COUNT ke tabel membership hanya dipakai jika belum pernah ada run.
+    """
+    run_id = db.session.query(func.max(SegmentationRun.id)).scalar()
+    if run_id is not None:
+        return db.session.query(
+            CustomerSegment,
+            func.coalesce(SegmentStatistic.customer_count, 0)
+        ).outerjoin(
+            SegmentStatistic, and_(SegmentStatistic.segment_id == CustomerSegment.id,
+                                   SegmentStatistic.run_id == run_id)
+        ).order_by(CustomerSegment.id).all()
+
+    return db.session.query(
+        CustomerSegment,
+        func.count(CustomerSegmentMembership.id).label('member_count')
+    ).outerjoin(
+        CustomerSegmentMembership, CustomerSegment.id == CustomerSegmentMembership.segment_id
+    ).group_by(CustomerSegment.id).all()
+
 @bp.route('/segment/<int:id>')
 @admin_required
 @login_required
@@ -45,7 +66,10 @@ def segment_detail(id):
     customers_query = db.session.query(Customer).join(CustomerSegmentMembership).filter(
         CustomerSegmentMembership.segment_id == id
     )
-    customers = customers_query.paginate(page=page, per_page=20, error_out=False)
+    # Snapshot run terakhir: jumlah anggota (total paginasi) dan total diskon tanpa COUNT/SUM seluruh riwayat
+    segment_stat = (latest_segment_statistics(db) or {}).get(id)
+    customers = paginate(customers_query, page, 20,
+                         total=segment_stat.customer_count if segment_stat is not None else None)
     
     discount_history = (
         db.session.query(Transaction)
@@ -60,19 +84,24 @@ def segment_detail(id):
         .all()
     )
         
-    total_discount_given = (
-        db.session.query(func.sum(Transaction.discount_amount))
-        .join(Customer, Transaction.customer_id == Customer.id)
-        .join(CustomerSegmentMembership, Customer.id == CustomerSegmentMembership.customer_id)
-        .filter(CustomerSegmentMembership.segment_id == id)
-        .scalar() or 0
-    )
+    # Total diskon: snapshot run terakhir + transaksi sesudah run tersebut
+    if segment_stat is not None:
+        total_discount_given = segment_discount_total(db, segment_stat)
+    else:
+        total_discount_given = (
+            db.session.query(money_sum(Transaction.discount_amount))
+            .join(Customer, Transaction.customer_id == Customer.id)
+            .join(CustomerSegmentMembership, Customer.id == CustomerSegmentMembership.customer_id)
+            .filter(CustomerSegmentMembership.segment_id == id)
+            .scalar()
+        )
 
     return render_template('analytics/segment_detail.html', 
                           segment=segment, 
                           customers=customers,
                           discount_history=discount_history,
-                          total_discount_given=total_discount_given)
+                          total_discount_given=total_discount_given,
+                          segment_stat=segment_stat)
 
 @bp.route('/run_kmeans', methods=['GET', 'POST'])
 @admin_required
@@ -84,7 +113,8 @@ def run_kmeans():
         try:
             from utils.kmeans_service import KMeansService
             
-            kmeans_service = KMeansService(n_clusters=n_clusters)
+            feature_columns = resolve_feature_columns(db, request.form.getlist('features'))
+            kmeans_service = KMeansService(n_clusters=n_clusters, feature_columns=feature_columns)
             rfm_df, score = kmeans_service.analyze()
 
             if rfm_df is None or rfm_df.empty:
@@ -97,8 +127,6 @@ def run_kmeans():
             
             flash(flash_message, 'success')
             
-            CustomerSegmentMembership.query.delete()
-            
             existing_segments = CustomerSegment.query.filter(
                 CustomerSegment.segment_name != 'New Customer'
             ).order_by(CustomerSegment.id).all()
@@ -113,7 +141,8 @@ def run_kmeans():
             
             default_colors = ['#28a745', '#007bff', '#ffc107', '#6c757d', '#17a2b8']
             
-            new_customer_segment_id = None
+            segment_by_label = {}
+            centroids = {}
 
             for i in range(n_clusters):
                 cluster_data = rfm_df[rfm_df['cluster_sorted'] == i]
@@ -155,48 +184,21 @@ def run_kmeans():
                             
                     db.session.flush()
                 
-                if segment.segment_name == 'New Customer':
-                    new_customer_segment_id = segment.id
-
-                memberships = []
-                for _, row in cluster_data.iterrows():
-                    memberships.append({
-                        'customer_id': row['customer_id'],
-                        'segment_id': segment.id
-                    })
-                
-                if memberships:
-                    db.session.bulk_insert_mappings(CustomerSegmentMembership, memberships)
-            
-            analyzed_customer_ids = rfm_df['customer_id'].tolist()
-            new_customers_q = db.session.query(Customer.id).filter(
-                ~Customer.id.in_(analyzed_customer_ids)
-            ).all()
-            
-            if new_customers_q:
-                target_segment_id = None
-                
-                if new_customer_segment_id:
-                    target_segment_id = new_customer_segment_id
-                else:
-                    zero_segment_name = 'New Customer'
-                    zero_segment = CustomerSegment.query.filter_by(segment_name=zero_segment_name).first()
-                    
-                    if not zero_segment:
-                        zero_segment = CustomerSegment(
-                            segment_name=zero_segment_name, 
-                            description="Pelanggan yang belum pernah melakukan transaksi",
-                            color="#17a2b8"
-                        )
-                        db.session.add(zero_segment)
-                        db.session.flush()
-                    
-                    target_segment_id = zero_segment.id
-                
-                zero_memberships = [{'customer_id': c.id, 'segment_id': target_segment_id} for c in new_customers_q]
-                db.session.bulk_insert_mappings(CustomerSegmentMembership, zero_memberships)
+                if i in kmeans_service.centroids:
+                    centroids[segment.id] = kmeans_service.centroids[i]
 
+                segment_by_label[i] = segment.id
+            
+            # Simpan membership + pelanggan baru + snapshot statistik (jalur bersama semua engine)
+            run, written = persist_segmentation(
+                db, rfm_df['customer_id'].values, rfm_df['cluster_sorted'].values, segment_by_label,
+                'kmeans', n_clusters=n_clusters, score=score, centroids=centroids,
+                feature_columns=feature_columns
+            )
             db.session.commit()
+            export_run_features(db, run)
+            flash(f"Membership diperbarui: {written['inserted']} ditambah, {written['deleted']} dihapus, "
+                  f"{written['unchanged']} tetap.", 'info')
             return redirect(url_for('analytics.dashboard'))
         
         except Exception as e:
@@ -206,85 +208,111 @@ def run_kmeans():
             flash(f'Terjadi kesalahan: {str(e)}', 'danger')
             return redirect(url_for('analytics.dashboard'))
     
-    return render_template('analytics/run_kmeans.html')
+    return render_template('analytics/run_kmeans.html',
+                           extra_features=EXTRA_FEATURES,
+                           category_shares=CATEGORY_SHARES)
+
+@bp.route('/run_rfm', methods=['POST'])
+@admin_required
+@login_required
+def run_rfm():
+    """Segmentasi cepat dengan skor kuantil RFM (tanpa K-Means), bisa juga lewat `flask segment-rfm`."""
+    try:
+        result = run_rfm_segmentation(db)
+        if result is None:
+            flash('Data tidak cukup untuk analisis atau tidak ada transaksi.', 'warning')
+            return redirect(url_for('analytics.dashboard'))
+
+        run, written = result
+        db.session.commit()
+        export_run_features(db, run)
+        flash(f'Segmentasi skor RFM selesai. {run.customer_count} pelanggan dikelompokkan '
+              f"ke {run.n_clusters} segmen ({written['inserted'] + written['deleted']} baris membership berubah).",
+              'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Terjadi kesalahan: {str(e)}', 'danger')
+
+    return redirect(url_for('analytics.dashboard'))
 
 @bp.route('/kmeans-results')
 @admin_required
 @login_required
 def kmeans_results():
-    raw_data = (
-        db.session.query(
-            CustomerSegment.segment_name,
-            CustomerSegment.color,
-            Customer.id.label('customer_id'),
-            Customer.name.label('customer_name'),
-            func.count(Transaction.id).label('frequency'),
-            func.coalesce(func.sum(Transaction.total_amount), 0).label('monetary'),
-            func.max(Transaction.created_at).label('last_purchase')
+    # Ringkasan statistik dihitung langsung di SQL (GROUP BY segmen).
+    # Tabel per pelanggan tidak dirender di sini, tapi diambil DataTables
+    # secara server-side dari api_kmeans_results (paginated).
+    summary_stats = _segment_summary_stats(datetime.now())
+    return render_template('analytics/kmeans_results.html', summary_stats=summary_stats)
+
+# Kolom yang bisa diurutkan DataTables (index kolom di tabel -> ekspresi SQL)
+KMEANS_RESULT_COLUMNS = ['customer_id', 'customer_name', 'recency', 'frequency', 'monetary', 'segment_name']
+
+@bp.route('/api/kmeans-results')
+@admin_required
+@login_required
+def api_kmeans_results():
+    """API DataTables (server-side processing) untuk tabel detail hasil K-Means."""
+    draw = request.args.get('draw', 0, type=int)
+    start = max(request.args.get('start', 0, type=int), 0)
+    length = min(max(request.args.get('length', 25, type=int), 1), 500)
+    search_value = request.args.get('search[value]', '').strip()
+    order_column = request.args.get('order[0][column]', 0, type=int)
+    order_dir = request.args.get('order[0][dir]', 'asc')
+
+    base = segment_rfm_query(db, datetime.now()).subquery()
+
+    records_total = db.session.query(func.count()).select_from(CustomerSegmentMembership).scalar()
+
+    query = db.session.query(base)
+    if search_value:
+        query = query.filter(
+            base.c.customer_name.ilike(f'%{search_value}%') |
+            base.c.segment_name.ilike(f'%{search_value}%')
         )
-        .select_from(CustomerSegmentMembership)
-        .join(CustomerSegment, CustomerSegmentMembership.segment_id == CustomerSegment.id)
-        .join(Customer, CustomerSegmentMembership.customer_id == Customer.id)
-        .outerjoin(Transaction, Customer.id == Transaction.customer_id)
-        .group_by(CustomerSegmentMembership.customer_id, CustomerSegment.id, CustomerSegment.segment_name, CustomerSegment.color, Customer.id, Customer.name)
-        .all()
-    )
+        records_filtered = query.order_by(None).count()
+    else:
+        records_filtered = records_total
 
-    summary_stats = []
-    results_list = []
+    column_name = KMEANS_RESULT_COLUMNS[order_column] if 0 <= order_column < len(KMEANS_RESULT_COLUMNS) else 'customer_id'
+    sort_column = base.c[column_name]
+    query = query.order_by(sort_column.desc() if order_dir == 'desc' else sort_column.asc(), base.c.customer_id)
 
-    if raw_data:
-        df = pd.DataFrame(raw_data)
-        now = pd.Timestamp.now()
-        df['recency'] = (now - pd.to_datetime(df['last_purchase'])).dt.days
-        
-        summary_df = df.groupby(['segment_name', 'color']).agg(
-            customer_count=('customer_id', 'count'),
-            avg_recency=('recency', 'mean'),
-            min_recency=('recency', 'min'),
-            max_recency=('recency', 'max'),
-            std_recency=('recency', 'std'),
-            avg_frequency=('frequency', 'mean'),
-            min_frequency=('frequency', 'min'),
-            max_frequency=('frequency', 'max'),
-            std_frequency=('frequency', 'std'),
-            avg_monetary=('monetary', 'mean'),
-            min_monetary=('monetary', 'min'),
-            max_monetary=('monetary', 'max'),
-            std_monetary=('monetary', 'std')
-        ).reset_index()
-        
-        summary_df.columns = [col[0] if isinstance(col, tuple) else col for col in summary_df.columns]
-        
-        for _, row in summary_df.iterrows():
-            std_recency = row.get('std_recency', 0)
-            std_frequency = row.get('std_frequency', 0)
-            std_monetary = row.get('std_monetary', 0)
-
-            summary_stats.append({
-                'segment_name': row['segment_name'],
-                'color': row['color'],
-                'count': row['customer_count'],
-                'avg_recency': row['avg_recency'] if not pd.isna(row['avg_recency']) else -1,
-                'min_recency': row['min_recency'] if not pd.isna(row['min_recency']) else -1,
-                'max_recency': row['max_recency'] if not pd.isna(row['max_recency']) else -1,
-                'std_recency': std_recency if not pd.isna(std_recency) else 0,
-                'avg_frequency': row['avg_frequency'],
-                'min_frequency': row['min_frequency'],
-                'max_frequency': row['max_frequency'],
-                'std_frequency': std_frequency if not pd.isna(std_frequency) else 0,
-                'avg_monetary': row['avg_monetary'],
-                'min_monetary': row['min_monetary'],
-                'max_monetary': row['max_monetary'],
-                'std_monetary': std_monetary if not pd.isna(std_monetary) else 0,
-            })
-            
-        df['recency'] = df['recency'].fillna(-1)
-        results_list = df.to_dict('records')
+    data = []
+    for row in query.offset(start).limit(length).all():
+        data.append({
+            'customer_id': row.customer_id,
+            'customer_name': row.customer_name,
+            'recency': row.recency if row.recency is not None else -1,
+            'frequency': row.frequency,
+            'monetary': float(row.monetary or 0),
+            'segment_name': row.segment_name,
+            'color': row.color
+        })
+
+    return jsonify({
+        'draw': draw,
+        'recordsTotal': records_total,
+        'recordsFiltered': records_filtered,
+        'data': data
+    })
+
+def _segment_summary_stats(now):
+    """Statistik RFM (count, avg, min, max, std) per segmen dalam satu query agregat."""
+    summary_stats = []
+    for item in segment_summary_rows(db, now):
+        stat = {'segment_name': item['segment_name'], 'color': item['color'], 'count': item['count']}
+        for metric in RFM_METRICS:
+            if item[metric] is None:
+                # Segmen tanpa transaksi (mis. New Customer): recency tidak terdefinisi
+                stat.update({f'avg_{metric}': -1, f'min_{metric}': -1, f'max_{metric}': -1, f'std_{metric}': 0})
+                continue
+            mean, min_val, max_val, std = item[metric]
+            stat.update({f'avg_{metric}': mean, f'min_{metric}': min_val,
+                         f'max_{metric}': max_val, f'std_{metric}': std})
+        summary_stats.append(stat)
 
-    return render_template('analytics/kmeans_results.html', 
-                          results=results_list, 
-                          summary_stats=summary_stats)
+    return summary_stats
 
 @bp.route('/reset-data', methods=['POST'])
 @admin_required
@@ -292,9 +320,13 @@ def kmeans_results():
 def reset_data():
     """Endpoint untuk mereset semua data transaksional dan pelanggan."""
     try:
+        db.session.query(ProductAssociation).delete()
+        db.session.query(ProductAssociationBuild).delete()
         db.session.query(TransactionItem).delete()
         db.session.query(Transaction).delete()
         db.session.query(CustomerSegmentMembership).delete()
+        db.session.query(SegmentStatistic).delete()
+        db.session.query(SegmentationRun).delete()
         db.session.query(Promotion).delete()
         db.session.query(CustomerSegment).delete()
         db.session.query(Customer).delete()
@@ -314,13 +346,13 @@ def sales_comparison():
     """Halaman untuk membandingkan omset sebelum dan sesudah sistem diskon."""
     discount_system_start_date = datetime(2025, 5, 1)
 
-    turnover_before = db.session.query(func.sum(Transaction.total_amount))\
+    turnover_before = db.session.query(money_sum(Transaction.total_amount))\
         .filter(Transaction.created_at < discount_system_start_date)\
-        .scalar() or Decimal('0')
+        .scalar()
 
-    turnover_after = db.session.query(func.sum(Transaction.total_amount))\
+    turnover_after = db.session.query(money_sum(Transaction.total_amount))\
         .filter(Transaction.created_at >= discount_system_start_date)\
-        .scalar() or Decimal('0')
+        .scalar()
 
     percentage_increase = 0
     if turnover_before > 0:
@@ -337,21 +369,14 @@ def sales_comparison():
 
 @bp.route('/api/segment-data')
 @login_required
+@conditional_response('segments')
 def api_segment_data():
     """API untuk Chart.js: Pie Chart Distribusi Segmen"""
-    data = db.session.query(
-        CustomerSegment.segment_name,
-        CustomerSegment.color,
-        func.count(CustomerSegmentMembership.id)
-    ).outerjoin(
-        CustomerSegmentMembership, CustomerSegment.id == CustomerSegmentMembership.segment_id
-    ).group_by(CustomerSegment.id).all()
-    
     results = []
-    for name, color, count in data:
+    for segment, count in _segment_member_counts():
         results.append({
-            'name': name,
-            'color': color,
+            'name': segment.segment_name,
+            'color': segment.color,
             'count': count
         })
         
@@ -359,49 +384,143 @@ def api_segment_data():
 
 @bp.route('/api/rfm-data')
 @login_required
+@conditional_response('segments', key=lambda: _rfm_etag_key())
 def api_rfm_data():
-    """API untuk Chart.js: Bubble Chart Sebaran RFM"""
-    # Query Data: Join Customer -> Membership -> Segment -> Transaction
-    # Kita butuh agregat per customer
-    
-    # Subquery untuk Recency, Frequency, Monetary per Customer
-    rfm_subquery = db.session.query(
-        Transaction.customer_id,
-        func.count(Transaction.id).label('frequency'),
-        func.sum(Transaction.total_amount).label('monetary'),
-        func.max(Transaction.created_at).label('last_purchase')
-    ).group_by(Transaction.customer_id).subquery()
-    
-    # Main Query gabung dengan Segmen
-    query = db.session.query(
-        Customer.id,
-        Customer.name,
-        rfm_subquery.c.frequency,
-        rfm_subquery.c.monetary,
-        rfm_subquery.c.last_purchase,
-        CustomerSegment.segment_name,
-        CustomerSegment.color
-    ).join(
-        rfm_subquery, Customer.id == rfm_subquery.c.customer_id
-    ).join(
-        CustomerSegmentMembership, Customer.id == CustomerSegmentMembership.customer_id
-    ).join(
-        CustomerSegment, CustomerSegmentMembership.segment_id == CustomerSegment.id
-    ).all()
-    
-    results = []
-    now = datetime.now()
-    
-    for row in query:
-        recency_days = (now - row.last_purchase).days
-        results.append({
-            'customer_id': row.id,
-            'name': row.name,
-            'frequency': row.frequency,
-            'monetary': float(row.monetary) if row.monetary else 0,
-            'recency': recency_days,
-            'segment_name': row.segment_name,
-            'color': row.color
+    """
+    API untuk Chart.js: Bubble Chart Sebaran RFM.
+    Tidak lagi mengirim semua pelanggan: per segmen dikirim histogram 2D
+    (frequency x monetary, dengan rata-rata recency per sel) plus sampel titik
+    terstratifikasi yang jumlah totalnya dibatasi `max_points`.
+    ETag dari versi domain segmen + tanggal (recency bergeser harian) + penanda transaksi
+    jika data dihitung langsung (lihat _rfm_etag_key), jadi reload dashboard dijawab 304
+    sebelum query agregat berjalan.
+    """
+    max_points = min(max(request.args.get('max_points', 1500, type=int), 100), 5000)
+    bins = min(max(request.args.get('bins', 20, type=int), 5), 50)
+
+    # Data diambil dari matriks fitur run terakhir (file .npy, mmap) jika tersedia;
+    # query agregat langsung hanya dipakai jika feature store belum ada.
+    features = load_latest_features(latest_run())
+    return jsonify(_build_rfm_payload(datetime.now(), max_points, bins, features))
+
+def _rfm_etag_key():
+    """
+    Bagian ETag api_rfm_data di luar versi domain. File feature store tetap selama run yang sama;
+    tanpa file, payload dihitung dari transaksi, jadi ID transaksi terakhir ikut agar penjualan
+    baru tidak dijawab 304 yang basi.
+    """
+    today = datetime.now().date()
+    if load_latest_features(latest_run()) is not None:
+        return today
+    return f'{today}|tx:{db.session.query(func.max(Transaction.id)).scalar()}'
+
+def _rfm_arrays(now, features):
+    """
+    Array RFM per pelanggan (hanya yang punya transaksi), urut segment_id lalu customer_id.
+    Mengembalikan (customer_ids, segment_ids, frequency, monetary, recency, names);
+    `names` berisi dict customer_id -> nama untuk jalur query langsung, None untuk jalur feature store.
+    """
+    import numpy as np
+
+    if features is not None:
+        matrix = features['features']
+        valid = ~np.isnan(matrix[:, 0])
+        return (np.asarray(features['customer_id'])[valid], np.asarray(features['segment_id'])[valid],
+                matrix[valid, 1], matrix[valid, 2], matrix[valid, 0], None)
+
+    base = segment_rfm_query(db, now).subquery()
+    rows = db.session.query(base.c.customer_id, base.c.customer_name, base.c.segment_id,
+                            base.c.frequency, base.c.monetary, base.c.recency)\
+        .filter(base.c.recency.isnot(None))\
+        .order_by(base.c.segment_id, base.c.customer_id)\
+        .all()
+
+    return (np.array([r.customer_id for r in rows], dtype=np.int64),
+            np.array([r.segment_id for r in rows], dtype=np.int64),
+            np.array([r.frequency for r in rows], dtype=float),
+            np.array([float(r.monetary or 0) for r in rows]),
+            np.array([r.recency for r in rows], dtype=float),
+            {r.customer_id: r.customer_name for r in rows})
+
+def _build_rfm_payload(now, max_points, bins, features=None):
+    import numpy as np  # Lazy import: hanya dibutuhkan di endpoint analitik
+
+    customer_ids, segment_ids, frequency, monetary, recency, names = _rfm_arrays(now, features)
+
+    payload = {'total_customers': int(len(customer_ids)), 'max_points': max_points, 'segments': []}
+    if not len(customer_ids):
+        return payload
+
+    segment_info = {s.id: s for s in db.session.query(
+        CustomerSegment.id, CustomerSegment.segment_name, CustomerSegment.color)}
+
+    # Tepi bin global agar histogram antar segmen sebanding
+    freq_edges = np.linspace(0, max(frequency.max(), 1), bins + 1)
+    monetary_edges = np.linspace(0, max(monetary.max(), 1), bins + 1)
+    freq_centers = (freq_edges[:-1] + freq_edges[1:]) / 2
+    monetary_centers = (monetary_edges[:-1] + monetary_edges[1:]) / 2
+    payload['bins'] = {'frequency_edges': freq_edges.round(2).tolist(),
+                       'monetary_edges': monetary_edges.round(0).tolist()}
+
+    # Seed tetap: data sama -> sampel sama, konsisten dengan ETag
+    rng = np.random.default_rng(0)
+    total = len(customer_ids)
+    sampled = []
+
+    for segment_id in np.unique(segment_ids):
+        idx = np.flatnonzero(segment_ids == segment_id)
+        info = segment_info.get(int(segment_id))
+
+        counts, _, _ = np.histogram2d(frequency[idx], monetary[idx], bins=[freq_edges, monetary_edges])
+        recency_sum, _, _ = np.histogram2d(frequency[idx], monetary[idx], bins=[freq_edges, monetary_edges],
+                                           weights=recency[idx])
+        histogram = [
+            {
+                'frequency': round(float(freq_centers[i]), 2),
+                'monetary': round(float(monetary_centers[j]), 0),
+                'count': int(counts[i, j]),
+                'avg_recency': round(float(recency_sum[i, j] / counts[i, j]), 1)
+            }
+            for i, j in zip(*np.nonzero(counts))
+        ]
+
+        # Sampel proporsional ukuran segmen, minimal beberapa titik untuk segmen kecil
+        quota = min(len(idx), max(20, int(round(max_points * len(idx) / total))))
+        # Urutan acak, sehingga pemotongan di bawah tetap menghasilkan subset acak
+        sampled.append(rng.permutation(idx)[:quota])
+
+        payload['segments'].append({
+            'id': int(segment_id),
+            'name': info.segment_name if info else None,
+            'color': info.color if info else None,
+            'count': int(len(idx)),
+            'histogram': histogram
         })
-        
-    return jsonify(results)
+
+    # Batas keras ukuran payload: jika terlalu banyak segmen kecil, potong sampel
+    sampled_total = sum(len(sample_idx) for sample_idx in sampled)
+    if sampled_total > max_points:
+        ratio = max_points / sampled_total
+        sampled = [sample_idx[:max(1, int(len(sample_idx) * ratio))] for sample_idx in sampled]
+
+    if names is None:
+        # Nama hanya diambil untuk titik sampel (maksimal max_points), dengan satu query IN
+        sampled_ids = np.concatenate(sampled).tolist()
+        sampled_customer_ids = [int(customer_ids[i]) for i in sampled_ids]
+        names = dict(db.session.query(Customer.id, Customer.name)
+                     .filter(Customer.id.in_(sampled_customer_ids)).all())
+
+    for segment, sample_idx in zip(payload['segments'], sampled):
+        segment['points'] = [
+            {
+                'customer_id': int(customer_ids[i]),
+                'name': names.get(int(customer_ids[i])),
+                'frequency': int(frequency[i]),
+                'monetary': float(monetary[i]),
+                'recency': int(recency[i])
+            }
+            for i in sample_idx.tolist()
+        ]
+
+    payload['sampled_points'] = sum(len(s['points']) for s in payload['segments'])
+    return payload
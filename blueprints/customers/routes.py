@@ -3,10 +3,12 @@ from flask_login import login_required
 from blueprints.customers import bp
 from models.customer import Customer
 from models.transaction import Transaction
+from models.analytics import CustomerSegment, CustomerSegmentMembership
 from app import db
 # Pastikan path import ini sesuai struktur folder Anda
 from forms.customers import CustomerForm
 from utils.decorators import role_required, admin_required
+from utils.pagination import paginate
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import or_
 
@@ -29,14 +31,25 @@ def list_customers():
     # Urutkan dari yang terbaru atau berdasarkan nama
     query = query.order_by(Customer.name.asc())
     
-    customers = query.paginate(
-        page=page, 
-        per_page=per_page, 
-        error_out=False
-    )
+    # Tanpa pencarian: total dari estimasi planner (tabel besar), bukan COUNT(*) penuh
+    customers = paginate(query, page, per_page,
+                         estimate_table=None if search_query else Customer)
+
+    # Ambil badge segmen untuk semua pelanggan di halaman ini dalam satu query
+    # (menghindari N+1 dari relasi dynamic 'segment_memberships' di template)
+    segment_map = {}
+    customer_ids = [c.id for c in customers.items]
+    if customer_ids:
+        rows = db.session.query(CustomerSegmentMembership.customer_id, CustomerSegment)\
+            .join(CustomerSegment, CustomerSegmentMembership.segment_id == CustomerSegment.id)\
+            .filter(CustomerSegmentMembership.customer_id.in_(customer_ids))\
+            .all()
+        for customer_id, segment in rows:
+            segment_map.setdefault(customer_id, []).append(segment)
     
     return render_template('customers/list.html', 
                           customers=customers, 
+                          segment_map=segment_map,
                           current_page=page,
                           per_page=per_page,
                           search_query=search_query)
@@ -153,9 +166,8 @@ def customer_transactions(customer_id):
     # Tambahkan pagination untuk transaksi (penting jika pelanggan loyal)
     page = request.args.get('page', 1, type=int)
     
-    transactions = Transaction.query.filter_by(customer_id=customer_id)\
-                                .order_by(Transaction.created_at.desc())\
-                                .paginate(page=page, per_page=10, error_out=False)
+    transactions = paginate(Transaction.query.filter_by(customer_id=customer_id)
+                            .order_by(Transaction.created_at.desc()), page, 10)
     
     return render_template('customers/transactions.html', 
                           customer=customer, 
@@ -2,12 +2,16 @@ from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required
 from blueprints.products import bp
 from models.product import Product
+from models.transaction import Transaction
 from app import db
 # Pastikan file forms/products.py sudah dibuat
 from forms.products import ProductForm
 from utils.decorators import admin_required
+from utils.pagination import paginate
+from utils.http_cache import conditional_response
+from utils.product_associations import related_products, MAX_RELATED
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import or_
+from sqlalchemy import or_, func
 
 @bp.route('/')
 @login_required # Semua user login boleh lihat list produk
@@ -30,7 +34,8 @@ def list_products():
     # Urutkan berdasarkan nama
     query = query.order_by(Product.name.asc())
 
-    products = query.paginate(page=page, per_page=per_page, error_out=False)
+    products = paginate(query, page, per_page,
+                        estimate_table=None if search_query else Product)
     
     return render_template('products/list.html', 
                           products=products, 
@@ -109,8 +114,11 @@ def delete_product(id):
 
 @bp.route('/api/search')
 @login_required
+@conditional_response('products', cache_control='private, max-age=10', key=lambda: _stock_etag_key())
 def api_search():
-    # API ini digunakan oleh halaman Kasir (Sales)
+    # API ini digunakan oleh halaman Kasir (Sales). Ketikan berulang (hapus/ketik ulang)
+    # dilayani cache browser; stok boleh tertinggal beberapa detik karena checkout
+    # tetap memvalidasi stok di server.
     query = request.args.get('q', '')
     
     # Jika query kosong, jangan return apa-apa
@@ -124,7 +132,7 @@ def api_search():
             'id': exact_sku.id,
             'name': exact_sku.name,
             'sku': exact_sku.sku,
-            'price': float(exact_sku.price), # Decimal to Float for JSON
+            'price': exact_sku.price, # rupiah utuh (int)
             'stock': exact_sku.stock
         }])
 
@@ -142,8 +150,39 @@ def api_search():
             'id': product.id,
             'name': product.name,
             'sku': product.sku,
-            'price': float(product.price),
+            'price': product.price,
             'stock': product.stock
         })
     
-    return jsonify(results)
\ No newline at end of file
+    return jsonify(results)
+
+def _stock_etag_key():
+    """
+    Bagian ETag api_search di luar versi products: stok yang berkurang karena checkout tidak
+    menaikkan versi (lihat utils/http_cache._SALE_ATTRIBUTES), jadi ID transaksi terakhir ikut
+    agar stok baru tidak dijawab 304 yang basi.
+    """
+    return f'tx:{db.session.query(func.max(Transaction.id)).scalar()}'
+
+
+@bp.route('/api/<int:id>/related')
+@login_required
+def api_related(id):
+    # Saran "sering dibeli bersama" untuk halaman Kasir, dibaca dari index co-occurrence
+    # yang dihitung batch (flask refresh-associations), bukan dari riwayat transaksi langsung
+    limit = min(request.args.get('limit', 5, type=int), MAX_RELATED)
+    if limit <= 0:
+        return jsonify([])
+
+    results = []
+    for product, co_count in related_products(db, id, limit=limit):
+        results.append({
+            'id': product.id,
+            'name': product.name,
+            'sku': product.sku,
+            'price': product.price,
+            'stock': product.stock,
+            'co_count': co_count
+        })
+
+    return jsonify(results)
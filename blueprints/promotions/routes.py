@@ -4,16 +4,24 @@ from blueprints.promotions import bp
 # Import dari folder forms yang benar
 from forms.promotions import PromotionForm
 from models.analytics import CustomerSegment, Promotion
+from models.product import Product
 from app import db
 from utils.decorators import admin_required
+from utils.http_cache import conditional_response
+from utils.promotion_simulator import (
+    SimulationError, MAX_SCENARIOS, PROMOTION_TYPES, default_period, load_history,
+    current_scenario, parse_scenario, simulate
+)
 from sqlalchemy.orm import joinedload
+from datetime import datetime
 
 @bp.route('/')
 @admin_required
 @login_required
 def list_promotions():
     # Optimasi Query: Eager load 'segment' agar tidak N+1 query di template
-    promotions = Promotion.query.options(joinedload(Promotion.segment)).all()
+    promotions = Promotion.query.options(joinedload(Promotion.segment))\
+        .order_by(Promotion.segment_id, Promotion.min_spend, Promotion.id).all()
     
     return render_template('promotions/list.html', promotions=promotions)
 
@@ -26,23 +34,12 @@ def add_promotion():
     # Isi pilihan segmen secara dinamis
     segments = CustomerSegment.query.all()
     form.segment_id.choices = [(s.id, s.segment_name) for s in segments]
+    form.category.choices = _category_choices()
     
     if form.validate_on_submit():
-        # Cek duplikat: Satu segmen hanya boleh punya satu promosi aktif
-        existing_promotion = Promotion.query.filter_by(segment_id=form.segment_id.data).first()
-        
-        if existing_promotion:
-            # Cari nama segmen yang benar berdasarkan ID (jangan pakai index list)
-            seg_name = next((s.segment_name for s in segments if s.id == form.segment_id.data), 'Terpilih')
-            flash(f'Segmen "{seg_name}" sudah memiliki promosi. Hapus atau edit yang lama.', 'warning')
-            return render_template('promotions/form.html', form=form, title='Tambah Promosi')
-        
-        promotion = Promotion(
-            segment_id=form.segment_id.data,
-            promotion_type=form.promotion_type.data,
-            promotion_value=form.promotion_value.data,
-            description=form.description.data
-        )
+        # Satu segmen boleh punya beberapa aturan (bertingkat / per kategori / per periode)
+        promotion = Promotion()
+        _apply_form(promotion, form)
         db.session.add(promotion)
         db.session.commit()
         flash('Promosi berhasil ditambahkan!', 'success')
@@ -59,30 +56,32 @@ def edit_promotion(id):
     
     segments = CustomerSegment.query.all()
     form.segment_id.choices = [(s.id, s.segment_name) for s in segments]
+    form.category.choices = _category_choices()
+    if request.method == 'GET':
+        form.category.data = promotion.category or ''
     
     if form.validate_on_submit():
-        # Cek duplikat (kecuali diri sendiri)
-        existing_promotion = Promotion.query.filter(
-            Promotion.segment_id == form.segment_id.data,
-            Promotion.id != id
-        ).first()
-        
-        if existing_promotion:
-            seg_name = next((s.segment_name for s in segments if s.id == form.segment_id.data), 'Terpilih')
-            flash(f'Segmen "{seg_name}" sudah memiliki promosi lain.', 'warning')
-            return render_template('promotions/form.html', form=form, title='Edit Promosi')
-        
-        promotion.segment_id = form.segment_id.data
-        promotion.promotion_type = form.promotion_type.data
-        promotion.promotion_value = form.promotion_value.data
-        promotion.description = form.description.data
-        
+        _apply_form(promotion, form)
         db.session.commit()
         flash('Promosi berhasil diperbarui!', 'success')
         return redirect(url_for('promotions.list_promotions'))
     
     return render_template('promotions/form.html', form=form, title='Edit Promosi')
 
+def _category_choices():
+    categories = [c for c, in db.session.query(Product.category).distinct().order_by(Product.category) if c]
+    return [('', 'Semua Produk')] + [(c, c) for c in categories]
+
+def _apply_form(promotion, form):
+    promotion.segment_id = form.segment_id.data
+    promotion.promotion_type = form.promotion_type.data
+    promotion.promotion_value = form.promotion_value.data
+    promotion.description = form.description.data
+    promotion.min_spend = form.min_spend.data or None
+    promotion.category = form.category.data or None
+    promotion.start_date = form.start_date.data
+    promotion.end_date = form.end_date.data
+
 @bp.route('/delete/<int:id>', methods=['POST'])
 @admin_required
 @login_required
@@ -99,6 +98,7 @@ def delete_promotion(id):
 @bp.route('/api/<int:id>')
 @admin_required
 @login_required
+@conditional_response('promotions', 'segments')  # segment_name ikut di payload
 def api_promotion_detail(id):
     promotion = Promotion.query.get_or_404(id)
     return jsonify({
@@ -106,5 +106,118 @@ def api_promotion_detail(id):
         'segment_name': promotion.segment.segment_name if promotion.segment else '-',
         'promotion_type': promotion.promotion_type,
         'promotion_value': float(promotion.promotion_value), # Convert Decimal to float for JSON
-        'description': promotion.description
-    })
\ No newline at end of file
+        'description': promotion.description,
+        'min_spend': promotion.min_spend,
+        'category': promotion.category,
+        'start_date': promotion.start_date.isoformat() if promotion.start_date else None,
+        'end_date': promotion.end_date.isoformat() if promotion.end_date else None
+    })
+
+# Skenario yang bisa diisi di halaman simulasi (selain "Promosi Saat Ini")
+SIMULATOR_SCENARIOS = ('A', 'B', 'C')
+
+@bp.route('/simulate')
+@admin_required
+@login_required
+def simulate_promotions():
+    # Simulasi bersifat read-only, jadi form memakai GET agar hasil bisa di-bookmark/dibagikan
+    segments = CustomerSegment.query.order_by(CustomerSegment.segment_name).all()
+    current = current_scenario(db)
+
+    try:
+        start_date, end_date = _simulation_period(request.args.get('start_date'), request.args.get('end_date'))
+    except ValueError as e:
+        flash(str(e) if isinstance(e, SimulationError) else 'Format tanggal tidak valid.', 'danger')
+        return redirect(url_for('promotions.simulate_promotions'))
+
+    # Nilai form per skenario: default = promosi saat ini
+    form_values = {}
+    for name in SIMULATOR_SCENARIOS:
+        for segment in segments:
+            # Segmen dengan beberapa aturan: form menampilkan aturan pertama
+            promotion_type, value = (current.get(segment.id) or [('percentage_discount', None)])[0]
+            form_values[(name, segment.id)] = (
+                request.args.get(f'type_{name}_{segment.id}', promotion_type),
+                request.args.get(f'value_{name}_{segment.id}', '' if value is None else f'{value:g}')
+            )
+
+    results = None
+    if request.args.get('run'):
+        scenarios = [('Promosi Saat Ini', current)]
+        try:
+            for name in SIMULATOR_SCENARIOS:
+                scenarios.append((f'Skenario {name}', parse_scenario([
+                    {'segment_id': segment.id, 'promotion_type': promotion_type, 'promotion_value': value}
+                    for segment in segments
+                    for promotion_type, value in [form_values[(name, segment.id)]]
+                    if value.strip()
+                ])))
+        except SimulationError as e:
+            flash(str(e), 'danger')
+        else:
+            history = load_history(db, start_date, end_date)
+            results = _simulation_payload(history, scenarios)
+
+    return render_template('promotions/simulate.html',
+                           segments=segments,
+                           scenario_names=SIMULATOR_SCENARIOS,
+                           promotion_types=PROMOTION_TYPES,
+                           form_values=form_values,
+                           start_date=start_date.strftime('%Y-%m-%d'),
+                           end_date=end_date.strftime('%Y-%m-%d'),
+                           results=results)
+
+@bp.route('/api/simulate', methods=['POST'])
+@admin_required
+@login_required
+def api_simulate_promotions():
+    """
+    Body JSON: {"start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD",
+                "scenarios": [{"name": "...", "promotions": [{"segment_id", "promotion_type", "promotion_value"}]}]}
+    Skenario "Promosi Saat Ini" selalu disertakan sebagai pembanding.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        start_date, end_date = _simulation_period(data.get('start_date'), data.get('end_date'))
+        raw_scenarios = data.get('scenarios') or []
+        if not isinstance(raw_scenarios, list) or len(raw_scenarios) > MAX_SCENARIOS:
+            raise SimulationError(f'scenarios harus berupa list berisi maksimal {MAX_SCENARIOS} skenario.')
+        scenarios = [('Promosi Saat Ini', current_scenario(db))]
+        for i, scenario in enumerate(raw_scenarios):
+            if not isinstance(scenario, dict) or not isinstance(scenario.get('promotions', []), list):
+                raise SimulationError('Setiap skenario harus berupa objek dengan list promotions.')
+            scenarios.append((str(scenario.get('name') or f'Skenario {i + 1}'),
+                              parse_scenario(scenario.get('promotions', []))))
+    except ValueError as e:
+        # SimulationError turunan ValueError; ValueError biasa berasal dari format tanggal
+        message = str(e) if isinstance(e, SimulationError) else 'Format tanggal tidak valid (YYYY-MM-DD).'
+        return jsonify({'success': False, 'message': message}), 400
+
+    history = load_history(db, start_date, end_date)
+    return jsonify({'success': True, **_simulation_payload(history, scenarios)})
+
+def _simulation_period(start_date_str, end_date_str):
+    """Rentang simulasi dari input (default 365 hari terakhir). ValueError jika format salah."""
+    if not (start_date_str and end_date_str):
+        return default_period()
+    start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+    end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    if start_date > end_date:
+        raise SimulationError('Tanggal mulai tidak boleh setelah tanggal akhir.')
+    return start_date, end_date
+
+def _simulation_payload(history, scenarios):
+    results = simulate(history, [scenario for _, scenario in scenarios])
+    gross_turnover = int(history['gross'].sum())
+    baseline = results[0]['discount_total']
+    for (name, _), result in zip(scenarios, results):
+        result['name'] = name
+        result['discount_change'] = result['discount_total'] - baseline
+    return {
+        'start_date': history['start_date'].isoformat(),
+        'end_date': history['end_date'].isoformat(),
+        'transactions': int(len(history['gross'])),
+        'gross_turnover': gross_turnover,
+        'actual_discount': history['actual_discount'],
+        'results': results
+    }
@@ -1,17 +1,28 @@
-from flask import render_template, redirect, url_for, flash, request, jsonify
+from flask import render_template, redirect, url_for, flash, request, jsonify, current_app, abort
 from flask_login import login_required, current_user
 from blueprints.sales import bp
 from models.customer import Customer
 from models.product import Product
+from models.user import User
 from models.transaction import Transaction, TransactionItem
-from models.analytics import CustomerSegment, CustomerSegmentMembership, Promotion
+from models.analytics import CustomerSegment, CustomerSegmentMembership
 from app import db
 from datetime import datetime, date, timedelta
-from decimal import Decimal
+import json
+from collections import defaultdict
 import calendar # <-- Import calendar
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, select
 from sqlalchemy.orm import joinedload
 from utils.decorators import role_required
+from utils.usual_basket import basket_products
+from utils.pricing import PricingError, customer_discount, promotion_table, quote_cart, rule_payload
+from utils.receipt_cache import build_receipt, get_receipt, store_receipt
+from utils.money import money_sum
+from utils.pagination import paginate
+from utils.export_writer import EXPORT_FORMATS, export_response, iter_query_chunks
+
+# Batas ID per request batch (kontrak API); satu IN query tetap di bawah batas parameter SQLite (999)
+MAX_BATCH_CUSTOMERS = 900
 
 @bp.route('/dashboard')
 @role_required('admin', 'cashier')
@@ -21,16 +32,21 @@ def dashboard():
     products_count = Product.query.count()
     customers_count = Customer.query.count()
     today = date.today()
-    today_transactions_count = Transaction.query.filter(func.date(Transaction.created_at) == today).count()
+    # Rentang setengah terbuka (bukan DATE(created_at) / BETWEEN ... 23:59:59) agar PostgreSQL
+    # hanya membaca partisi bulan ini (lihat utils/partitions.py)
+    today_transactions_count = Transaction.query.filter(
+        Transaction.created_at >= today, Transaction.created_at < today + timedelta(days=1)
+    ).count()
     
     # --- Poin 6.1: Omset Bulanan ---
     _, num_days_in_month = calendar.monthrange(today.year, today.month)
     first_day_of_month = date(today.year, today.month, 1)
     last_day_of_month = date(today.year, today.month, num_days_in_month)
     
-    monthly_turnover = db.session.query(func.sum(Transaction.total_amount))\
-        .filter(Transaction.created_at.between(first_day_of_month, f"{last_day_of_month} 23:59:59"))\
-        .scalar() or Decimal('0')
+    monthly_turnover = db.session.query(money_sum(Transaction.total_amount))\
+        .filter(Transaction.created_at >= first_day_of_month,
+                Transaction.created_at < last_day_of_month + timedelta(days=1))\
+        .scalar()
 
     # --- Data untuk tabel & list di bawah ---
     low_stock_query = Product.query.filter(Product.stock < 10)
@@ -88,82 +104,112 @@ def transactions():
     query = Transaction.query.options(joinedload(Transaction.customer), joinedload(Transaction.user))
     
     try:
-        if start_date_str:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            query = query.filter(Transaction.created_at >= start_date)
-        
-        if end_date_str:
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-            # Tambah 1 hari untuk membuat rentang inklusif
-            end_date_plus_one = end_date + timedelta(days=1)
-            query = query.filter(Transaction.created_at < end_date_plus_one)
-
+        date_filters = _date_range_filters(start_date_str, end_date_str)
     except ValueError:
         flash('Format tanggal tidak valid. Gunakan YYYY-MM-DD.', 'danger')
         start_date_str = ''
         end_date_str = ''
+        date_filters = []
 
-    transactions = query.order_by(Transaction.created_at.desc()).paginate(
-        page=page, per_page=10, error_out=False
-    )
+    # Tanpa filter tanggal: total dari estimasi planner, bukan COUNT(*) seluruh transaksi
+    transactions = paginate(query.filter(*date_filters).order_by(Transaction.created_at.desc()),
+                            page, 10, estimate_table=None if date_filters else Transaction)
     
     return render_template('sales/transactions.html', 
                           transactions=transactions, 
                           start_date=start_date_str,
                           end_date=end_date_str)
 
+@bp.route('/transactions/export')
+@role_required('admin', 'cashier')
+@login_required
+def export_transactions():
+    # Ekspor server-side semua transaksi dalam rentang tanggal (bukan hanya halaman yang tampil)
+    fmt = request.args.get('format', 'csv')
+    start_date_str = request.args.get('start_date', '')
+    end_date_str = request.args.get('end_date', '')
+    if fmt not in EXPORT_FORMATS:
+        flash('Format ekspor tidak dikenal.', 'danger')
+        return redirect(url_for('sales.transactions'))
+
+    try:
+        filters = _date_range_filters(start_date_str, end_date_str)
+    except ValueError:
+        flash('Format tanggal tidak valid. Gunakan YYYY-MM-DD.', 'danger')
+        return redirect(url_for('sales.transactions'))
+
+    # Kolom saja (bukan objek ORM) agar relasi items tidak ikut di-load per baris
+    statement = select(
+        Transaction.id,
+        Transaction.created_at,
+        func.coalesce(Customer.name, 'Pelanggan Umum'),
+        User.username,
+        Transaction.total_amount + func.coalesce(Transaction.discount_amount, 0),
+        func.coalesce(Transaction.discount_amount, 0),
+        Transaction.total_amount,
+        Transaction.payment_method,
+        Transaction.notes
+    ).outerjoin(Customer, Customer.id == Transaction.customer_id)\
+     .outerjoin(User, User.id == Transaction.user_id)\
+     .where(*filters)\
+     .order_by(Transaction.created_at, Transaction.id)
+
+    header = ['ID', 'Waktu', 'Pelanggan', 'Kasir', 'Subtotal', 'Diskon', 'Total Bayar', 'Metode', 'Catatan']
+    filename = f"transaksi_{start_date_str or 'awal'}_{end_date_str or 'akhir'}"
+    return export_response(fmt, filename, header, iter_query_chunks(db, statement), sheet_name='Transaksi')
+
 @bp.route('/transaction/<int:id>')
 @role_required('admin', 'cashier')
 @login_required
 def transaction_detail(id):
-    # Eager load items dan product untuk detail struk
-    transaction = Transaction.query.options(
-        joinedload(Transaction.items).joinedload(TransactionItem.product),
-        joinedload(Transaction.customer)
-    ).get_or_404(id)
-    
-    return render_template('sales/transaction_detail.html', transaction=transaction)
+    # Transaksi tidak pernah berubah: struk di-render sekali, cetak ulang dari cache
+    receipt_html, receipt_json = _cached_receipt(id)
+    return render_template('sales/transaction_detail.html',
+                           receipt=json.loads(receipt_json), receipt_html=receipt_html)
+
+@bp.route('/api/receipt/<int:id>')
+@role_required('admin', 'cashier')
+@login_required
+def api_receipt(id):
+    # Struk ringkas untuk printer POS (JSON yang sama dengan yang di-cache, tanpa serialisasi ulang)
+    _, receipt_json = _cached_receipt(id)
+    return current_app.response_class(receipt_json, mimetype='application/json')
+
+def _cached_receipt(id):
+    # created_at ikut kunci cache: ID bisa dipakai ulang setelah reset data (seed-db)
+    created_at = db.session.query(Transaction.created_at).filter(Transaction.id == id).scalar()
+    if created_at is None:
+        abort(404)
+    cached = get_receipt(id, created_at)
+    if cached is None:
+        # Belum di-cache (transaksi lama / proses baru tanpa cache disk): muat sekali lalu simpan
+        transaction = Transaction.query.options(
+            joinedload(Transaction.items).joinedload(TransactionItem.product),
+            joinedload(Transaction.customer),
+            joinedload(Transaction.user)
+        ).get_or_404(id)
+        cached = store_receipt(build_receipt(transaction), transaction.created_at)
+    return cached
 
 @bp.route('/turnover')
 @role_required('admin', 'cashier')
 @login_required
 def turnover_report():
     # 1. Tentukan Rentang Tanggal (Default: Bulan Ini)
-    today = date.today()
-    start_date_str = request.args.get('start_date')
-    end_date_str = request.args.get('end_date')
-
-    if start_date_str and end_date_str:
-        try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-        except ValueError:
-            flash('Format tanggal tidak valid.', 'danger')
-            return redirect(url_for('sales.turnover_report'))
-    else:
-        # Default: Tanggal 1 bulan ini s/d Hari ini
-        start_date = date(today.year, today.month, 1)
-        end_date = today
-        start_date_str = start_date.strftime('%Y-%m-%d')
-        end_date_str = end_date.strftime('%Y-%m-%d')
+    try:
+        start_date, end_date = _turnover_range(request.args.get('start_date'), request.args.get('end_date'))
+    except ValueError:
+        flash('Format tanggal tidak valid.', 'danger')
+        return redirect(url_for('sales.turnover_report'))
+    start_date_str = start_date.strftime('%Y-%m-%d')
+    end_date_str = end_date.strftime('%Y-%m-%d')
 
     # Tambahkan 1 hari ke end_date untuk query range inklusif
     end_date_query = end_date + timedelta(days=1)
 
     # 2. Query Agregasi Harian
-    # Group by Date(created_at)
-    daily_results = db.session.query(
-        func.date(Transaction.created_at).label('tx_date'),
-        func.count(Transaction.id).label('trx_count'),
-        func.count(func.distinct(Transaction.customer_id)).label('cust_count'),
-        func.sum(Transaction.total_amount).label('daily_total')
-    ).filter(
-        Transaction.created_at >= start_date,
-        Transaction.created_at < end_date_query
-    ).group_by(
-        func.date(Transaction.created_at)
-    ).order_by(
-        desc('tx_date')
+    daily_results = db.session.execute(
+        _daily_turnover_statement(start_date, end_date_query).order_by(desc('tx_date'))
     ).all()
 
     # 3. Hitung Total Summary untuk Kartu
@@ -197,6 +243,63 @@ def turnover_report():
                           start_date=start_date_str,
                           end_date=end_date_str)
 
+@bp.route('/turnover/export')
+@role_required('admin', 'cashier')
+@login_required
+def export_turnover():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        flash('Format ekspor tidak dikenal.', 'danger')
+        return redirect(url_for('sales.turnover_report'))
+
+    try:
+        start_date, end_date = _turnover_range(request.args.get('start_date'), request.args.get('end_date'))
+    except ValueError:
+        flash('Format tanggal tidak valid.', 'danger')
+        return redirect(url_for('sales.turnover_report'))
+
+    statement = _daily_turnover_statement(start_date, end_date + timedelta(days=1)).order_by('tx_date')
+    header = ['Tanggal', 'Jml Transaksi', 'Jml Pelanggan', 'Total Omset']
+    filename = f"omset_{start_date:%Y-%m-%d}_{end_date:%Y-%m-%d}"
+    return export_response(fmt, filename, header, iter_query_chunks(db, statement), sheet_name='Omset')
+
+def _date_range_filters(start_date_str, end_date_str):
+    """Filter created_at untuk rentang tanggal inklusif dari query string (kosong = tanpa batas).
+    Melempar ValueError jika format tanggal salah."""
+    filters = []
+    if start_date_str:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        filters.append(Transaction.created_at >= start_date)
+    if end_date_str:
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+        # Tambah 1 hari untuk membuat rentang inklusif
+        filters.append(Transaction.created_at < end_date + timedelta(days=1))
+    return filters
+
+def _turnover_range(start_date_str, end_date_str):
+    """Rentang laporan omset; default tanggal 1 bulan ini s/d hari ini. ValueError jika format salah."""
+    if start_date_str and end_date_str:
+        return (datetime.strptime(start_date_str, '%Y-%m-%d').date(),
+                datetime.strptime(end_date_str, '%Y-%m-%d').date())
+    today = date.today()
+    return date(today.year, today.month, 1), today
+
+def _daily_turnover_statement(start_date, end_date_query):
+    # Group by Date(created_at). type_=Date agar hasilnya objek date di semua driver
+    # (tanpa tipe, SQLite mengembalikan string dan template gagal memanggil strftime)
+    tx_date = func.date(Transaction.created_at, type_=db.Date).label('tx_date')
+    return select(
+        tx_date,
+        func.count(Transaction.id).label('trx_count'),
+        func.count(func.distinct(Transaction.customer_id)).label('cust_count'),
+        money_sum(Transaction.total_amount).label('daily_total')
+    ).where(
+        Transaction.created_at >= start_date,
+        Transaction.created_at < end_date_query
+    ).group_by(
+        func.date(Transaction.created_at)
+    )
+
 @bp.route('/api/checkout', methods=['POST'])
 @login_required
 def api_checkout():
@@ -222,15 +325,19 @@ def api_checkout():
             user_id=current_user.id,
             payment_method=payment_method,
             notes=notes,
-            created_at=datetime.now(),
+            # Presisi detik: DATETIME MySQL membulatkan pecahan detik, nilai di session harus sama
+            # dengan yang tersimpan (kunci cache struk, lihat utils/receipt_cache.receipt_key)
+            created_at=datetime.now().replace(microsecond=0),
             # --- PERBAIKAN DI SINI ---
             total_amount=0,      # Isi 0 dulu agar lolos validasi NOT NULL saat autoflush
-            discount_amount=0    # Isi 0 dulu
+            discount_amount=0,   # Isi 0 dulu
+            items=[]             # Koleksi sudah ter-load (kosong): data struk tidak perlu SELECT ulang
             # -------------------------
         )
         db.session.add(transaction)
         
-        total_amount = Decimal('0')
+        total_amount = 0  # rupiah utuh (int), lihat utils/money.py
+        category_totals = defaultdict(int)  # untuk aturan promosi per kategori
         
         # Proses Item
         for item in items:
@@ -249,97 +356,95 @@ def api_checkout():
             product.stock -= qty
             
             # Hitung Subtotal
-            price = Decimal(str(product.price))
-            subtotal = price * qty
+            subtotal = product.price * qty
             total_amount += subtotal
+            category_totals[product.category] += subtotal
             
             # Tambah Item ke Transaksi
             transaction_item = TransactionItem(
                 transaction=transaction, # Link ke parent
-                product_id=product.id,
+                product=product,
                 quantity=qty,
                 price=product.price # Simpan harga saat transaksi terjadi
             )
             db.session.add(transaction_item)
         
         # --- PERBAIKAN LOGIKA DISKON (SERVER SIDE CALCULATION) ---
-        # Jangan percaya data diskon dari frontend. Hitung ulang hak promosi user.
-        
-        discount_amount = Decimal('0')
-        
-        # Ambil promo aktif untuk customer ini
-        active_promotions = db.session.query(Promotion)\
-            .join(CustomerSegment, Promotion.segment_id == CustomerSegment.id)\
-            .join(CustomerSegmentMembership, CustomerSegment.id == CustomerSegmentMembership.segment_id)\
-            .filter(CustomerSegmentMembership.customer_id == customer_id)\
-            .all()
-            
-        # Ambil diskon terbesar yang berhak didapatkan
-        for promo in active_promotions:
-            current_discount = Decimal('0')
-            if promo.promotion_type == 'percentage_discount':
-                # Diskon Persen
-                val = Decimal(str(promo.promotion_value))
-                current_discount = total_amount * (val / 100)
-            elif promo.promotion_type == 'fixed_discount':
-                # Diskon Rupiah
-                val = Decimal(str(promo.promotion_value))
-                current_discount = val
-            
-            # Kita ambil diskon yang paling menguntungkan pelanggan (jika ada tumpang tindih)
-            if current_discount > discount_amount:
-                discount_amount = current_discount
-        
-        # Pastikan diskon tidak minus atau melebihi total
-        if discount_amount > total_amount:
-            discount_amount = total_amount
+        # Jangan percaya data diskon dari frontend. Hitung ulang hak promosi user
+        # dari tabel aturan terkompilasi yang sama dengan /api/quote (diskon terbesar, maksimal sebesar total).
+        discount_amount, _ = customer_discount(db, customer_id, total_amount, category_totals)
             
         transaction.total_amount = total_amount - discount_amount
         transaction.discount_amount = discount_amount
         
-        db.session.commit()
+        # Data struk diambil sebelum commit: semua objek masih di session (tanpa query tambahan)
+        db.session.flush()
+        receipt = build_receipt(transaction)
+        receipt_created_at = transaction.created_at
         
-        return jsonify({
-            'success': True, 
-            'transaction_id': transaction.id,
-            'total_gross': float(total_amount),
-            'discount_applied': float(discount_amount),
-            'total_net': float(transaction.total_amount)
-        })
+        db.session.commit()
 
     except Exception as e:
         db.session.rollback()
         print(f"Checkout Error: {e}") # Log error ke terminal
         return jsonify({'success': False, 'message': 'Terjadi kesalahan sistem saat checkout'}), 500
 
+    # Render & cache struk sekarang agar cetak ulang tidak menyentuh database.
+    # Transaksi sudah tersimpan, jadi kegagalan di sini tidak boleh menggagalkan respons.
+    try:
+        store_receipt(receipt, receipt_created_at)
+    except Exception as e:
+        current_app.logger.warning('Gagal menyimpan cache struk %s: %s', receipt['id'], e)
+
+    return jsonify({
+        'success': True, 
+        'transaction_id': receipt['id'],
+        'total_gross': total_amount,
+        'discount_applied': discount_amount,
+        'total_net': receipt['total']
+    })
+
+@bp.route('/api/quote', methods=['POST'])
+@login_required
+def api_quote():
+    # Harga keranjang sebelum checkout (read-only, tanpa lock), dipanggil POS setiap keranjang berubah.
+    # Body sama dengan /api/checkout: {customer_id, items: [{product_id, quantity}]}
+    data = request.get_json(silent=True)
+    if not data or 'items' not in data:
+        return jsonify({'success': False, 'message': 'Data tidak lengkap'}), 400
+
+    try:
+        quote = quote_cart(db, data.get('customer_id'), data['items'])
+    except PricingError as e:
+        return jsonify({'success': False, 'message': str(e)}), e.status_code
+
+    return jsonify({'success': True, **quote})
+
 @bp.route('/api/customer-segments/<int:customer_id>')
 @login_required
 def api_customer_segments(customer_id):
     # Route ini digunakan frontend POS untuk menampilkan info promo sebelum checkout
     customer = Customer.query.get_or_404(customer_id)
     
-    data = db.session.query(CustomerSegmentMembership, CustomerSegment, Promotion)\
-        .join(CustomerSegmentMembership.segment)\
-        .outerjoin(CustomerSegment.promotion)\
+    segments = db.session.query(CustomerSegment)\
+        .join(CustomerSegmentMembership, CustomerSegmentMembership.segment_id == CustomerSegment.id)\
         .filter(CustomerSegmentMembership.customer_id == customer_id)\
         .all()
     
+    # Aturan promosi yang aktif hari ini, dari tabel terkompilasi (cache)
+    table = promotion_table(db)
     segment_info = []
     promotions = []
     
-    for membership, segment, promotion in data:
+    for segment in segments:
         segment_info.append({
             'id': segment.id,
             'name': segment.segment_name,
             'color': segment.color
         })
         
-        if promotion:
-            promotions.append({
-                'type': promotion.promotion_type,
-                'value': float(promotion.promotion_value),
-                'description': promotion.description
-            })
+        _, rules = table.get(segment.id, ((), ()))
+        promotions.extend(rule_payload(rule) for rule in rules)
     
     return jsonify({
         'customer': {
@@ -347,5 +452,73 @@ def api_customer_segments(customer_id):
             'name': customer.name,
         },
         'segments': segment_info,
-        'promotions': promotions
-    })
\ No newline at end of file
+        'promotions': promotions,
+        # Belanjaan biasa (dihitung job refresh-baskets) untuk isi keranjang sekali klik
+        'usual_basket': basket_products(db, customer)
+    })
+
+@bp.route('/api/customer-segments/batch', methods=['POST'])
+@login_required
+def api_customer_segments_batch():
+    """
+    Segmen & promosi untuk banyak pelanggan sekaligus (kiosk loyalitas, skrip laporan).
+    Body JSON: {"customer_ids": [1, 2, ...]}. Respons kolumnar: array sejajar per pelanggan,
+    sedangkan segmen dan promosi ditulis sekali dan dirujuk lewat ID segmen.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        if not isinstance(data.get('customer_ids', []), list):
+            raise TypeError
+        customer_ids = list(dict.fromkeys(int(i) for i in data.get('customer_ids') or []))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'customer_ids harus berupa list angka.'}), 400
+    if not customer_ids or len(customer_ids) > MAX_BATCH_CUSTOMERS:
+        return jsonify({'success': False,
+                        'message': f'customer_ids wajib diisi, maksimal {MAX_BATCH_CUSTOMERS} ID.'}), 400
+
+    # Satu query: pelanggan LEFT JOIN membership LEFT JOIN segmen
+    rows = db.session.query(Customer.id, Customer.name, CustomerSegment.id,
+                            CustomerSegment.segment_name, CustomerSegment.color)\
+        .outerjoin(CustomerSegmentMembership, CustomerSegmentMembership.customer_id == Customer.id)\
+        .outerjoin(CustomerSegment, CustomerSegment.id == CustomerSegmentMembership.segment_id)\
+        .filter(Customer.id.in_(customer_ids))\
+        .order_by(Customer.id, CustomerSegment.id)\
+        .all()
+
+    names = {}
+    customer_segments = {}
+    segments = {}
+    for customer_id, name, segment_id, segment_name, color in rows:
+        names[customer_id] = name
+        memberships = customer_segments.setdefault(customer_id, [])
+        if segment_id is not None:
+            memberships.append(segment_id)
+            segments[segment_id] = (segment_name, color)
+
+    # Aturan promosi aktif dari tabel terkompilasi (cache), hanya untuk segmen yang muncul
+    table = promotion_table(db)
+    promotions = {key: [] for key in ('segment_id', 'type', 'value', 'min_spend', 'category', 'description')}
+    for segment_id in sorted(segments):
+        _, rules = table.get(segment_id, ((), ()))
+        for rule in rules:
+            promotions['segment_id'].append(segment_id)
+            for key, value in rule_payload(rule).items():
+                promotions[key].append(value)
+
+    found = [customer_id for customer_id in customer_ids if customer_id in names]
+    segment_order = sorted(segments)
+    return jsonify({
+        'success': True,
+        'customers': {
+            'id': found,
+            'name': [names[customer_id] for customer_id in found],
+            'segment_ids': [customer_segments[customer_id] for customer_id in found]
+        },
+        'segments': {
+            'id': segment_order,
+            'name': [segments[segment_id][0] for segment_id in segment_order],
+            'color': [segments[segment_id][1] for segment_id in segment_order]
+        },
+        'promotions': promotions,
+        'not_found': [customer_id for customer_id in customer_ids if customer_id not in names]
+    })
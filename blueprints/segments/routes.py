@@ -6,15 +6,22 @@ from forms.segments import SegmentForm
 from models.analytics import CustomerSegment, CustomerSegmentMembership
 from app import db
 from utils.decorators import admin_required
+from sqlalchemy import func
 
 @bp.route('/')
 @admin_required
 @login_required
 def list_segments():
-    # Menampilkan list segmen. 
-    # Idealnya di template nanti ditampilkan juga jumlah member per segmen.
+    # Menampilkan list segmen beserta jumlah member.
     segments = CustomerSegment.query.order_by(CustomerSegment.segment_name).all()
-    return render_template('segments/list.html', segments=segments)
+
+    # Hitung member semua segmen dalam satu query GROUP BY (bukan .count() per baris)
+    member_counts = dict(
+        db.session.query(CustomerSegmentMembership.segment_id, func.count(CustomerSegmentMembership.id))
+        .group_by(CustomerSegmentMembership.segment_id)
+        .all()
+    )
+    return render_template('segments/list.html', segments=segments, member_counts=member_counts)
 
 @bp.route('/edit/<int:id>', methods=['GET', 'POST'])
 @admin_required
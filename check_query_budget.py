@@ -0,0 +1,68 @@
+"""
+Harness untuk memastikan halaman listing tidak kembali ke pola N+1 query.
+
+Jalankan terhadap database yang sudah di-seed (flask seed-db):
+    python check_query_budget.py
+
+Script akan login sebagai admin pertama, membuka setiap endpoint listing,
+lalu gagal (exit code 1) jika jumlah query SQL melebihi batas.
+"""
+import sys
+from app import create_app, db
+from models.user import User
+from utils.metrics import count_queries
+
+# endpoint -> batas maksimum query SQL per render halaman.
+# Sudah termasuk query overhead per request: load user (Flask-Login),
+# AppSetting (context processor), dan COUNT(*) pagination.
+QUERY_BUDGETS = {
+    '/customers/': 6,
+    '/customers/?page=2': 6,
+    '/customers/?q=a': 6,
+    '/segments/': 5,
+    '/products/': 5,
+    '/promotions/': 4,
+    '/sales/transactions': 5,
+}
+
+
+def run_checks(app):
+    client = app.test_client()
+
+    with app.app_context():
+        admin = User.query.filter_by(role='admin').first()
+        if not admin:
+            print("❌ Tidak ada user admin. Jalankan 'flask seed-db' terlebih dahulu.")
+            return False
+        admin_id = admin.id
+        engine = db.engine
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(admin_id)
+        sess['_fresh'] = True
+
+    all_passed = True
+    for url, budget in QUERY_BUDGETS.items():
+        with count_queries(engine) as queries:
+            response = client.get(url)
+
+        status = '✅' if response.status_code == 200 and len(queries) <= budget else '❌'
+        if status == '❌':
+            all_passed = False
+        print(f"{status} {url:<25} HTTP {response.status_code}  {len(queries):>3} query (batas {budget})")
+
+        if status == '❌' and len(queries) > budget:
+            for statement in queries:
+                print(f"     - {' '.join(statement.split())[:150]}")
+
+    return all_passed
+
+
+def main():
+    app = create_app()
+    passed = run_checks(app)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+basedir = os.path.abspath(os.path.dirname(__file__))
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY')
     
@@ -17,4 +19,16 @@ class Config:
     PERMANENT_SESSION_LIFETIME = timedelta(hours=2)
     
     # Konfigurasi untuk K-Means
-    KMEANS_N_CLUSTERS = 3  # Jumlah cluster default
\ No newline at end of file
+    KMEANS_N_CLUSTERS = 3  # Jumlah cluster default
+
+    # Instrumentasi request & endpoint /metrics (default: mati, tanpa overhead)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'False').lower() in ('true', '1', 'yes')
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))  # Ambang log slow request
+    # Token bearer scraper untuk /metrics (tanpa token: hanya admin yang login)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Direktori file .npy hasil run segmentasi (dibuka mmap oleh semua worker)
+    FEATURE_STORE_DIR = os.environ.get('FEATURE_STORE_DIR', os.path.join(basedir, 'instance', 'features'))
+
+    # Direktori cache struk yang sudah di-render (opsional; kosong = hanya cache memori per proses)
+    RECEIPT_CACHE_DIR = os.environ.get('RECEIPT_CACHE_DIR')
\ No newline at end of file
@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, TextAreaField, IntegerField, DecimalField, SelectField, SubmitField
+from wtforms import StringField, TextAreaField, IntegerField, SelectField, SubmitField
 from wtforms.validators import DataRequired, NumberRange, Length
 
 class ProductForm(FlaskForm):
@@ -13,8 +13,8 @@ class ProductForm(FlaskForm):
     ])
     description = TextAreaField('Deskripsi')
     
-    # DecimalField jauh lebih akurat untuk uang daripada FloatField
-    price = DecimalField('Harga (Rp)', validators=[
+    # Harga dalam rupiah utuh (kolom BIGINT, lihat utils/money.py)
+    price = IntegerField('Harga (Rp)', validators=[
         DataRequired(), 
         NumberRange(min=0)
     ])
@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
-from wtforms import SelectField, DecimalField, TextAreaField, SubmitField
-from wtforms.validators import DataRequired, NumberRange, ValidationError
+from wtforms import SelectField, DecimalField, IntegerField, TextAreaField, SubmitField, DateField
+from wtforms.validators import DataRequired, NumberRange, Optional, ValidationError
 
 class PromotionForm(FlaskForm):
     # Segment akan diisi secara dinamis di route
@@ -18,10 +18,25 @@ class PromotionForm(FlaskForm):
     ])
     
     description = TextAreaField('Deskripsi Promosi')
+    
+    # Syarat aturan (semua opsional)
+    min_spend = IntegerField('Minimum Belanja (Rp)', validators=[
+        Optional(),
+        NumberRange(min=0, message='Minimum belanja tidak boleh negatif')
+    ])
+    # Kategori akan diisi secara dinamis di route ('' = semua produk)
+    category = SelectField('Kategori Produk', validators=[Optional()])
+    start_date = DateField('Berlaku Mulai', validators=[Optional()])
+    end_date = DateField('Berlaku Sampai', validators=[Optional()])
+    
     submit = SubmitField('Simpan Promosi')
 
     # Validasi Custom: Cek logika bisnis
     def validate_promotion_value(self, field):
         if self.promotion_type.data == 'percentage_discount':
             if field.data > 100:
-                raise ValidationError('Diskon persentase tidak boleh lebih dari 100%.')
\ No newline at end of file
+                raise ValidationError('Diskon persentase tidak boleh lebih dari 100%.')
+
+    def validate_end_date(self, field):
+        if field.data and self.start_date.data and field.data < self.start_date.data:
+            raise ValidationError('Tanggal akhir tidak boleh sebelum tanggal mulai.')
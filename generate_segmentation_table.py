@@ -4,10 +4,13 @@ from datetime import datetime
 from app import create_app, db
 from models.customer import Customer
 from models.transaction import Transaction
-from models.analytics import CustomerSegmentMembership, CustomerSegment
+from models.analytics import CustomerSegment
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 from sqlalchemy import func
+from utils.segment_stats import record_segmentation_run
+from utils.segmentation import write_memberships
+from utils.feature_store import export_run_features
 
 def get_data_and_rfm():
     """Mengambil data, menghitung RFM, dan menyertakan Nama Pelanggan."""
@@ -77,11 +80,9 @@ def process_segmentation(rfm_df, n_clusters=3):
     
     print("💾 Menyimpan hasil ke database...")
     
-    # Reset Data Lama
-    db.session.query(CustomerSegmentMembership).delete()
+    # Membership lama tidak dihapus di sini: write_memberships hanya menulis selisihnya
     # Opsional: Jika ingin reset definisi segmen juga
     # db.session.query(CustomerSegment).delete() 
-    db.session.commit()
     
     # Dictionary untuk mapping cluster_sorted -> segment_id database
     cluster_to_segment_id = {}
@@ -111,17 +112,18 @@ def process_segmentation(rfm_df, n_clusters=3):
         # Tambahkan nama segmen ke DataFrame untuk display nanti
         rfm_df.loc[rfm_df['cluster_sorted'] == i, 'segment_name'] = seg_def['name']
 
-    # 6. Bulk Insert Membership
-    memberships = []
-    for _, row in rfm_df.iterrows():
-        memberships.append({
-            'customer_id': row['customer_id'],
-            'segment_id': cluster_to_segment_id[row['cluster_sorted']],
-            'assigned_at': datetime.now()
-        })
-    
-    db.session.bulk_insert_mappings(CustomerSegmentMembership, memberships)
+    # 6. Tulis Membership (vektor, hanya baris yang berubah)
+    segment_ids = rfm_df['cluster_sorted'].map(cluster_to_segment_id).values
+    written = write_memberships(db, rfm_df['customer_id'].values, segment_ids)
+    print(f"   Membership: {written['inserted']} ditambah, {written['deleted']} dihapus, {written['unchanged']} tetap.")
+
+    # Snapshot statistik per segmen (dibaca dashboard & halaman segmen)
+    centers = scaler.inverse_transform(kmeans.cluster_centers_)
+    centroids = {cluster_to_segment_id[sorted_id]: centers[int(cluster)] for cluster, sorted_id in cluster_map.items()}
+    db.session.flush()
+    run = record_segmentation_run(db, 'kmeans', n_clusters=n_clusters, centroids=centroids)
     db.session.commit()
+    export_run_features(db, run)
     
     print("✅ Database diperbarui.")
     return rfm_df
@@ -0,0 +1,350 @@
+"""
+Load test end-to-end alur kasir (POS) terhadap aplikasi yang sedang berjalan.
+
+Setiap "register" (thread) login sebagai kasir lalu mengulang alur nyata:
+  ketik nama produk (products/api/search per keystroke)
+  -> cari pelanggan (customers/api/search per keystroke)
+  -> info segmen & promo (sales/api/customer-segments/<id>)
+  -> bayar (sales/api/checkout)
+
+Contoh:
+    flask seed-db --customers 5000 --transactions 50000
+    gunicorn -w 4 app:app &
+    python loadtest_pos.py --base-url http://127.0.0.1:8000 --registers 8 --duration 60
+
+Hasil (throughput, p50/p95/p99 per endpoint, error rate, lock wait) ditulis ke file
+JSON dengan key terurut sehingga dua run bisa dibandingkan dengan `diff`.
+Lock wait diambil dari pg_stat_activity, jadi hanya tersedia untuk PostgreSQL
+(--database-url, default dari env DATABASE_URL).
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+ENDPOINTS = (
+    'products.api_search',
+    'customers.api_search',
+    'sales.api_customer_segments',
+    'sales.api_checkout',
+)
+
+
+class RegisterSession:
+    """Klien HTTP keep-alive sederhana (stdlib) dengan penyimpanan cookie sesi Flask."""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.timeout = timeout
+        self.cookies = {}
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = self.connection_class(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # Koneksi keep-alive ditutup server, ulangi sekali dengan koneksi baru
+                self.conn.close()
+                self.conn = None
+                if attempt == 1:
+                    raise
+
+        for header, value in response.getheaders():
+            if header.lower() == 'set-cookie':
+                name, _, rest = value.partition('=')
+                self.cookies[name.strip()] = rest.split(';', 1)[0]
+        return response.status, data
+
+    def get_json(self, path):
+        status, data = self.request('GET', path)
+        return status, (json.loads(data) if status == 200 else None)
+
+    def login(self, username, password):
+        status, page = self.request('GET', '/auth/login')
+        match = re.search(rb'name="csrf_token" type="hidden" value="([^"]+)"', page)
+        form = {'username': username, 'password': password}
+        if match:
+            form['csrf_token'] = match.group(1).decode()
+        status, _ = self.request(
+            'POST', '/auth/login', body=urlencode(form),
+            headers={'Content-Type': 'application/x-www-form-urlencoded'}
+        )
+        # Login sukses = redirect ke dashboard (bukan kembali ke halaman login)
+        return status == 302 and 'session' in self.cookies
+
+
+class Recorder:
+    """Kumpulan hasil per endpoint (thread-safe)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.errors = {name: {} for name in ENDPOINTS}
+        self.sales_completed = 0
+
+    def record(self, endpoint, seconds, error=None):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            if error:
+                self.errors[endpoint][error] = self.errors[endpoint].get(error, 0) + 1
+
+
+class LockWaitSampler(threading.Thread):
+    """Sampling jumlah sesi PostgreSQL yang sedang menunggu lock selama load test."""
+
+    def __init__(self, database_url, interval=0.5):
+        super().__init__(daemon=True)
+        self.database_url = database_url
+        self.interval = interval
+        self.samples = []
+        self.stop_event = threading.Event()
+        self.error = None
+
+    def run(self):
+        from sqlalchemy import create_engine, text
+        try:
+            engine = create_engine(self.database_url)
+            with engine.connect() as conn:
+                while not self.stop_event.is_set():
+                    waiting = conn.execute(text(
+                        "SELECT COUNT(*) FROM pg_stat_activity "
+                        "WHERE wait_event_type = 'Lock' AND datname = current_database()"
+                    )).scalar()
+                    self.samples.append(int(waiting))
+                    self.stop_event.wait(self.interval)
+            engine.dispose()
+        except Exception as e:  # Sampler tidak boleh menggagalkan load test
+            self.error = str(e)
+
+    def summary(self):
+        if self.error:
+            return {'available': False, 'reason': self.error}
+        if not self.samples:
+            return {'available': False, 'reason': 'tidak ada sampel'}
+        waiting = [s for s in self.samples if s > 0]
+        return {
+            'available': True,
+            'samples': len(self.samples),
+            'samples_with_waits': len(waiting),
+            'max_waiting_sessions': max(self.samples),
+            'avg_waiting_sessions': round(sum(self.samples) / len(self.samples), 3)
+        }
+
+
+def discover_catalog(session):
+    """Kumpulkan produk & pelanggan lewat API pencarian yang sama dengan POS."""
+    products, customers = {}, {}
+    for letter in 'aiueonrs':
+        status, data = session.get_json(f'/products/api/search?{urlencode({"q": letter})}')
+        for p in data or []:
+            products[p['id']] = p
+        status, data = session.get_json(f'/customers/api/search?{urlencode({"q": letter})}')
+        for c in data or []:
+            customers[c['id']] = c
+    return list(products.values()), list(customers.values())
+
+
+def timed(recorder, endpoint, func):
+    start = time.perf_counter()
+    try:
+        status, payload = func()
+    except Exception as e:
+        recorder.record(endpoint, time.perf_counter() - start, error=type(e).__name__)
+        return None, None
+    error = None if status == 200 else f'HTTP {status}'
+    recorder.record(endpoint, time.perf_counter() - start, error=error)
+    return status, payload
+
+
+def run_register(args, products, customers, recorder, deadline, seed):
+    rng = random.Random(seed)
+    session = RegisterSession(args.base_url)
+    if not session.login(args.username, args.password):
+        with recorder.lock:
+            recorder.errors['sales.api_checkout']['login gagal'] = \
+                recorder.errors['sales.api_checkout'].get('login gagal', 0) + 1
+        return
+
+    while time.time() < deadline:
+        # 1. Scan/ketik produk: satu request per keystroke (3-6 huruf pertama)
+        cart = rng.sample(products, min(len(products), rng.randint(1, args.max_items)))
+        for product in cart:
+            typed = product['name'][:rng.randint(3, 6)]
+            for i in range(1, len(typed) + 1):
+                timed(recorder, 'products.api_search',
+                      lambda q=typed[:i]: session.get_json(f'/products/api/search?{urlencode({"q": q})}'))
+
+        # 2. Cari pelanggan (2-4 huruf) lalu 3. ambil segmen & promo
+        customer = rng.choice(customers)
+        typed = customer['name'][:rng.randint(2, 4)]
+        for i in range(1, len(typed) + 1):
+            timed(recorder, 'customers.api_search',
+                  lambda q=typed[:i]: session.get_json(f'/customers/api/search?{urlencode({"q": q})}'))
+        timed(recorder, 'sales.api_customer_segments',
+              lambda: session.get_json(f'/sales/api/customer-segments/{customer["id"]}'))
+
+        # 4. Checkout
+        payload = json.dumps({
+            'customer_id': customer['id'],
+            'items': [{'product_id': p['id'], 'quantity': args.quantity} for p in cart],
+            'payment_method': 'cash',
+            'notes': 'loadtest'
+        })
+        status, _ = timed(recorder, 'sales.api_checkout', lambda: session.request(
+            'POST', '/sales/api/checkout', body=payload, headers={'Content-Type': 'application/json'}
+        ))
+        if status == 200:
+            with recorder.lock:
+                recorder.sales_completed += 1
+
+        if args.think_time:
+            time.sleep(rng.uniform(0, args.think_time))
+
+
+def percentile(sorted_values, pct):
+    """Percentile metode nearest-rank."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def build_report(args, recorder, elapsed, lock_summary):
+    endpoints = {}
+    for name in ENDPOINTS:
+        values = sorted(recorder.latencies[name])
+        errors = sum(recorder.errors[name].values())
+        endpoints[name] = {
+            'requests': len(values),
+            'throughput_rps': round(len(values) / elapsed, 2),
+            'p50_ms': round(percentile(values, 50) * 1000, 2) if values else None,
+            'p95_ms': round(percentile(values, 95) * 1000, 2) if values else None,
+            'p99_ms': round(percentile(values, 99) * 1000, 2) if values else None,
+            'max_ms': round(values[-1] * 1000, 2) if values else None,
+            'errors': errors,
+            'error_rate': round(errors / len(values), 4) if values else 0,
+            'error_reasons': recorder.errors[name]
+        }
+
+    return {
+        'config': {
+            'base_url': args.base_url,
+            'registers': args.registers,
+            'duration_s': args.duration,
+            'max_items': args.max_items,
+            'quantity': args.quantity,
+            'think_time_s': args.think_time,
+            'seed': args.seed
+        },
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'elapsed_s': round(elapsed, 2),
+        'sales_completed': recorder.sales_completed,
+        'sales_per_second': round(recorder.sales_completed / elapsed, 2),
+        'endpoints': endpoints,
+        'lock_waits': lock_summary
+    }
+
+
+def print_report(report):
+    print("=" * 96)
+    print(f"🧾 {report['sales_completed']} transaksi selesai dalam {report['elapsed_s']} detik "
+          f"({report['sales_per_second']} transaksi/detik, {report['config']['registers']} register)")
+    print("-" * 96)
+    print(f"{'Endpoint':<30}{'Req':>8}{'Req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'Error':>9}  Alasan")
+    for name, ep in report['endpoints'].items():
+        reasons = ', '.join(f'{k}: {v}' for k, v in ep['error_reasons'].items()) or '-'
+        print(f"{name:<30}{ep['requests']:>8}{ep['throughput_rps']:>9}{ep['p50_ms'] or 0:>9}"
+              f"{ep['p95_ms'] or 0:>9}{ep['p99_ms'] or 0:>9}{ep['error_rate'] * 100:>8.1f}%  {reasons}")
+    print("-" * 96)
+    locks = report['lock_waits']
+    if locks.get('available'):
+        print(f"🔒 Lock wait: maks {locks['max_waiting_sessions']} sesi, rata-rata {locks['avg_waiting_sessions']}, "
+              f"{locks['samples_with_waits']}/{locks['samples']} sampel ada yang menunggu")
+    else:
+        print(f"🔒 Lock wait: tidak tersedia ({locks.get('reason')})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test alur kasir POS.')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--registers', type=int, default=4, help='Jumlah kasir (thread) paralel')
+    parser.add_argument('--duration', type=int, default=30, help='Durasi test (detik)')
+    parser.add_argument('--username', default='kasir')
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--max-items', type=int, default=5, help='Maks jenis produk per transaksi')
+    parser.add_argument('--quantity', type=int, default=1, help='Qty per item (kecil agar stok tidak cepat habis)')
+    parser.add_argument('--think-time', type=float, default=0.0, help='Jeda acak maks antar transaksi (detik)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'),
+                        help='Untuk sampling lock wait (PostgreSQL)')
+    parser.add_argument('--output', default='loadtest_results.json')
+    args = parser.parse_args()
+
+    setup = RegisterSession(args.base_url)
+    if not setup.login(args.username, args.password):
+        parser.error(f'Login sebagai "{args.username}" gagal di {args.base_url}')
+    products, customers = discover_catalog(setup)
+    if not products or not customers:
+        parser.error('Produk/pelanggan tidak ditemukan. Jalankan "flask seed-db" terlebih dahulu.')
+    print(f"🚀 {args.registers} register, {args.duration} detik, "
+          f"{len(products)} produk & {len(customers)} pelanggan sampel")
+
+    database_url = args.database_url or ''
+    if database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+    sampler = None
+    if database_url.startswith('postgresql'):
+        sampler = LockWaitSampler(database_url)
+        sampler.start()
+
+    recorder = Recorder()
+    start = time.time()
+    deadline = start + args.duration
+    threads = [
+        threading.Thread(target=run_register, args=(args, products, customers, recorder, deadline, args.seed + i))
+        for i in range(args.registers)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+
+    if sampler:
+        sampler.stop_event.set()
+        sampler.join()
+        lock_summary = sampler.summary()
+    else:
+        lock_summary = {'available': False, 'reason': 'hanya didukung untuk PostgreSQL'}
+
+    report = build_report(args, recorder, elapsed, lock_summary)
+    print_report(report)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write('\n')
+    print(f"💾 Hasil disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
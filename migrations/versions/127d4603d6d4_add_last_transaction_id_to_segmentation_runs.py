@@ -0,0 +1,33 @@
+"""add last transaction id to segmentation runs
+
+Total diskon per segmen tidak lagi ditambah saat checkout: snapshot menyimpan batas
+transaksi (id terbesar yang sudah dihitung) dan sisanya dijumlahkan saat dibaca.
+Run lama sudah diperbarui inkremental s/d migrasi ini, jadi batasnya diisi id transaksi terakhir.
+
+Revision ID: 127d4603d6d4
+Revises: 70c144744f98
+Create Date: 2026-10-19 19:42:08.316540
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '127d4603d6d4'
+down_revision = '70c144744f98'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('segmentation_runs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_transaction_id', sa.Integer(), nullable=True))
+
+    op.execute('UPDATE segmentation_runs SET last_transaction_id = '
+               '(SELECT COALESCE(MAX(id), 0) FROM transactions)')
+
+
+def downgrade():
+    with op.batch_alter_table('segmentation_runs', schema=None) as batch_op:
+        batch_op.drop_column('last_transaction_id')
@@ -0,0 +1,261 @@
+"""monthly partitioning for transactions
+
+transaction_items mendapat transaction_created_at (salinan created_at transaksi induk) dan foreign
+key komposit (transaction_id, transaction_created_at) -> transactions (id, created_at).
+
+PostgreSQL (>= 12): kedua tabel dibangun ulang sebagai tabel terpartisi RANGE per bulan
+(transactions per created_at, transaction_items per transaction_created_at) dengan primary key
+(id, kunci partisi), partisi bulanan dari bulan transaksi tertua s/d FUTURE_MONTHS ke depan, dan
+partisi default sebagai penampung. Data disalin dari tabel lama; sequence id dipakai ulang.
+uq_transactions_id_created_at di model diwakili primary key (id, created_at) tersebut; partisi,
+FK turunan per partisi, dan constraint itu dikecualikan dari autogenerate lewat
+utils/partitions.include_object. Diuji upgrade -> downgrade -> upgrade di PostgreSQL 16.
+Partisi bulan berikutnya dibuat `flask create-partitions` (utils/partitions.py).
+
+SQLite: tanpa partisi, hanya kolom dan constraint baru lewat batch (recreate tabel).
+Database lain (MySQL): tanpa partisi, kolom dan constraint baru lewat ALTER TABLE; nama FK lama
+yang diberi database (mis. transaction_items_ibfk_1) dibaca lewat inspector.
+
+Revision ID: 70c144744f98
+Revises: e661a049aca8
+Create Date: 2026-10-19 17:06:35.715178
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '70c144744f98'
+down_revision = 'e661a049aca8'
+branch_labels = None
+depends_on = None
+
+# FK transaction_id dibuat tanpa nama di migrasi awal: PostgreSQL memberi nama default,
+# SQLite dinamai lewat naming_convention saat batch (recreate tabel)
+SQLITE_NAMING = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+SQLITE_FK_NAME = 'fk_transaction_items_transaction_id_transactions'
+FK_NAME = 'fk_transaction_items_transaction'
+
+PARTITIONED_TABLES = (('transactions', 'created_at'), ('transaction_items', 'transaction_created_at'))
+FUTURE_MONTHS = 3
+
+TRANSACTION_COLUMNS = 'id, customer_id, user_id, total_amount, discount_amount, payment_method, notes, created_at'
+ITEM_COLUMNS = 'id, transaction_id, product_id, quantity, price'
+
+
+def _add_month(month, count=1):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _transaction_columns(id_default, created_nullable):
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text(f"nextval('{id_default}'::regclass)"), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('total_amount', sa.BigInteger(), nullable=False),
+        sa.Column('discount_amount', sa.BigInteger(), nullable=True),
+        sa.Column('payment_method', sa.String(length=20), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=created_nullable),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    ]
+
+
+def _item_columns(id_default):
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text(f"nextval('{id_default}'::regclass)"), nullable=False),
+        sa.Column('transaction_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('price', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    ]
+
+
+def _set_aside(suffix):
+    """
+    Ganti nama tabel lama (dan index primary key-nya) dan lepas foreign key-nya, agar nama asli
+    tabel dan constraint (mis. transactions_customer_id_fkey) bisa dipakai tabel baru.
+    """
+    bind = op.get_bind()
+    sequences = {
+        table: bind.execute(sa.text(f"SELECT pg_get_serial_sequence('{table}', 'id')")).scalar()
+        for table, _ in PARTITIONED_TABLES
+    }
+    for table, _ in reversed(PARTITIONED_TABLES):
+        foreign_keys = bind.execute(sa.text(
+            "SELECT conname FROM pg_constraint "
+            "WHERE conrelid = CAST(:table AS regclass) AND contype = 'f' AND conparentid = 0"
+        ), {'table': table}).scalars().all()
+        for name in foreign_keys:
+            op.drop_constraint(name, table, type_='foreignkey')
+        op.rename_table(table, f'{table}_{suffix}')
+        op.execute(f'ALTER INDEX {table}_pkey RENAME TO {table}_{suffix}_pkey')
+    return sequences
+
+
+def _finish_copy(sequences, suffix):
+    """Pindahkan kepemilikan sequence ke tabel baru, hapus tabel lama, perbarui statistik planner."""
+    for table, _ in PARTITIONED_TABLES:
+        op.execute(f'ALTER SEQUENCE {sequences[table]} OWNED BY {table}.id')
+    for table, _ in reversed(PARTITIONED_TABLES):
+        op.execute(f'DROP TABLE {table}_{suffix} CASCADE')
+    for table, _ in PARTITIONED_TABLES:
+        op.execute(f'ANALYZE {table}')
+
+
+def _upgrade_postgresql():
+    bind = op.get_bind()
+    op.execute("UPDATE transactions SET created_at = timezone('utc', now()) WHERE created_at IS NULL")
+    sequences = _set_aside('unpartitioned')
+
+    op.create_table('transactions',
+        *_transaction_columns(sequences['transactions'], created_nullable=False),
+        sa.PrimaryKeyConstraint('id', 'created_at'),
+        postgresql_partition_by='RANGE (created_at)'
+    )
+    op.create_table('transaction_items',
+        *_item_columns(sequences['transaction_items']),
+        sa.Column('transaction_created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['transaction_id', 'transaction_created_at'],
+                                ['transactions.id', 'transactions.created_at'],
+                                name=FK_NAME, ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id', 'transaction_created_at'),
+        postgresql_partition_by='RANGE (transaction_created_at)'
+    )
+
+    oldest = bind.execute(sa.text('SELECT MIN(created_at) FROM transactions_unpartitioned')).scalar()
+    this_month = date.today().replace(day=1)
+    month = min(oldest.date().replace(day=1), this_month) if oldest else this_month
+    while month <= _add_month(this_month, FUTURE_MONTHS):
+        for table, _ in PARTITIONED_TABLES:
+            op.execute(f"CREATE TABLE {table}_y{month:%Y}m{month:%m} PARTITION OF {table} "
+                       f"FOR VALUES FROM ('{month}') TO ('{_add_month(month)}')")
+        month = _add_month(month)
+    for table, _ in PARTITIONED_TABLES:
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+    op.execute(f'INSERT INTO transactions ({TRANSACTION_COLUMNS}) '
+               f'SELECT {TRANSACTION_COLUMNS} FROM transactions_unpartitioned')
+    op.execute(f'INSERT INTO transaction_items ({ITEM_COLUMNS}, transaction_created_at) '
+               f'SELECT {", ".join("i." + c for c in ITEM_COLUMNS.split(", "))}, t.created_at '
+               f'FROM transaction_items_unpartitioned i '
+               f'JOIN transactions_unpartitioned t ON t.id = i.transaction_id')
+    _finish_copy(sequences, 'unpartitioned')
+
+
+def _downgrade_postgresql():
+    sequences = _set_aside('partitioned')
+
+    op.create_table('transactions',
+        *_transaction_columns(sequences['transactions'], created_nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('transaction_items',
+        *_item_columns(sequences['transaction_items']),
+        sa.ForeignKeyConstraint(['transaction_id'], ['transactions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(f'INSERT INTO transactions ({TRANSACTION_COLUMNS}) '
+               f'SELECT {TRANSACTION_COLUMNS} FROM transactions_partitioned')
+    op.execute(f'INSERT INTO transaction_items ({ITEM_COLUMNS}) '
+               f'SELECT {ITEM_COLUMNS} FROM transaction_items_partitioned')
+    _finish_copy(sequences, 'partitioned')
+
+
+def _transaction_fk_name(bind):
+    for foreign_key in sa.inspect(bind).get_foreign_keys('transaction_items'):
+        if foreign_key['referred_table'] == 'transactions' \
+                and foreign_key['constrained_columns'] == ['transaction_id']:
+            return foreign_key['name']
+    raise RuntimeError('Foreign key transaction_items.transaction_id tidak ditemukan')
+
+
+def _backfill_created_at():
+    op.execute("UPDATE transactions SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+
+
+def _backfill_transaction_created_at():
+    op.execute('UPDATE transaction_items SET transaction_created_at = '
+               '(SELECT created_at FROM transactions WHERE transactions.id = transaction_items.transaction_id)')
+
+
+def _upgrade_generic(bind):
+    _backfill_created_at()
+    op.alter_column('transactions', 'created_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_unique_constraint('uq_transactions_id_created_at', 'transactions', ['id', 'created_at'])
+
+    op.add_column('transaction_items', sa.Column('transaction_created_at', sa.DateTime(), nullable=True))
+    _backfill_transaction_created_at()
+    op.alter_column('transaction_items', 'transaction_created_at', existing_type=sa.DateTime(), nullable=False)
+    op.drop_constraint(_transaction_fk_name(bind), 'transaction_items', type_='foreignkey')
+    op.create_foreign_key(FK_NAME, 'transaction_items', 'transactions',
+                          ['transaction_id', 'transaction_created_at'], ['id', 'created_at'],
+                          ondelete='CASCADE')
+
+
+def _downgrade_generic():
+    op.drop_constraint(FK_NAME, 'transaction_items', type_='foreignkey')
+    # Tanpa nama: database memberi nama default seperti di migrasi awal
+    op.create_foreign_key(None, 'transaction_items', 'transactions', ['transaction_id'], ['id'],
+                          ondelete='CASCADE')
+    op.drop_column('transaction_items', 'transaction_created_at')
+
+    op.drop_constraint('uq_transactions_id_created_at', 'transactions', type_='unique')
+    op.alter_column('transactions', 'created_at', existing_type=sa.DateTime(), nullable=True)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        _upgrade_postgresql()
+        return
+    if bind.dialect.name != 'sqlite':
+        _upgrade_generic(bind)
+        return
+
+    _backfill_created_at()
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.alter_column('created_at',
+               existing_type=sa.DATETIME(),
+               nullable=False)
+        batch_op.create_unique_constraint('uq_transactions_id_created_at', ['id', 'created_at'])
+
+    with op.batch_alter_table('transaction_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('transaction_created_at', sa.DateTime(), nullable=True))
+    _backfill_transaction_created_at()
+
+    with op.batch_alter_table('transaction_items', schema=None, naming_convention=SQLITE_NAMING) as batch_op:
+        batch_op.alter_column('transaction_created_at',
+               existing_type=sa.DateTime(),
+               nullable=False)
+        batch_op.drop_constraint(SQLITE_FK_NAME, type_='foreignkey')
+        batch_op.create_foreign_key(FK_NAME, 'transactions',
+                                    ['transaction_id', 'transaction_created_at'], ['id', 'created_at'],
+                                    ondelete='CASCADE')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        _downgrade_postgresql()
+        return
+    if dialect != 'sqlite':
+        _downgrade_generic()
+        return
+
+    with op.batch_alter_table('transaction_items', schema=None) as batch_op:
+        batch_op.drop_constraint(FK_NAME, type_='foreignkey')
+        batch_op.create_foreign_key(SQLITE_FK_NAME, 'transactions', ['transaction_id'], ['id'], ondelete='CASCADE')
+        batch_op.drop_column('transaction_created_at')
+
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_transactions_id_created_at', type_='unique')
+        batch_op.alter_column('created_at',
+               existing_type=sa.DATETIME(),
+               nullable=True)
@@ -10,24 +10,37 @@ class CustomerSegment(db.Model):
     color = db.Column(db.String(7), default='#007bff')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # Backref 'memberships' dan 'promotion' otomatis terbuat dari tabel lain
+    # Backref 'memberships' dan 'promotions' otomatis terbuat dari tabel lain
     
     def __repr__(self):
         return f'<CustomerSegment {self.segment_name}>'
 
 class Promotion(db.Model):
+    """
+    Satu aturan diskon untuk segmen. Satu segmen boleh punya beberapa aturan (mis. bertingkat
+    menurut minimum belanja); saat checkout berlaku diskon terbesar dari aturan yang memenuhi syarat.
+    """
     __tablename__ = 'promotions'
     
     id = db.Column(db.Integer, primary_key=True)
     # Hapus duplikasi column segment_id, sisakan satu yang benar
-    segment_id = db.Column(db.Integer, db.ForeignKey('customer_segments.id', ondelete='CASCADE'), unique=True, nullable=False)
+    segment_id = db.Column(db.Integer, db.ForeignKey('customer_segments.id', ondelete='CASCADE'), nullable=False, index=True)
     
     promotion_type = db.Column(db.String(50), nullable=False)
-    # Gunakan Numeric agar perhitungan diskon akurat
+    # Persen (boleh dua desimal) atau rupiah untuk diskon tetap; dibulatkan saat kompilasi aturan
     promotion_value = db.Column(db.Numeric(10, 2), nullable=False) 
     description = db.Column(db.String(255))
     
-    segment = db.relationship('CustomerSegment', backref=db.backref('promotion', uselist=False))
+    # Syarat aturan (kosong = tanpa syarat)
+    min_spend = db.Column(db.BigInteger)      # minimum subtotal keranjang (rupiah)
+    category = db.Column(db.String(50))       # diskon hanya dihitung dari item kategori ini
+    start_date = db.Column(db.Date)           # berlaku mulai (inklusif)
+    end_date = db.Column(db.Date)             # berlaku sampai (inklusif)
+    
+    # Penanda perubahan untuk cache aturan terkompilasi (lihat utils/pricing.py)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    segment = db.relationship('CustomerSegment', backref=db.backref('promotions', lazy=True))
     
     def __repr__(self):
         return f'<Promotion Segment {self.segment_id}>'
@@ -50,4 +63,62 @@ class CustomerSegmentMembership(db.Model):
     __table_args__ = (db.UniqueConstraint('customer_id', 'segment_id'),)
     
     def __repr__(self):
-        return f'<Membership {self.customer_id}-{self.segment_id}>'
\ No newline at end of file
+        return f'<Membership {self.customer_id}-{self.segment_id}>'
+
+class SegmentationRun(db.Model):
+    __tablename__ = 'segmentation_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    method = db.Column(db.String(30), nullable=False, default='kmeans')
+    n_clusters = db.Column(db.Integer)
+    silhouette_score = db.Column(db.Float)
+    # Kolom fitur yang dipakai engine, dipisah koma (mis. 'recency,frequency,monetary,avg_basket')
+    feature_columns = db.Column(db.Text)
+    customer_count = db.Column(db.Integer, default=0)
+    # id transaksi terbesar yang sudah masuk discount_total snapshot (lihat utils/segment_stats.py)
+    last_transaction_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    statistics = db.relationship('SegmentStatistic', backref='run', lazy=True, cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<SegmentationRun {self.id} {self.method}>'
+
+class SegmentStatistic(db.Model):
+    """Ringkasan per segmen untuk satu run segmentasi (dibaca dashboard tanpa scan transaksi)."""
+    __tablename__ = 'segment_statistics'
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('segmentation_runs.id', ondelete='CASCADE'), nullable=False)
+    segment_id = db.Column(db.Integer, db.ForeignKey('customer_segments.id', ondelete='CASCADE'), nullable=False)
+    customer_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Statistik RFM saat run dijalankan (None untuk segmen tanpa transaksi)
+    recency_mean = db.Column(db.Float)
+    recency_min = db.Column(db.Float)
+    recency_max = db.Column(db.Float)
+    recency_std = db.Column(db.Float)
+    frequency_mean = db.Column(db.Float)
+    frequency_min = db.Column(db.Float)
+    frequency_max = db.Column(db.Float)
+    frequency_std = db.Column(db.Float)
+    monetary_mean = db.Column(db.Float)
+    monetary_min = db.Column(db.Float)
+    monetary_max = db.Column(db.Float)
+    monetary_std = db.Column(db.Float)
+
+    # Titik pusat cluster dalam satuan asli (hari, kali, rupiah)
+    centroid_recency = db.Column(db.Float)
+    centroid_frequency = db.Column(db.Float)
+    centroid_monetary = db.Column(db.Float)
+
+    # Diskon s/d run.last_transaction_id; transaksi sesudahnya dijumlahkan saat dibaca
+    discount_total = db.Column(db.BigInteger, nullable=False, default=0)  # rupiah
+    discount_count = db.Column(db.Integer, nullable=False, default=0)
+
+    segment = db.relationship('CustomerSegment')
+
+    __table_args__ = (db.UniqueConstraint('run_id', 'segment_id'),)
+
+    def __repr__(self):
+        return f'<SegmentStatistic run {self.run_id} segment {self.segment_id}>'
@@ -11,6 +11,10 @@ class Customer(db.Model):
     address = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # "Belanjaan biasa" hasil job refresh-baskets: "product_id:qty,product_id:qty,..." urut peringkat.
+    # Disimpan ringkas di baris pelanggan agar ikut terbaca bersama data pelanggan di POS.
+    usual_basket = db.Column(db.String(255))
+
     # CATATAN: 
     # Relasi 'transactions' sudah otomatis ada karena backref di model Transaction
     # Relasi 'segment_memberships' sudah otomatis ada karena backref di model CustomerSegmentMembership
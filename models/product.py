@@ -1,4 +1,5 @@
 from app import db
+from datetime import datetime
 
 class Product(db.Model):
     __tablename__ = 'products'
@@ -8,8 +9,8 @@ class Product(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     
-    # PENTING: Gunakan Numeric untuk uang
-    price = db.Column(db.Numeric(12, 2), nullable=False) 
+    # Uang disimpan sebagai rupiah utuh (lihat utils/money.py)
+    price = db.Column(db.BigInteger, nullable=False) 
     
     stock = db.Column(db.Integer, default=0)
     category = db.Column(db.String(50))
@@ -18,4 +19,43 @@ class Product(db.Model):
     # Relasi 'transaction_items' akan otomatis ada via backref di TransactionItem
     
     def __repr__(self):
-        return f'<Product {self.name}>'
\ No newline at end of file
+        return f'<Product {self.name}>'
+
+
+class ProductAssociation(db.Model):
+    """
+    Jumlah transaksi yang memuat `product_id` dan `related_product_id` bersamaan
+    (matriks co-occurrence sparse), dengan peringkat per produk untuk saran "sering dibeli bersama".
+    Disimpan dua arah (A->B dan B->A) agar lookup per produk cukup satu range scan index.
+    """
+    __tablename__ = 'product_associations'
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'related_product_id', name='uq_product_association_pair'),
+        db.Index('ix_product_associations_product_rank', 'product_id', 'rank'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    related_product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    co_count = db.Column(db.Integer, nullable=False)
+    rank = db.Column(db.Integer, nullable=False)  # 1 = paling sering dibeli bersama
+
+    related_product = db.relationship('Product', foreign_keys=[related_product_id])
+
+    def __repr__(self):
+        return f'<ProductAssociation {self.product_id}->{self.related_product_id} ({self.co_count})>'
+
+
+class ProductAssociationBuild(db.Model):
+    """Riwayat pembaruan index co-occurrence; `last_transaction_id` = batas untuk refresh inkremental berikutnya."""
+    __tablename__ = 'product_association_builds'
+
+    id = db.Column(db.Integer, primary_key=True)
+    last_transaction_id = db.Column(db.Integer, nullable=False)
+    transaction_count = db.Column(db.Integer, default=0)  # transaksi baru yang diproses build ini
+    product_count = db.Column(db.Integer, default=0)      # produk yang daftar relasinya ditulis ulang
+    full_rebuild = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ProductAssociationBuild {self.id} s/d transaksi {self.last_transaction_id}>'
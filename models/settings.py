@@ -8,4 +8,14 @@ class AppSetting(db.Model):
     primary_color = db.Column(db.String(7), default="#0d6efd") # Default Bootstrap Blue
     
     def __repr__(self):
-        return f'<AppSetting {self.app_name}>'
\ No newline at end of file
+        return f'<AppSetting {self.app_name}>'
+
+class DomainVersion(db.Model):
+    """Penghitung versi per domain data (segments, promotions, products), dasar ETag API JSON."""
+    __tablename__ = 'domain_versions'
+
+    name = db.Column(db.String(30), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DomainVersion {self.name}={self.version}>'
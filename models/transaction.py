@@ -3,18 +3,21 @@ from datetime import datetime
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    # (id, created_at) dirujuk transaction_items; di PostgreSQL pasangan ini menjadi primary key
+    # tabel terpartisi per bulan (lihat utils/partitions.py)
+    __table_args__ = (db.UniqueConstraint('id', 'created_at', name='uq_transactions_id_created_at'),)
     
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'))
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     
-    # Tipe data keuangan
-    total_amount = db.Column(db.Numeric(12, 2), nullable=False)
-    discount_amount = db.Column(db.Numeric(12, 2), default=0.0)
+    # Tipe data keuangan: rupiah utuh (lihat utils/money.py)
+    total_amount = db.Column(db.BigInteger, nullable=False)
+    discount_amount = db.Column(db.BigInteger, default=0)
     
     payment_method = db.Column(db.String(20), default='cash')
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # kunci partisi
     
     # Relasi ke Parent
     # backref='transactions' membuat customer.transactions bisa diakses
@@ -29,13 +32,21 @@ class Transaction(db.Model):
 
 class TransactionItem(db.Model):
     __tablename__ = 'transaction_items'
+    __table_args__ = (
+        db.ForeignKeyConstraint(['transaction_id', 'transaction_created_at'],
+                                ['transactions.id', 'transactions.created_at'],
+                                name='fk_transaction_items_transaction', ondelete='CASCADE'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id', ondelete='CASCADE'), nullable=False)
+    transaction_id = db.Column(db.Integer, nullable=False)
+    # Salinan created_at transaksi induk (diisi otomatis lewat relasi): kunci partisi
+    # yang sama dengan transactions agar item ikut terpangkas per bulan
+    transaction_created_at = db.Column(db.DateTime, nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     
     quantity = db.Column(db.Integer, nullable=False)
-    price = db.Column(db.Numeric(12, 2), nullable=False)
+    price = db.Column(db.BigInteger, nullable=False)  # rupiah utuh
     
     # Relasi ke Product
     product = db.relationship('Product', backref=db.backref('transaction_items', lazy='dynamic'))
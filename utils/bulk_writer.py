@@ -0,0 +1,66 @@
+import csv
+import io
+from sqlalchemy import insert, text
+
+# Ukuran batch default untuk executemany / COPY
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def bulk_insert(db, table, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Tulis banyak baris sekaligus tanpa membuat objek ORM.
+
+    `columns` adalah dict nama_kolom -> array numpy / list (panjang sama).
+    PostgreSQL memakai COPY FROM STDIN, database lain memakai Core executemany per chunk.
+    Mengembalikan jumlah baris yang ditulis. Commit diserahkan ke pemanggil.
+    """
+    table = getattr(table, '__table__', table)
+    names = list(columns)
+    values = [col.tolist() if hasattr(col, 'tolist') else list(col) for col in columns.values()]
+    total = len(values[0]) if values else 0
+    if total == 0:
+        return 0
+
+    use_copy = db.session.get_bind().dialect.name == 'postgresql'
+
+    for start in range(0, total, chunk_size):
+        chunk = [v[start:start + chunk_size] for v in values]
+        if use_copy:
+            _copy_chunk(db, table, names, chunk)
+        else:
+            rows = [dict(zip(names, row)) for row in zip(*chunk)]
+            db.session.execute(insert(table), rows)
+
+    return total
+
+
+def _copy_chunk(db, table, names, chunk):
+    """COPY satu chunk via koneksi DBAPI (psycopg2) milik session, dalam transaksi yang sama."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(zip(*chunk))
+    buffer.seek(0)
+
+    raw_connection = db.session.connection().connection
+    cursor = raw_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def sync_sequence(db, table, column='id'):
+    """
+    Samakan sequence PostgreSQL setelah insert dengan ID eksplisit.
+    SQLite/MySQL otomatis mengikuti nilai ID terbesar, jadi tidak perlu apa-apa.
+    """
+    table = getattr(table, '__table__', table)
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    db.session.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table.name}', '{column}'), "
+        f"COALESCE((SELECT MAX({column}) FROM {table.name}), 1))"
+    ))
@@ -0,0 +1,248 @@
+"""
+Ekspor laporan CSV / XLSX secara streaming.
+
+Baris dibaca per potongan (lihat `iter_query_chunks`) dan langsung ditulis ke response, sehingga
+memori tetap konstan berapa pun panjang rentang tanggalnya. XLSX ditulis sendiri sebagai
+SpreadsheetML minimal di dalam zip yang di-stream (zipfile mendukung tujuan tidak seekable),
+tanpa library spreadsheet yang harus menyimpan seluruh workbook di memori atau file sementara.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime, date
+from decimal import Decimal
+from xml.sax.saxutils import escape
+from flask import Response, stream_with_context
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+# Jumlah baris per fetch dari cursor database (dan per potongan yang ditulis ke response)
+EXPORT_CHUNK_SIZE = 2000
+
+# Batas baris satu sheet Excel (termasuk header)
+XLSX_MAX_ROWS = 1048576
+
+# Awalan teks yang dijalankan sebagai formula saat CSV dibuka di Excel/LibreOffice (CSV injection).
+# XLSX aman: teks ditulis sebagai inlineStr, bukan formula.
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+_ILLEGAL_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Style 0 = default, 1 = tanggal + jam, 2 = tanggal, 3 = header tebal
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="2">'
+    '<numFmt numFmtId="164" formatCode="dd/mm/yyyy hh:mm"/>'
+    '<numFmt numFmtId="165" formatCode="dd/mm/yyyy"/>'
+    '</numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+class _StreamBuffer:
+    """Tujuan tulis ZipFile yang tidak seekable: menampung byte sampai diambil oleh generator."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_query_chunks(db, statement, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Jalankan `statement` dengan cursor server-side (stream_results di PostgreSQL/MySQL)
+    dan hasilkan baris per potongan `chunk_size`, tanpa memuat seluruh hasil ke memori.
+    """
+    result = db.session.execute(statement, execution_options={'yield_per': chunk_size})
+    for partition in result.partitions():
+        yield partition
+
+
+def _csv_safe(value):
+    """Teks isian pengguna (nama pelanggan, catatan) yang diawali karakter formula diberi awalan '."""
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(header, chunks):
+    """Generator byte CSV (UTF-8 dengan BOM agar terbaca benar di Excel), ditulis per potongan."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    for rows in chunks:
+        writer.writerows([_csv_safe(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _cell(ref, value, header=False):
+    if value is None:
+        return ''
+    if header:
+        return f'<c r="{ref}" s="3" t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        serial = (value - _EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c r="{ref}" s="1"><v>{serial:.10f}</v></c>'
+    if isinstance(value, date):
+        serial = (value - _EXCEL_EPOCH.date()).days
+        return f'<c r="{ref}" s="2"><v>{serial}</v></c>'
+    text = _ILLEGAL_XML_CHARS.sub('', str(value))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def stream_xlsx(header, chunks, sheet_name='Data'):
+    """
+    Generator byte file XLSX satu sheet. Setiap potongan baris ditulis ke entri zip worksheet
+    lalu byte yang sudah terkompresi langsung di-yield, sehingga memori tidak bertambah.
+    Jika data melebihi batas satu sheet Excel, pembacaan dari database dihentikan dan baris
+    terakhir sheet berisi keterangan bahwa ekspor terpotong (gunakan CSV untuk data sebesar itu).
+    """
+    columns = [_column_letter(i) for i in range(len(header))]
+    buffer = _StreamBuffer()
+
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _WORKBOOK.format(name=escape(sheet_name[:31])))
+        archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        archive.writestr('xl/styles.xml', _STYLES)
+        yield buffer.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            sheet.write(('<row r="1">' + ''.join(
+                _cell(f'{col}1', value, header=True) for col, value in zip(columns, header)
+            ) + '</row>').encode('utf-8'))
+
+            row_number = 1
+            truncated = False
+            for rows in chunks:
+                parts = []
+                for row in rows:
+                    # Baris terakhir sheet disisakan untuk keterangan terpotong
+                    if row_number >= XLSX_MAX_ROWS - 1:
+                        truncated = True
+                        break
+                    row_number += 1
+                    parts.append(f'<row r="{row_number}">' + ''.join(
+                        _cell(f'{col}{row_number}', value) for col, value in zip(columns, row)
+                    ) + '</row>')
+                sheet.write(''.join(parts).encode('utf-8'))
+                yield buffer.drain()
+                if truncated:
+                    break
+
+            if truncated:
+                # Hentikan cursor database; sisa baris tidak dibaca
+                close = getattr(chunks, 'close', None)
+                if close is not None:
+                    close()
+                row_number += 1
+                note = (f'Ekspor terpotong: hanya {row_number - 2:,} baris data pertama yang muat dalam '
+                        f'satu sheet Excel. Gunakan format CSV atau perkecil rentang tanggal.')
+                sheet.write(f'<row r="{row_number}">{_cell(f"A{row_number}", note)}</row>'.encode('utf-8'))
+
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
+
+
+def export_response(fmt, filename, header, chunks, sheet_name='Data'):
+    """Response streaming untuk `fmt` ('csv' / 'xlsx'); `filename` tanpa ekstensi."""
+    if fmt == 'xlsx':
+        body = stream_xlsx(header, chunks, sheet_name=sheet_name)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        body = stream_csv(header, chunks)
+        mimetype = 'text/csv'
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{fmt}"'}
+    )
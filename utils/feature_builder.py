@@ -0,0 +1,206 @@
+import threading
+from datetime import datetime
+from sqlalchemy import func, case
+from models.product import Product
+from models.transaction import Transaction, TransactionItem
+from utils.http_cache import domain_versions
+
+# Kolom RFM dasar, selalu ada di matriks (dipakai untuk deskripsi & pengurutan cluster)
+BASE_FEATURES = ('recency', 'frequency', 'monetary')
+
+# Fitur tambahan yang bisa dipilih engine segmentasi
+EXTRA_FEATURES = {
+    'avg_basket': 'Rata-rata nilai belanja per transaksi',
+    'items_per_tx': 'Rata-rata jumlah item per transaksi',
+    'discount_rate': 'Porsi diskon terhadap belanja kotor',
+    'discount_share': 'Porsi transaksi yang mendapat diskon',
+}
+
+# Pilihan khusus yang diperluas menjadi satu kolom `share:<kategori>` per kategori produk
+CATEGORY_SHARES = 'category_shares'
+CATEGORY_PREFIX = 'share:'
+
+_lock = threading.Lock()
+_cache = {}  # penanda data -> FeatureMatrix (hanya entri terakhir yang disimpan)
+
+
+class FeatureMatrix:
+    """
+    Matriks fitur lebar per pelanggan: baris = customer_ids, kolom = columns.
+    `values` (numpy padat) memuat RFM + EXTRA_FEATURES; `category_shares` (scipy.sparse CSR)
+    memuat kolom `share:<kategori>` sesudahnya, karena kebanyakan pelanggan hanya membeli
+    dari sedikit kategori.
+    """
+
+    def __init__(self, customer_ids, columns, values, category_shares, as_of):
+        self.customer_ids = customer_ids
+        self.columns = list(columns)
+        self.values = values
+        self.category_shares = category_shares
+        self.as_of = as_of
+
+    def select(self, columns):
+        """
+        Sub-matriks padat untuk kolom yang dipilih engine (urutan mengikuti `columns`).
+        Hanya kolom kategori yang dipilih yang diubah menjadi padat (StandardScaler/K-Means).
+        """
+        import numpy as np  # Lazy import: hanya dibutuhkan jalur analitik
+
+        missing = [c for c in columns if c not in self.columns]
+        if missing:
+            raise ValueError(f"Fitur tidak dikenal: {', '.join(missing)}")
+        dense_count = self.values.shape[1]
+        result = np.empty((len(self.customer_ids), len(columns)))
+        for i, column in enumerate(columns):
+            index = self.columns.index(column)
+            if index < dense_count:
+                result[:, i] = self.values[:, index]
+            else:
+                result[:, i] = self.category_shares[:, index - dense_count].toarray().ravel()
+        return result
+
+    def to_frame(self, columns=None):
+        """DataFrame pandas (customer_id + kolom fitur), format yang sama dengan KMeansService.get_rfm_data."""
+        import pandas as pd  # Lazy import: hanya dibutuhkan jalur analitik
+
+        columns = list(columns) if columns is not None else self.columns
+        df = pd.DataFrame(self.select(columns), columns=columns)
+        df.insert(0, 'customer_id', self.customer_ids)
+        for column in ('recency', 'frequency'):
+            if column in df:
+                df[column] = df[column].astype('int64')
+        return df
+
+
+def category_columns(db):
+    categories = db.session.query(Product.category)\
+        .filter(Product.category.isnot(None))\
+        .distinct()\
+        .order_by(Product.category)\
+        .all()
+    return [f'{CATEGORY_PREFIX}{category}' for (category,) in categories]
+
+
+def resolve_feature_columns(db, selected):
+    """
+    Ubah pilihan fitur dari form/CLI menjadi daftar kolom: RFM dasar + fitur tambahan yang valid,
+    dengan `category_shares` diperluas ke semua kategori produk.
+    """
+    columns = list(BASE_FEATURES)
+    for name in selected or []:
+        if name in EXTRA_FEATURES and name not in columns:
+            columns.append(name)
+    if CATEGORY_SHARES in (selected or []):
+        columns += category_columns(db)
+    return columns
+
+
+def build_feature_matrix(db, as_of=None):
+    """
+    Bangun matriks fitur semua pelanggan yang pernah bertransaksi (s/d `as_of`) dengan satu
+    query GROUP BY: item diagregasi per transaksi dulu (subquery), lalu transaksi per pelanggan.
+    Belanja per kategori diambil terpisah per (pelanggan, kategori), yang hanya mengembalikan
+    pasangan yang ada, dan disusun langsung menjadi matriks sparse.
+
+    Hasil di-cache per proses selama data transaksi dan katalog produk belum berubah (versi
+    domain 'products' naik saat kategori produk diubah), sehingga beberapa run segmentasi
+    berturut-turut (mis. mencoba jumlah cluster berbeda) tidak mengulang query.
+    """
+    import numpy as np  # Lazy import: hanya dibutuhkan jalur analitik
+    from scipy import sparse
+
+    now = as_of or datetime.now()
+    categories = [column[len(CATEGORY_PREFIX):] for column in category_columns(db)]
+    marker = db.session.query(func.max(Transaction.id), func.count(Transaction.id)).one()
+    products_version = domain_versions(('products',)).get('products')
+    cache_key = (tuple(marker), products_version, as_of or now.date(), tuple(categories))
+
+    with _lock:
+        cached = _cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    line_total = TransactionItem.quantity * TransactionItem.price
+    item_agg = db.session.query(
+        TransactionItem.transaction_id.label('transaction_id'),
+        func.sum(TransactionItem.quantity).label('item_count'),
+        func.sum(line_total).label('gross')
+    ).group_by(TransactionItem.transaction_id).subquery()
+
+    query = db.session.query(
+        Transaction.customer_id,
+        func.count(Transaction.id),
+        func.sum(Transaction.total_amount),
+        func.max(Transaction.created_at),
+        func.sum(Transaction.discount_amount),
+        func.sum(case((Transaction.discount_amount > 0, 1), else_=0)),
+        func.sum(item_agg.c.item_count),
+        func.sum(item_agg.c.gross)
+    ).outerjoin(item_agg, item_agg.c.transaction_id == Transaction.id)
+    if as_of is not None:
+        query = query.filter(Transaction.created_at <= as_of)
+    rows = query.group_by(Transaction.customer_id).order_by(Transaction.customer_id).all()
+
+    columns = list(BASE_FEATURES) + list(EXTRA_FEATURES) + [f'{CATEGORY_PREFIX}{c}' for c in categories]
+    if not rows:
+        return FeatureMatrix(np.array([], dtype=np.int64), columns,
+                             np.empty((0, len(BASE_FEATURES) + len(EXTRA_FEATURES))),
+                             sparse.csr_matrix((0, len(categories))), now)
+
+    customer_ids = np.array([r[0] for r in rows], dtype=np.int64)
+    last_purchase = np.array([r[3] for r in rows], dtype='datetime64[s]')
+    numeric = np.array([[float(v or 0) for v in (r[1], r[2], r[4], r[5], r[6], r[7])] for r in rows])
+    frequency, monetary, discount, discounted_tx, items, gross = (numeric[:, i] for i in range(6))
+
+    def ratio(numerator, denominator):
+        return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+    recency = (np.datetime64(now, 's') - last_purchase) // np.timedelta64(1, 'D')
+    values = np.column_stack([
+        recency.astype(float),
+        frequency,
+        monetary,
+        ratio(monetary, frequency),                  # avg_basket
+        ratio(items, frequency),                     # items_per_tx
+        ratio(discount, monetary + discount),        # discount_rate
+        ratio(discounted_tx, frequency),             # discount_share
+    ])
+
+    matrix = FeatureMatrix(customer_ids, columns, values,
+                           _category_share_matrix(db, customer_ids, gross, categories, as_of), now)
+    with _lock:
+        _cache.clear()
+        _cache[cache_key] = matrix
+    return matrix
+
+
+def _category_share_matrix(db, customer_ids, gross, categories, as_of):
+    """
+    Porsi belanja per kategori (CSR, baris = customer_ids, kolom = categories) dari satu query
+    GROUP BY (pelanggan, kategori): hanya sel bukan nol yang dibaca dan disimpan.
+    """
+    import numpy as np  # Lazy import: hanya dibutuhkan jalur analitik
+    from scipy import sparse
+
+    query = db.session.query(
+        Transaction.customer_id,
+        Product.category,
+        func.sum(TransactionItem.quantity * TransactionItem.price)
+    ).join(TransactionItem, TransactionItem.transaction_id == Transaction.id)\
+     .join(Product, Product.id == TransactionItem.product_id)\
+     .filter(Product.category.in_(categories))
+    if as_of is not None:
+        query = query.filter(Transaction.created_at <= as_of)
+    cells = query.group_by(Transaction.customer_id, Product.category).all()
+
+    column_of = {category: i for i, category in enumerate(categories)}
+    cells = [(customer_id, column_of[category], float(spend or 0))
+             for customer_id, category, spend in cells if customer_id is not None]
+    if not cells:
+        return sparse.csr_matrix((len(customer_ids), len(categories)))
+
+    cell_customers, cell_columns, spend = (np.array(part) for part in zip(*cells))
+    rows = np.searchsorted(customer_ids, cell_customers)
+    row_gross = gross[rows]
+    shares = np.divide(spend, row_gross, out=np.zeros_like(spend), where=row_gross > 0)
+    return sparse.csr_matrix((shares, (rows, cell_columns)), shape=(len(customer_ids), len(categories)))
@@ -0,0 +1,151 @@
+"""
+Penyimpanan matriks fitur hasil run segmentasi sebagai file .npy berversi.
+
+Setiap run ditulis ke direktori `run_<id>/` (customer_id, segment_id, features = [recency,
+frequency, monetary]), lalu pointer `LATEST` diganti secara atomik. Worker membuka file
+dengan mmap read-only, sehingga semua worker gunicorn berbagi page cache yang sama
+alih-alih masing-masing menjalankan query agregat dan menyimpan salinan di memori.
+"""
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from flask import current_app
+
+FEATURE_COLUMNS = ('recency', 'frequency', 'monetary')
+LATEST_FILE = 'LATEST'
+KEEP_VERSIONS = 3
+
+_lock = threading.Lock()
+_cache = {}  # run_id -> dict array (mmap), per proses
+
+
+def _store_dir():
+    return current_app.config['FEATURE_STORE_DIR']
+
+
+def export_run_features(db, run, now=None):
+    """
+    Tulis fitur RFM per anggota segmen untuk `run` (dipanggil setelah commit run segmentasi).
+    Recency pelanggan tanpa transaksi disimpan sebagai NaN.
+    """
+    import numpy as np  # Lazy import: hanya dibutuhkan jalur analitik
+    from utils.segment_stats import segment_rfm_query
+
+    now = now or datetime.now()
+    base = segment_rfm_query(db, now).subquery()
+    rows = db.session.query(base.c.customer_id, base.c.segment_id, base.c.recency,
+                            base.c.frequency, base.c.monetary)\
+        .order_by(base.c.segment_id, base.c.customer_id)\
+        .all()
+
+    customer_id = np.array([r.customer_id for r in rows], dtype=np.int64)
+    segment_id = np.array([r.segment_id for r in rows], dtype=np.int64)
+    features = np.array(
+        [(np.nan if r.recency is None else r.recency, r.frequency, float(r.monetary or 0)) for r in rows],
+        dtype=np.float64
+    ).reshape(len(rows), len(FEATURE_COLUMNS))
+
+    try:
+        return _write_version(run, now, customer_id, segment_id, features)
+    except OSError as e:
+        # Kegagalan tulis file tidak membatalkan run; endpoint kembali memakai query langsung
+        current_app.logger.warning('Gagal menulis feature store run %s: %s', run.id, e)
+        return None
+
+
+def _write_version(run, now, customer_id, segment_id, features):
+    import numpy as np
+
+    root = _store_dir()
+    os.makedirs(root, exist_ok=True)
+    version = f'run_{run.id}'
+    tmp_dir = os.path.join(root, f'.{version}.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    np.save(os.path.join(tmp_dir, 'customer_id.npy'), customer_id)
+    np.save(os.path.join(tmp_dir, 'segment_id.npy'), segment_id)
+    np.save(os.path.join(tmp_dir, 'features.npy'), features)
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump({'run_id': run.id, 'run_created_at': _run_marker(run),
+                   'method': run.method, 'as_of': now.isoformat(),
+                   'columns': list(FEATURE_COLUMNS), 'rows': len(customer_id)}, f)
+
+    final_dir = os.path.join(root, version)
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+
+    # Ganti pointer secara atomik: pembaca melihat versi lama atau baru, tidak pernah setengah jadi
+    pointer_tmp = os.path.join(root, f'.{LATEST_FILE}.tmp')
+    with open(pointer_tmp, 'w') as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(root, LATEST_FILE))
+
+    _prune_old_versions(root, keep=version)
+    return final_dir
+
+
+def _prune_old_versions(root, keep):
+    versions = sorted(
+        (name for name in os.listdir(root) if name.startswith('run_') and name != keep),
+        key=lambda name: int(name[4:]) if name[4:].isdigit() else 0
+    )
+    for name in versions[:max(len(versions) - (KEEP_VERSIONS - 1), 0)]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def _run_marker(run):
+    return run.created_at.isoformat() if run.created_at else None
+
+
+def load_latest_features(run):
+    """
+    Buka fitur milik `run` (run segmentasi terakhir di database) via mmap read-only, di-cache per proses.
+    Mengembalikan dict: run_id, as_of, customer_id, segment_id, features; atau None jika file
+    belum ada atau milik run lain (mis. database direset sehingga ID run terpakai ulang).
+    """
+    if run is None:
+        return None
+    root = _store_dir()
+    try:
+        with open(os.path.join(root, LATEST_FILE)) as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+
+    with _lock:
+        data = _cache.get(version)
+        if data is None or not _belongs_to(data, run):
+            data = _open_version(root, version)
+            if data is None:
+                return None
+            # Versi lama dilepas; mmap ditutup saat tidak ada lagi referensi
+            _cache.clear()
+            _cache[version] = data
+
+    return data if _belongs_to(data, run) else None
+
+
+def _belongs_to(data, run):
+    return data['run_id'] == run.id and data['run_created_at'] == _run_marker(run)
+
+
+def _open_version(root, version):
+    import numpy as np  # Lazy import: hanya dibutuhkan jalur analitik
+
+    path = os.path.join(root, version)
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        return {
+            'run_id': meta['run_id'],
+            'run_created_at': meta.get('run_created_at'),
+            'as_of': meta['as_of'],
+            'customer_id': np.load(os.path.join(path, 'customer_id.npy'), mmap_mode='r'),
+            'segment_id': np.load(os.path.join(path, 'segment_id.npy'), mmap_mode='r'),
+            'features': np.load(os.path.join(path, 'features.npy'), mmap_mode='r')
+        }
+    except (OSError, ValueError, KeyError):
+        return None
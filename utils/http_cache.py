@@ -0,0 +1,151 @@
+"""
+Respons kondisional (ETag) untuk API JSON read-only.
+
+Setiap domain data (DOMAIN_MODELS) punya penghitung versi di tabel domain_versions. Penghitung
+dinaikkan otomatis oleh event session ORM (insert/update/delete objek, termasuk UPDATE/DELETE
+massal) dalam transaksi yang sama dengan perubahannya, sehingga semua worker melihat versi yang
+sama tanpa cache bersama. Kenaikan ditulis tepat sebelum COMMIT (bukan saat flush) agar lock
+baris penghitung ditahan sesingkat mungkin. Perubahan stok saat checkout tidak menaikkan versi
+products (lihat _SALE_ATTRIBUTES), jadi checkout tidak mengantre di baris penghitung; endpoint
+yang menampilkan stok memasukkan ID transaksi terakhir ke `key` ETag-nya.
+
+`conditional_response` membaca versi domain yang dipakai endpoint dengan satu query primary key,
+membentuk ETag, lalu menjawab If-None-Match dengan 304 sebelum view (dan query-nya) dijalankan.
+
+Perubahan lewat SQL mentah / COPY tidak terdeteksi. Satu-satunya jalur seperti itu (bulk_insert
+membership saat segmentasi) selalu disertai SegmentationRun baru di domain yang sama.
+"""
+import hashlib
+from functools import wraps
+from itertools import chain
+from flask import make_response, request
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Session
+from app import db
+from models.analytics import CustomerSegment, CustomerSegmentMembership, Promotion, SegmentationRun
+from models.product import Product
+from models.transaction import Transaction
+from models.settings import DomainVersion
+
+# SegmentStatistic tidak perlu masuk: barisnya hanya ditulis bersama SegmentationRun baru.
+DOMAIN_MODELS = {
+    'segments': (CustomerSegment, CustomerSegmentMembership, SegmentationRun),
+    'promotions': (Promotion,),
+    'products': (Product,),
+}
+
+_DOMAIN_BY_MODEL = {model: domain for domain, models in DOMAIN_MODELS.items() for model in models}
+
+# Update objek model ini hanya menaikkan versi jika kolom berikut berubah (kolom yang tampil
+# di payload endpoint).
+_VERSIONED_ATTRIBUTES = {
+    Product: ('price', 'name', 'sku', 'category', 'stock'),
+}
+# ...kecuali kolom berikut bila transaksi DB yang sama membuat Transaction baru (checkout).
+# Checkout mengurangi stok setiap produk yang terjual; tanpa pengecualian ini baris penghitung
+# 'products' menjadi baris panas yang dikunci setiap checkout sampai COMMIT. Perubahan stok
+# karena penjualan tercakup ID transaksi terakhir di key ETag endpoint (products.api_search).
+_SALE_ATTRIBUTES = {
+    Product: ('stock',),
+}
+_PENDING_KEY = 'pending_domain_versions'
+_SALE_KEY = 'records_sale'
+
+
+def domain_versions(domains):
+    """dict domain -> versi saat ini (domain tanpa baris penghitung tidak ikut)."""
+    return dict(db.session.query(DomainVersion.name, DomainVersion.version)
+                .filter(DomainVersion.name.in_(domains)))
+
+
+def conditional_response(*domains, cache_control='private, no-cache', key=None):
+    """
+    Decorator view JSON: ETag dari versi `domains` + URL (+ `key()` untuk bagian yang tidak
+    tercakup versi, mis. tanggal hari ini). Pasang di bawah decorator login/role agar
+    pengguna tanpa akses tidak bisa memeriksa ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            versions = domain_versions(domains)
+            if len(versions) < len(domains):
+                # Penghitung belum ada (migrasi belum dijalankan): layani tanpa ETag
+                return view(*args, **kwargs)
+
+            raw = f'{request.full_path}|{sorted(versions.items())}|{key() if key else ""}'
+            etag = hashlib.md5(raw.encode('utf-8')).hexdigest()
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return wrapped
+    return decorator
+
+
+# --- Kenaikan versi otomatis ---
+
+def _mark(session, domains):
+    if domains:
+        session.info.setdefault(_PENDING_KEY, set()).update(domains)
+
+
+def _versioned_change(obj, sale):
+    attributes = _VERSIONED_ATTRIBUTES.get(type(obj))
+    if attributes is None:
+        return True
+    if sale:
+        attributes = [name for name in attributes if name not in _SALE_ATTRIBUTES.get(type(obj), ())]
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in attributes)
+
+
+@event.listens_for(Session, 'after_flush')
+def _flushed_objects(session, flush_context):
+    if any(isinstance(obj, Transaction) for obj in session.new):
+        session.info[_SALE_KEY] = True
+    sale = session.info.get(_SALE_KEY, False)
+    _mark(session, {
+        _DOMAIN_BY_MODEL[type(obj)]
+        for obj in chain(session.new, session.deleted)
+        if type(obj) in _DOMAIN_BY_MODEL
+    } | {
+        _DOMAIN_BY_MODEL[type(obj)]
+        for obj in session.dirty
+        if type(obj) in _DOMAIN_BY_MODEL and _versioned_change(obj, sale)
+    })
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _bulk_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ in _DOMAIN_BY_MODEL:
+            _mark(orm_execute_state.session, {_DOMAIN_BY_MODEL[mapper.class_]})
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_versions(session):
+    # Flush dulu agar perubahan yang baru akan di-flush oleh commit ikut tercatat
+    session.flush()
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        session.connection().execute(
+            update(DomainVersion)
+            .where(DomainVersion.name.in_(sorted(pending)))
+            .values(version=DomainVersion.version + 1)
+        )
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_pending(session, transaction):
+    # Rollback / close tanpa commit: perubahan batal, versi tidak perlu naik.
+    # Tanda penjualan hanya berlaku untuk transaksi DB yang membuatnya.
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+        session.info.pop(_SALE_KEY, None)
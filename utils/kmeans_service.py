@@ -4,24 +4,43 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import silhouette_score  # <-- 1. Import
 from models.transaction import Transaction
 from sqlalchemy import func
+from utils.feature_builder import BASE_FEATURES, build_feature_matrix
 
 class KMeansService:
-    def __init__(self, n_clusters=3):
+    def __init__(self, n_clusters=3, feature_columns=BASE_FEATURES):
         self.n_clusters = n_clusters
+        # Kolom yang dipakai clustering; selain RFM dasar diambil dari feature builder
+        self.feature_columns = list(feature_columns)
         self.scaler = StandardScaler()
         self.model = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+        # cluster_sorted -> (recency, frequency, monetary) pusat cluster, diisi perform_segmentation
+        self.centroids = {}
 
-    def get_rfm_data(self):
+    def get_rfm_data(self, as_of=None):
         """
         Mengambil data transaksi dan mengagregasikannya menjadi data RFM (Recency, Frequency, Monetary).
+        Jika `as_of` diisi, hanya transaksi s/d tanggal tersebut yang dihitung dan recency diukur dari `as_of`.
         """
         from app import db  # Import here to avoid circular dependency
-        results = db.session.query(
+
+        if set(self.feature_columns) - set(BASE_FEATURES):
+            # Fitur tambahan (basket, kategori, diskon) dari matriks fitur lebar
+            matrix = build_feature_matrix(db, as_of)
+            if not len(matrix.customer_ids):
+                return pd.DataFrame()
+            return matrix.to_frame(list(BASE_FEATURES) + [
+                c for c in self.feature_columns if c not in BASE_FEATURES
+            ])
+
+        query = db.session.query(
             Transaction.customer_id,
             func.count(Transaction.id).label('frequency'),
             func.sum(Transaction.total_amount).label('monetary'),
             func.max(Transaction.created_at).label('last_purchase_date')
-        ).group_by(Transaction.customer_id).all()
+        )
+        if as_of is not None:
+            query = query.filter(Transaction.created_at <= as_of)
+        results = query.group_by(Transaction.customer_id).all()
 
         if not results:
             return pd.DataFrame()
@@ -31,14 +50,15 @@ class KMeansService:
             rfm_df.columns = ['customer_id', 'frequency', 'monetary', 'last_purchase_date']
         
         # Hitung Recency
-        current_date = pd.Timestamp.now()
+        current_date = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.now()
         rfm_df['recency'] = (current_date - pd.to_datetime(rfm_df['last_purchase_date'])).dt.days
 
         return rfm_df
 
-    def perform_segmentation(self, rfm_df):
+    def perform_segmentation(self, rfm_df, compute_score=True):
         """
         Menjalankan algoritma K-Means, menghitung Silhouette Score, dan mengurutkan cluster.
+        Silhouette Score bernilai O(n^2); set `compute_score=False` jika tidak dibutuhkan (mis. backtest).
         """
         if rfm_df.empty or len(rfm_df) < self.n_clusters:
             # Fallback jika data kurang dari jumlah cluster
@@ -49,7 +69,7 @@ class KMeansService:
             self.model = KMeans(n_clusters=effective_n_clusters, random_state=42, n_init=10)
         
         # Scaling
-        rfm_features = rfm_df[['recency', 'frequency', 'monetary']]
+        rfm_features = rfm_df[self.feature_columns]
         rfm_scaled = self.scaler.fit_transform(rfm_features)
         
         # Fitting
@@ -57,7 +77,7 @@ class KMeansService:
         
         # <-- 2. Hitung Silhouette Score
         # Skor dihitung setelah fitting, menggunakan data yang sudah di-scale dan label cluster
-        score = silhouette_score(rfm_scaled, rfm_df['cluster'])
+        score = silhouette_score(rfm_scaled, rfm_df['cluster']) if compute_score else None
         
         # Sorting Clusters (0 = Highest Monetary/VIP)
         cluster_summary = rfm_df.groupby('cluster')['monetary'].mean().reset_index()
@@ -66,14 +86,20 @@ class KMeansService:
         # Mapping Old Cluster ID -> New Sorted ID
         cluster_map = {row['cluster']: i for i, row in cluster_summary.iterrows()}
         rfm_df['cluster_sorted'] = rfm_df['cluster'].map(cluster_map)
+
+        # Pusat cluster dalam satuan asli (hari, kali, rupiah). Rata-rata anggota cluster setara
+        # dengan pusat K-Means yang di-inverse-transform, dan tetap berlaku jika fitur clustering lebih dari RFM.
+        centers = rfm_df.groupby('cluster_sorted')[['recency', 'frequency', 'monetary']].mean()
+        self.centroids = {int(sorted_id): tuple(row) for sorted_id, row in centers.iterrows()}
         
         return rfm_df, score # <-- 3. Return score
 
-    def analyze(self):
+    def analyze(self, as_of=None):
         """
         Pipeline utama: Get Data -> Segmentasi -> Return DataFrame dan Silhouette Score
+        `as_of` opsional untuk menjalankan segmentasi seolah-olah pada tanggal tertentu (backtest).
         """
-        rfm_df = self.get_rfm_data()
+        rfm_df = self.get_rfm_data(as_of)
         if rfm_df.empty or len(rfm_df) < self.n_clusters:
             return None, None # Return two values
             
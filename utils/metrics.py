@@ -0,0 +1,198 @@
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request, has_request_context, Response, abort
+from sqlalchemy import event
+from utils.decorators import admin_required
+
+# Batas bucket histogram latensi (detik), mengikuti default client Prometheus
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Batas jumlah query yang disimpan per request untuk log slow request
+MAX_LOGGED_QUERIES = 200
+
+
+class MetricsRegistry:
+    """
+    Penyimpan metrik per endpoint (latensi, jumlah & durasi query SQL).
+    Registry ini per proses: setiap worker gunicorn punya angkanya sendiri.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def observe(self, endpoint, method, status, duration, query_count, query_time):
+        with self._lock:
+            stats = self._endpoints.get((endpoint, method))
+            if stats is None:
+                stats = {
+                    'buckets': [0] * len(self.buckets),
+                    'count': 0,
+                    'sum': 0.0,
+                    'queries': 0,
+                    'query_seconds': 0.0,
+                    'statuses': {}
+                }
+                self._endpoints[(endpoint, method)] = stats
+
+            for i, upper in enumerate(self.buckets):
+                if duration <= upper:
+                    stats['buckets'][i] += 1
+            stats['count'] += 1
+            stats['sum'] += duration
+            stats['queries'] += query_count
+            stats['query_seconds'] += query_time
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: dict(value, buckets=list(value['buckets']), statuses=dict(value['statuses']))
+                for key, value in self._endpoints.items()
+            }
+
+    def render(self):
+        """Format teks exposition Prometheus (text/plain; version=0.0.4)."""
+        data = self.snapshot()
+        lines = [
+            '# HELP http_request_duration_seconds Latensi request per endpoint.',
+            '# TYPE http_request_duration_seconds histogram'
+        ]
+        for (endpoint, method), stats in sorted(data.items()):
+            labels = f'endpoint="{_escape(endpoint)}",method="{method}"'
+            for upper, count in zip(self.buckets, stats['buckets']):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{upper}"}} {count}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats["count"]}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} {stats["sum"]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} {stats["count"]}')
+
+        lines.append('# HELP http_requests_total Jumlah request per endpoint dan status.')
+        lines.append('# TYPE http_requests_total counter')
+        for (endpoint, method), stats in sorted(data.items()):
+            for status, count in sorted(stats['statuses'].items()):
+                lines.append(
+                    f'http_requests_total{{endpoint="{_escape(endpoint)}",method="{method}",status="{status}"}} {count}'
+                )
+
+        lines.append('# HELP http_request_sql_queries_total Jumlah query SQL yang dijalankan per endpoint.')
+        lines.append('# TYPE http_request_sql_queries_total counter')
+        for (endpoint, method), stats in sorted(data.items()):
+            lines.append(
+                f'http_request_sql_queries_total{{endpoint="{_escape(endpoint)}",method="{method}"}} {stats["queries"]}'
+            )
+
+        lines.append('# HELP http_request_sql_seconds_total Total waktu eksekusi SQL per endpoint.')
+        lines.append('# TYPE http_request_sql_seconds_total counter')
+        for (endpoint, method), stats in sorted(data.items()):
+            lines.append(
+                f'http_request_sql_seconds_total{{endpoint="{_escape(endpoint)}",method="{method}"}} {stats["query_seconds"]:.6f}'
+            )
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def count_queries(engine):
+    """
+    Context manager untuk mencatat semua statement SQL yang dijalankan engine.
+    Contoh: with count_queries(db.engine) as queries: ... ; len(queries)
+    """
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', _record)
+
+
+def init_metrics(app, db):
+    """
+    Pasang middleware instrumentasi jika METRICS_ENABLED aktif.
+    Jika dimatikan, tidak ada hook maupun event listener yang didaftarkan (zero overhead).
+    """
+    if not app.config.get('METRICS_ENABLED'):
+        return
+
+    slow_ms = app.config.get('SLOW_REQUEST_MS', 500)
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'metrics_queries' in g:
+            conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if not starts or not has_request_context() or 'metrics_queries' not in g:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        g.metrics_query_count += 1
+        g.metrics_query_time += elapsed
+        if len(g.metrics_queries) < MAX_LOGGED_QUERIES:
+            g.metrics_queries.append((statement, elapsed))
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_queries = []
+        g.metrics_query_count = 0
+        g.metrics_query_time = 0.0
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+
+        duration = time.perf_counter() - start
+        endpoint = request.endpoint or '<unmatched>'
+        registry.observe(
+            endpoint, request.method, response.status_code,
+            duration, g.metrics_query_count, g.metrics_query_time
+        )
+
+        if duration * 1000 >= slow_ms:
+            query_lines = '\n'.join(
+                f'  [{elapsed * 1000:.1f} ms] {" ".join(statement.split())[:300]}'
+                for statement, elapsed in g.metrics_queries
+            )
+            app.logger.warning(
+                'Slow request %s %s (%s): %.1f ms, %d query SQL (%.1f ms)\n%s',
+                request.method, request.path, endpoint, duration * 1000,
+                g.metrics_query_count, g.metrics_query_time * 1000, query_lines
+            )
+        return response
+
+    token = app.config.get('METRICS_TOKEN')
+
+    @admin_required
+    def _admin_metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    def metrics():
+        # Scraper Prometheus: header "Authorization: Bearer <METRICS_TOKEN>"; selain itu hanya admin yang login
+        authorization = request.headers.get('Authorization')
+        if authorization is None:
+            return _admin_metrics()
+        if not token or not hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+            abort(401)
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
@@ -0,0 +1,47 @@
+"""
+Uang sebagai rupiah utuh (integer).
+
+Rupiah praktis tidak punya satuan sen, jadi kolom uang disimpan sebagai BIGINT rupiah dan
+dihitung dengan int Python / int64 numpy, tanpa konversi Decimal(str(...)) per item maupun
+float() saat dikirim sebagai JSON.
+
+Aturan pembulatan (satu-satunya tempat pecahan rupiah bisa muncul):
+- Diskon persentase = dasar × persen / 100, dibulatkan ke rupiah terdekat; tepat setengah
+  rupiah dibulatkan ke atas (half-up). Persen boleh dua desimal (mis. 12,5%) dan dihitung
+  eksak sebagai basis poin (1% = 100 bp) dengan aritmetika integer.
+- Nilai rupiah dari input desimal (nilai diskon tetap, data lama saat migrasi) dibulatkan
+  half-up ke rupiah utuh.
+- Diskon tidak pernah melebihi subtotal (dibatasi setelah pembulatan).
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import BigInteger, cast, func
+
+# 100% dalam basis poin
+BASIS_POINTS = 10000
+
+
+def to_rupiah(value):
+    """int / Decimal / float / str -> int rupiah (half-up). None -> 0."""
+    if value is None:
+        return 0
+    if isinstance(value, int):
+        return value
+    return int(Decimal(str(value)).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def to_basis_points(percent):
+    """Persen (mis. Decimal('12.5')) -> basis poin int (1250), half-up pada dua desimal."""
+    return int((Decimal(str(percent)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def percent_of(amount, basis_points):
+    """amount × basis_points / 10000 dibulatkan half-up ke rupiah, eksak untuk amount >= 0."""
+    return (2 * amount * basis_points + BASIS_POINTS) // (2 * BASIS_POINTS)
+
+
+def money_sum(column):
+    """
+    SUM kolom uang sebagai BIGINT (0 jika tidak ada baris). PostgreSQL mengembalikan NUMERIC
+    untuk SUM(bigint), yang akan terbaca sebagai Decimal tanpa cast ini.
+    """
+    return cast(func.coalesce(func.sum(column), 0), BigInteger)
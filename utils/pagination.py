@@ -0,0 +1,103 @@
+"""
+Paginasi tanpa COUNT(*) penuh.
+
+`Query.paginate` bawaan menghitung total dengan SELECT count(*) atas seluruh hasil filter di
+setiap halaman, yang membaca semua baris tabel besar (transactions) hanya untuk angka "Total".
+`paginate` di sini menggantinya dengan:
+- total yang sudah diketahui pemanggil (mis. customer_count dari snapshot segmentasi terakhir);
+- estimasi planner PostgreSQL (pg_class.reltuples) untuk daftar tanpa filter, jika tabelnya
+  lebih besar dari EXACT_COUNT_LIMIT;
+- selain itu COUNT eksak yang dibatasi: paling banyak EXACT_COUNT_LIMIT + 1 baris dibaca,
+  dan hasil yang melewati batas ditampilkan sebagai "10.000+".
+
+has_next tidak bergantung pada total: halaman diambil satu baris lebih banyak dari per_page,
+sehingga tombol "berikutnya" tetap benar walau total hanya estimasi atau dibatasi.
+"""
+from flask_sqlalchemy.pagination import QueryPagination
+from sqlalchemy import func, text
+from sqlalchemy.orm import lazyload
+
+# Batas COUNT eksak; di atas ini total ditampilkan sebagai "10.000+"
+EXACT_COUNT_LIMIT = 10000
+
+
+def paginate(query, page, per_page, estimate_table=None, total=None):
+    """
+    Pengganti `query.paginate(page=..., per_page=..., error_out=False)`.
+    `estimate_table`: model yang boleh memakai estimasi planner (hanya untuk query tanpa filter).
+    `total`: jumlah baris yang sudah diketahui (mis. dari tabel ringkasan); COUNT dilewati.
+    """
+    return EstimatedPagination(query=query, page=page, per_page=per_page, error_out=False,
+                               estimate_table=estimate_table, known_total=total)
+
+
+def planner_row_estimate(session, model):
+    """Estimasi jumlah baris tabel dari statistik planner PostgreSQL; None di dialek lain."""
+    if session.get_bind().dialect.name != 'postgresql':
+        return None
+    # Tabel terpartisi (transactions, lihat utils/partitions.py): jumlah estimasi semua partisinya
+    estimate = session.execute(text(
+        "SELECT CASE WHEN c.relkind = 'p' THEN ("
+        "  SELECT SUM(GREATEST(p.reltuples, 0)) FROM pg_inherits i"
+        "  JOIN pg_class p ON p.oid = i.inhrelid WHERE i.inhparent = c.oid"
+        ") ELSE c.reltuples END "
+        "FROM pg_class c WHERE c.oid = to_regclass(:name)"
+    ), {'name': model.__table__.name}).scalar()
+    # -1 = tabel belum pernah di-ANALYZE
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+class EstimatedPagination(QueryPagination):
+    """QueryPagination dengan total estimasi/dibatasi; lihat docstring modul."""
+
+    total_estimated = False
+    total_capped = False
+
+    def _query_items(self):
+        rows = self._query_args['query'].limit(self.per_page + 1).offset(self._query_offset).all()
+        self._has_more = len(rows) > self.per_page
+        return rows[:self.per_page]
+
+    def _query_count(self):
+        if self._query_args.get('known_total') is not None:
+            return self._query_args['known_total']
+
+        query = self._query_args['query']
+        model = self._query_args.get('estimate_table')
+        if model is not None:
+            estimate = planner_row_estimate(query.session, model)
+            if estimate is not None and estimate > EXACT_COUNT_LIMIT:
+                self.total_estimated = True
+                return estimate
+
+        limited = query.options(lazyload('*')).order_by(None)\
+            .limit(EXACT_COUNT_LIMIT + 1).subquery()
+        count = query.session.query(func.count()).select_from(limited).scalar()
+        if count > EXACT_COUNT_LIMIT:
+            self.total_capped = True
+            return EXACT_COUNT_LIMIT
+        return count
+
+    @property
+    def pages(self):
+        pages = super().pages
+        if self.total_estimated or self.total_capped:
+            # Total tidak eksak: halaman saat ini (dan berikutnya jika ada) tetap tercakup
+            pages = max(pages, self.page + 1 if self._has_more else self.page)
+        return pages
+
+    @property
+    def has_next(self):
+        return self._has_more
+
+    @property
+    def total_label(self):
+        """Total untuk ditampilkan: "1.234", "10.000+" (dibatasi), atau "± 1.234.567" (estimasi)."""
+        label = f'{self.total:,}'.replace(',', '.')
+        if self.total_capped:
+            return f'{label}+'
+        if self.total_estimated:
+            return f'± {label}'
+        return label
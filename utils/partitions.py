@@ -0,0 +1,120 @@
+"""
+Partisi bulanan transactions / transaction_items (PostgreSQL).
+
+Migrasi 70c144744f98 membangun kedua tabel sebagai tabel terpartisi RANGE per bulan:
+transactions per created_at dan transaction_items per transaction_created_at (salinan created_at
+transaksi induk), sehingga laporan dengan filter rentang tanggal hanya membaca partisi bulan
+yang relevan (partition pruning). Nama partisi `<tabel>_yYYYYmMM`, ditambah `<tabel>_default`
+untuk baris di luar semua rentang agar checkout tidak pernah gagal karena partisi belum dibuat.
+
+`ensure_partitions` (CLI `flask create-partitions`, dijadwalkan bulanan) membuat partisi bulan
+ini s/d beberapa bulan ke depan. Baris yang terlanjur masuk partisi default untuk bulan itu
+(mis. cron terlambat, atau impor data lama dengan --since) dipindahkan ke partisi barunya dalam
+transaksi yang sama. Di SQLite (dan tabel yang belum dimigrasi) tidak ada yang dilakukan.
+"""
+import re
+from datetime import date
+from sqlalchemy import text
+
+# (tabel, kunci partisi); urutan induk -> anak
+PARTITIONED_TABLES = (('transactions', 'created_at'), ('transaction_items', 'transaction_created_at'))
+
+# Jumlah bulan ke depan yang disiapkan setiap kali dijalankan
+DEFAULT_MONTHS_AHEAD = 3
+
+# Nama partisi buatan migrasi / ensure_partitions (bukan tabel model)
+_PARTITION_NAME = re.compile(r'^(transactions|transaction_items)_(y\d{4}m\d{2}|default)$')
+
+
+def add_months(month, count=1):
+    """Tanggal 1 bulan `month` digeser `count` bulan."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_y{month:%Y}m{month:%m}'
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """
+    Filter autogenerate Alembic (dipasang di Migrate) untuk skema terpartisi PostgreSQL:
+    tabel partisi dan FK turunan yang dibuat PostgreSQL per partisi bukan bagian model, dan
+    uq_transactions_id_created_at di sana diwakili primary key (id, created_at) tabel induk.
+    Tanpa filter ini `flask db migrate` di PostgreSQL akan mengusulkan menghapus partisi.
+    """
+    if type_ == 'table' and reflected and _PARTITION_NAME.match(name):
+        return False
+    if type_ == 'foreign_key_constraint' and reflected and _PARTITION_NAME.match(obj.referred_table.name):
+        return False
+    if type_ == 'unique_constraint' and name == 'uq_transactions_id_created_at' \
+            and not reflected and compare_to is None:
+        return False
+    return True
+
+
+def is_partitioned(db):
+    """True jika transactions sudah berupa tabel terpartisi PostgreSQL."""
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return False
+    relkind = db.session.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('transactions')")
+    ).scalar()
+    return relkind == 'p'
+
+
+def default_partition_rows(db):
+    """Jumlah transaksi di partisi default (di luar semua partisi bulanan)."""
+    return db.session.execute(text('SELECT COUNT(*) FROM transactions_default')).scalar()
+
+
+def ensure_partitions(db, months_ahead=DEFAULT_MONTHS_AHEAD, since=None):
+    """
+    Buat partisi bulanan yang belum ada dari bulan `since` (default: bulan ini) s/d
+    `months_ahead` bulan ke depan. Mengembalikan list (bulan, jumlah transaksi dipindahkan
+    dari partisi default). Commit diserahkan ke pemanggil.
+    """
+    if not is_partitioned(db):
+        return []
+
+    this_month = date.today().replace(day=1)
+    month = (since or this_month).replace(day=1)
+    created = []
+    while month <= add_months(this_month, months_ahead):
+        exists = db.session.execute(
+            text('SELECT to_regclass(:name) IS NOT NULL'),
+            {'name': partition_name('transactions', month)}
+        ).scalar()
+        if not exists:
+            created.append((month, _create_month(db, month)))
+        month = add_months(month, 1)
+    return created
+
+
+def _create_month(db, month):
+    """
+    Buat partisi satu bulan untuk kedua tabel. Baris bulan itu di partisi default disalin ke
+    tabel baru, dihapus dari default (item dulu karena FK), lalu tabel baru di-attach sebagai
+    partisi; ATTACH membuat index/constraint yang sama dengan tabel induk dan memvalidasi FK item.
+    """
+    bounds = {'start': month, 'end': add_months(month, 1)}
+    for table, key in PARTITIONED_TABLES:
+        name = partition_name(table, month)
+        db.session.execute(text(f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)'))
+        db.session.execute(text(
+            f'INSERT INTO {name} SELECT * FROM {table}_default WHERE {key} >= :start AND {key} < :end'
+        ), bounds)
+    moved = db.session.execute(text(
+        f'SELECT COUNT(*) FROM {partition_name("transactions", month)}'
+    )).scalar()
+
+    for table, key in reversed(PARTITIONED_TABLES):
+        db.session.execute(text(
+            f'DELETE FROM {table}_default WHERE {key} >= :start AND {key} < :end'
+        ), bounds)
+    for table, _ in PARTITIONED_TABLES:
+        db.session.execute(text(
+            f"ALTER TABLE {table} ATTACH PARTITION {partition_name(table, month)} "
+            f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+        ))
+    return moved
@@ -0,0 +1,280 @@
+"""
+Mesin harga keranjang POS: subtotal per item dan diskon promosi segmen.
+
+Promosi adalah aturan per segmen (boleh lebih dari satu) dengan syarat opsional: minimum
+belanja, kategori produk, dan rentang tanggal. Aturan yang aktif hari ini dikompilasi sekali
+menjadi tabel datar per segmen, terurut menurut minimum belanja (`compile_promotions`), sehingga
+evaluasi keranjang (`evaluate_promotions`) cukup bisect + lintasan atas aturan segmen pelanggan.
+Tabel di-cache per proses dan dikompilasi ulang jika penanda tabel promosi (jumlah baris,
+updated_at terakhir) atau tanggal berubah, sehingga edit promosi dari proses mana pun langsung
+terlihat. Checkout dan quote memakai tabel yang sama.
+
+Quote (`quote_cart`) bersifat read-only dan membaca harga produk dari cache per proses (dimuat
+per ID saat pertama diminta). Cache harga dikosongkan saat harga/nama/kategori produk diubah lewat
+ORM di proses yang sama; perubahan dari proses lain terlihat paling lambat setelah
+CACHE_TTL_SECONDS. Checkout tetap memakai harga baris produk yang dikunci.
+
+Semua nominal adalah rupiah utuh (int); aturan pembulatan diskon ada di utils/money.py.
+"""
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from models.product import Product
+from models.analytics import CustomerSegmentMembership, Promotion
+from utils.money import percent_of, to_basis_points, to_rupiah
+
+PROMOTION_TYPES = ('percentage_discount', 'fixed_discount')
+
+# Umur maksimal cache harga produk untuk perubahan yang dibuat proses lain
+CACHE_TTL_SECONDS = 60
+
+# Batas jumlah baris item per quote
+MAX_CART_ITEMS = 200
+
+# promotion_value: basis poin untuk diskon persentase, rupiah untuk diskon tetap
+PromotionRule = namedtuple(
+    'PromotionRule', 'promotion_id segment_id promotion_type promotion_value min_spend category description'
+)
+
+_lock = threading.Lock()
+_prices = {}            # product_id -> (name, price, category)
+_prices_loaded_at = 0.0
+_compiled = None        # (penanda, tanggal, tabel)
+
+
+class PricingError(ValueError):
+    """Keranjang tidak valid; `status_code` mengikuti respons checkout (400 / 404)."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def invalidate_cache():
+    """Kosongkan cache harga & tabel promosi proses ini."""
+    global _compiled, _prices_loaded_at
+    with _lock:
+        _prices.clear()
+        _prices_loaded_at = time.monotonic()
+        _compiled = None
+
+
+# --- Aturan promosi ---
+
+def is_active(promo, today):
+    """Aturan berlaku pada `today` (start_date/end_date kosong = tanpa batas)."""
+    return (promo.start_date is None or promo.start_date <= today) and \
+        (promo.end_date is None or promo.end_date >= today)
+
+
+def compile_promotions(promotions, today):
+    """
+    Kompilasi aturan yang aktif pada `today` menjadi dict segment_id -> (min_spends, rules):
+    dua tuple sejajar terurut menurut minimum belanja, siap untuk bisect. Nilai persen diubah
+    ke basis poin dan nilai tetap ke rupiah sekali di sini, bukan per keranjang.
+    """
+    by_segment = defaultdict(list)
+    for promo in promotions:
+        if promo.promotion_type not in PROMOTION_TYPES or not is_active(promo, today):
+            continue
+        if promo.promotion_type == 'percentage_discount':
+            value = to_basis_points(promo.promotion_value)
+        else:
+            value = to_rupiah(promo.promotion_value)
+        by_segment[promo.segment_id].append(PromotionRule(
+            promo.id,
+            promo.segment_id,
+            promo.promotion_type,
+            value,
+            promo.min_spend or 0,
+            promo.category or None,
+            promo.description
+        ))
+
+    table = {}
+    for segment_id, rules in by_segment.items():
+        rules.sort(key=lambda rule: (rule.min_spend, rule.promotion_id))
+        table[segment_id] = (tuple(rule.min_spend for rule in rules), tuple(rules))
+    return table
+
+
+def promotion_table(db, today=None):
+    """
+    Tabel aturan terkompilasi untuk hari ini, dari cache selama penanda tabel promosi sama.
+    Penanda = (jumlah baris, updated_at terakhir): tambah/ubah/hapus aturan selalu mengubahnya.
+    """
+    global _compiled
+    today = today or datetime.now().date()
+    marker = tuple(db.session.query(func.count(Promotion.id), func.max(Promotion.updated_at)).one())
+
+    with _lock:
+        compiled = _compiled
+    if compiled is not None and compiled[0] == marker and compiled[1] == today:
+        return compiled[2]
+
+    table = compile_promotions(db.session.query(Promotion).all(), today)
+    with _lock:
+        _compiled = (marker, today, table)
+    return table
+
+
+def evaluate_promotions(table, segment_ids, subtotal, category_totals=None):
+    """
+    Diskon terbesar dari aturan segmen-segmen `segment_ids` yang syaratnya terpenuhi, tidak
+    melebihi subtotal. Aturan kategori dihitung dari `category_totals` (dict kategori -> subtotal).
+    Semua nilai int rupiah. Mengembalikan (diskon, PromotionRule yang dipakai atau None).
+    """
+    discount_amount = 0
+    applied = None
+    for segment_id in segment_ids:
+        entry = table.get(segment_id)
+        if entry is None:
+            continue
+        min_spends, rules = entry
+        # Hanya prefix aturan dengan minimum belanja <= subtotal yang perlu dievaluasi
+        for rule in rules[:bisect_right(min_spends, subtotal)]:
+            if rule.category is None:
+                base = subtotal
+            else:
+                base = (category_totals or {}).get(rule.category, 0)
+                if base <= 0:
+                    continue
+            if rule.promotion_type == 'percentage_discount':
+                current_discount = percent_of(base, rule.promotion_value)
+            else:
+                current_discount = min(rule.promotion_value, base)
+            # Ambil diskon yang paling menguntungkan pelanggan (jika ada tumpang tindih)
+            if current_discount > discount_amount:
+                discount_amount, applied = current_discount, rule
+
+    return min(discount_amount, subtotal), applied
+
+
+def customer_segment_ids(db, customer_id):
+    """ID segmen `customer_id` (satu query index)."""
+    return [segment_id for segment_id, in db.session.query(CustomerSegmentMembership.segment_id)
+            .filter(CustomerSegmentMembership.customer_id == customer_id)]
+
+
+def customer_discount(db, customer_id, subtotal, category_totals):
+    """Diskon checkout/quote untuk pelanggan: (diskon, aturan yang dipakai atau None)."""
+    if not customer_id:
+        return 0, None
+    table = promotion_table(db)
+    if not table:
+        return 0, None
+    return evaluate_promotions(table, customer_segment_ids(db, customer_id), subtotal, category_totals)
+
+
+def rule_payload(rule):
+    """Representasi JSON satu aturan untuk POS."""
+    return {
+        'type': rule.promotion_type,
+        'value': rule.promotion_value / 100 if rule.promotion_type == 'percentage_discount'
+        else rule.promotion_value,
+        'min_spend': rule.min_spend,
+        'category': rule.category,
+        'description': rule.description
+    }
+
+
+# --- Quote keranjang ---
+
+def parse_cart(items):
+    """Validasi [{'product_id', 'quantity'}, ...] menjadi list (product_id, qty)."""
+    if not isinstance(items, list) or len(items) > MAX_CART_ITEMS:
+        raise PricingError(f'items harus berupa list berisi maksimal {MAX_CART_ITEMS} item.')
+    cart = []
+    for item in items:
+        try:
+            product_id, qty = int(item['product_id']), int(item['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise PricingError('Setiap item wajib punya product_id dan quantity angka.')
+        if qty <= 0:
+            raise PricingError('Jumlah item harus lebih dari 0.')
+        cart.append((product_id, qty))
+    return cart
+
+
+def _cached_prices(db, product_ids):
+    if time.monotonic() - _prices_loaded_at > CACHE_TTL_SECONDS:
+        invalidate_cache()
+    with _lock:
+        missing = [product_id for product_id in set(product_ids) if product_id not in _prices]
+    if missing:
+        rows = db.session.query(Product.id, Product.name, Product.price, Product.category)\
+            .filter(Product.id.in_(missing)).all()
+        with _lock:
+            for product_id, name, price, category in rows:
+                _prices[product_id] = (name, price, category)
+    with _lock:
+        return {product_id: _prices[product_id] for product_id in product_ids if product_id in _prices}
+
+
+def quote_cart(db, customer_id, items):
+    """
+    Hitung total keranjang tanpa lock dan tanpa menulis apa pun. Pelanggan kosong/0 = tamu
+    (tanpa promosi). Stok tidak diperiksa di sini; checkout tetap memvalidasinya.
+    Mengembalikan dict items, total_gross, discount_applied, total_net, promotion.
+    """
+    try:
+        customer_id = int(customer_id or 0)
+    except (TypeError, ValueError):
+        raise PricingError('customer_id harus berupa angka.')
+    cart = parse_cart(items)
+    prices = _cached_prices(db, [product_id for product_id, _ in cart])
+
+    lines = []
+    total_amount = 0
+    category_totals = defaultdict(int)
+    for product_id, qty in cart:
+        if product_id not in prices:
+            raise PricingError(f'Produk ID {product_id} tidak ditemukan', status_code=404)
+        name, price, category = prices[product_id]
+        subtotal = price * qty
+        total_amount += subtotal
+        category_totals[category] += subtotal
+        lines.append({
+            'product_id': product_id,
+            'name': name,
+            'price': price,
+            'quantity': qty,
+            'subtotal': subtotal
+        })
+
+    discount_amount, applied = customer_discount(db, customer_id, total_amount, category_totals)
+    return {
+        'items': lines,
+        'total_gross': total_amount,
+        'discount_applied': discount_amount,
+        'total_net': total_amount - discount_amount,
+        'promotion': rule_payload(applied) if applied and discount_amount > 0 else None
+    }
+
+
+# --- Invalidasi cache harga saat produk berubah lewat ORM ---
+
+@event.listens_for(Product, 'after_update')
+def _product_updated(mapper, connection, target):
+    # Checkout hanya mengubah stok; cache cukup dikosongkan jika harga/nama/kategori berubah
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ('price', 'name', 'category')):
+        invalidate_cache()
+
+
+@event.listens_for(Product, 'after_delete')
+def _product_deleted(mapper, connection, target):
+    invalidate_cache()
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _bulk_product_change(orm_execute_state):
+    # UPDATE/DELETE massal (mis. reset data) tidak memicu event mapper per objek
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is Product:
+            invalidate_cache()
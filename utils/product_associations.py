@@ -0,0 +1,151 @@
+"""
+Index "sering dibeli bersama" untuk saran produk di POS.
+
+Matriks co-occurrence produk dihitung sebagai Bᵀ·B, dengan B matriks sparse biner
+transaksi × produk (scipy.sparse). Hasilnya disimpan di tabel `product_associations`
+lengkap dengan peringkat per produk, sehingga endpoint saran cukup membaca beberapa baris
+lewat index (product_id, rank) tanpa self-join ke seluruh riwayat transaction_items.
+
+Refresh inkremental hanya memproses transaksi setelah `last_transaction_id` build terakhir:
+jumlah baru ditambahkan ke jumlah lama, dan hanya produk yang tersentuh yang ditulis ulang.
+"""
+from sqlalchemy import func
+from models.product import Product, ProductAssociation, ProductAssociationBuild
+from models.transaction import Transaction, TransactionItem
+from utils.bulk_writer import bulk_insert
+from utils.segmentation import DELETE_CHUNK_SIZE
+
+# Jumlah transaksi per potongan saat membangun matriks (membatasi memori untuk riwayat besar)
+TRANSACTION_CHUNK_SIZE = 50000
+
+# Batas jumlah saran yang boleh diminta per request
+MAX_RELATED = 20
+
+
+def _cooccurrence(db, after_id, upto_id, n_products):
+    """Matriks co-occurrence (CSR, n_products × n_products) untuk transaksi after_id < id <= upto_id."""
+    import numpy as np  # Lazy import: hanya dibutuhkan batch job
+    from scipy import sparse
+
+    counts = sparse.csr_matrix((n_products, n_products), dtype=np.int64)
+    for start in range(after_id, upto_id, TRANSACTION_CHUNK_SIZE):
+        stop = min(start + TRANSACTION_CHUNK_SIZE, upto_id)
+        rows = db.session.query(TransactionItem.transaction_id, TransactionItem.product_id)\
+            .filter(TransactionItem.transaction_id > start, TransactionItem.transaction_id <= stop)\
+            .all()
+        if not rows:
+            continue
+
+        transaction_ids, product_ids = (np.array(col, dtype=np.int64) for col in zip(*rows))
+        _, dense_tx = np.unique(transaction_ids, return_inverse=True)
+        basket = sparse.csr_matrix(
+            (np.ones(len(product_ids), dtype=np.int64), (dense_tx, product_ids)),
+            shape=(int(dense_tx.max()) + 1, n_products)
+        )
+        # Produk yang muncul di beberapa baris item transaksi yang sama dihitung sekali
+        basket.data[:] = 1
+        counts = counts + (basket.T @ basket).tocsr()
+
+    counts.setdiag(0)
+    counts.eliminate_zeros()
+    return counts
+
+
+def _existing_counts(db, product_ids, n_products):
+    """Jumlah co-occurrence yang sudah tersimpan untuk `product_ids`, sebagai CSR n_products × n_products."""
+    import numpy as np
+    from scipy import sparse
+
+    rows = []
+    for start in range(0, len(product_ids), DELETE_CHUNK_SIZE):
+        chunk = product_ids[start:start + DELETE_CHUNK_SIZE].tolist()
+        rows += db.session.query(
+            ProductAssociation.product_id,
+            ProductAssociation.related_product_id,
+            ProductAssociation.co_count
+        ).filter(ProductAssociation.product_id.in_(chunk)).all()
+
+    if not rows:
+        return sparse.csr_matrix((n_products, n_products), dtype=np.int64)
+    product, related, count = (np.array(col, dtype=np.int64) for col in zip(*rows))
+    return sparse.csr_matrix((count, (product, related)), shape=(n_products, n_products))
+
+
+def _ranked_rows(counts, product_ids):
+    """Baris (product_id, related_product_id, co_count, rank) untuk `product_ids`, rank 1 = terbanyak."""
+    import numpy as np
+
+    sub = counts[product_ids].tocoo()
+    product = product_ids[sub.row]
+    # Urut per produk, jumlah terbesar dulu; seri diurutkan menurut ID produk terkait agar stabil
+    order = np.lexsort((sub.col, -sub.data, product))
+    product, related, count = product[order], sub.col[order].astype(np.int64), sub.data[order]
+    first = np.searchsorted(product, product, side='left')
+    rank = np.arange(len(product)) - first + 1
+    return product, related, count, rank
+
+
+def refresh_associations(db, full=False):
+    """
+    Perbarui index co-occurrence dari transaksi yang belum diproses (atau semua jika `full`).
+    Mengembalikan ProductAssociationBuild, atau None jika tidak ada transaksi baru.
+    Commit diserahkan ke pemanggil.
+    """
+    import numpy as np
+
+    last_build = None if full else ProductAssociationBuild.query\
+        .order_by(ProductAssociationBuild.id.desc()).first()
+    after_id = last_build.last_transaction_id if last_build else 0
+    upto_id = db.session.query(func.max(Transaction.id)).scalar() or 0
+
+    if upto_id <= after_id and not full:
+        return None
+    if last_build is None:
+        # Build pertama / rebuild penuh: mulai dari tabel kosong
+        db.session.query(ProductAssociation).delete(synchronize_session=False)
+
+    n_products = (db.session.query(func.max(Product.id)).scalar() or 0) + 1
+    counts = _cooccurrence(db, after_id, upto_id, n_products)
+    touched = np.flatnonzero(np.diff(counts.indptr))
+
+    if last_build is not None and len(touched):
+        counts = counts + _existing_counts(db, touched, n_products)
+        for start in range(0, len(touched), DELETE_CHUNK_SIZE):
+            chunk = touched[start:start + DELETE_CHUNK_SIZE].tolist()
+            db.session.query(ProductAssociation)\
+                .filter(ProductAssociation.product_id.in_(chunk))\
+                .delete(synchronize_session=False)
+
+    product, related, count, rank = _ranked_rows(counts, touched)
+    bulk_insert(db, ProductAssociation, {
+        'product_id': product,
+        'related_product_id': related,
+        'co_count': count,
+        'rank': rank
+    })
+
+    transaction_count = db.session.query(func.count(Transaction.id))\
+        .filter(Transaction.id > after_id, Transaction.id <= upto_id)\
+        .scalar()
+    build = ProductAssociationBuild(
+        last_transaction_id=upto_id,
+        transaction_count=transaction_count,
+        product_count=int(len(touched)),
+        full_rebuild=last_build is None
+    )
+    db.session.add(build)
+    db.session.flush()
+    return build
+
+
+def related_products(db, product_id, limit=5):
+    """
+    Produk yang paling sering dibeli bersama `product_id` dan masih ada stok, dibaca dari index
+    yang sudah dihitung (range scan pada product_id, rank). Mengembalikan list (Product, co_count).
+    """
+    return db.session.query(Product, ProductAssociation.co_count)\
+        .join(ProductAssociation, ProductAssociation.related_product_id == Product.id)\
+        .filter(ProductAssociation.product_id == product_id, Product.stock > 0)\
+        .order_by(ProductAssociation.rank)\
+        .limit(limit)\
+        .all()
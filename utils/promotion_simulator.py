@@ -0,0 +1,174 @@
+"""
+Simulasi "what-if" promosi terhadap riwayat transaksi.
+
+Riwayat (nilai belanja kotor per transaksi) dan label segmen pelanggan dimuat sekali sebagai
+array numpy, lalu beberapa skenario promosi dievaluasi sekaligus dalam satu lintasan vektor
+dengan aturan yang sama seperti checkout: diskon terbesar dari semua segmen pelanggan,
+dibatasi maksimal sebesar total belanja. Nominal dihitung sebagai rupiah int64 dengan
+pembulatan yang sama seperti checkout (utils/money.py), sehingga hasilnya cocok per rupiah.
+
+Skenario = dict segment_id -> list (promotion_type, value). Aturan bersyarat (minimum belanja,
+kategori) tidak disimulasikan: skenario "saat ini" hanya memuat aturan tanpa syarat yang aktif.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from models.transaction import Transaction
+from models.analytics import CustomerSegment, CustomerSegmentMembership, Promotion
+from utils.money import BASIS_POINTS, to_basis_points, to_rupiah
+from utils.pricing import PROMOTION_TYPES, is_active
+
+# Batas jumlah skenario per simulasi
+MAX_SCENARIOS = 20
+
+DEFAULT_PERIOD_DAYS = 365
+
+
+class SimulationError(ValueError):
+    """Input skenario tidak valid (pesan siap ditampilkan ke pengguna)."""
+
+
+def default_period(today=None):
+    """Rentang default: 365 hari terakhir s/d hari ini (tanggal, inklusif)."""
+    today = today or datetime.now().date()
+    return today - timedelta(days=DEFAULT_PERIOD_DAYS - 1), today
+
+
+def load_history(db, start_date, end_date):
+    """
+    Muat transaksi start_date..end_date (inklusif) sebagai array numpy:
+    gross (belanja sebelum diskon = total_amount + discount_amount), customer_pos (indeks baris
+    `member`; pelanggan tanpa segmen / transaksi tanpa pelanggan menunjuk baris terakhir yang kosong),
+    member (bool pelanggan × segmen).
+    """
+    import numpy as np  # Lazy import: hanya dibutuhkan simulasi
+
+    discount_col = func.coalesce(Transaction.discount_amount, 0)
+    rows = db.session.query(
+        func.coalesce(Transaction.customer_id, -1),
+        Transaction.total_amount + discount_col,
+        discount_col
+    ).filter(
+        Transaction.created_at >= start_date,
+        Transaction.created_at < end_date + timedelta(days=1)
+    ).all()
+
+    segment_ids = np.array([s.id for s in db.session.query(CustomerSegment.id).order_by(CustomerSegment.id)],
+                           dtype=np.int64)
+    memberships = db.session.query(CustomerSegmentMembership.customer_id,
+                                   CustomerSegmentMembership.segment_id).all()
+
+    if memberships:
+        member_customer, member_segment = (np.array(col, dtype=np.int64) for col in zip(*memberships))
+    else:
+        member_customer = member_segment = np.array([], dtype=np.int64)
+    customer_ids, member_row = np.unique(member_customer, return_inverse=True)
+    # Baris tambahan di akhir = "tanpa segmen"
+    member = np.zeros((len(customer_ids) + 1, len(segment_ids)), dtype=bool)
+    member[member_row, np.searchsorted(segment_ids, member_segment)] = True
+
+    # customer_id -1 = transaksi tanpa pelanggan
+    if rows:
+        customer_col, gross_col, discount_col = zip(*rows)
+        tx_customer = np.array(customer_col, dtype=np.int64)
+        gross = np.array(gross_col, dtype=np.int64)
+        discount = np.array(discount_col, dtype=np.int64)
+    else:
+        tx_customer = np.array([], dtype=np.int64)
+        gross = discount = np.array([], dtype=np.int64)
+
+    position = np.searchsorted(customer_ids, tx_customer)
+    found = position < len(customer_ids)
+    found[found] = customer_ids[position[found]] == tx_customer[found]
+    customer_pos = np.where(found, position, len(customer_ids))
+
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'segment_ids': segment_ids,
+        'member': member,
+        'customer_pos': customer_pos,
+        'gross': gross,
+        'actual_discount': int(discount.sum())
+    }
+
+
+def current_scenario(db, today=None):
+    """Skenario dari aturan promosi tanpa syarat yang aktif hari ini: dict segment_id -> [(type, value)]."""
+    today = today or datetime.now().date()
+    scenario = {}
+    for promo in db.session.query(Promotion).order_by(Promotion.id):
+        if promo.min_spend or promo.category or not is_active(promo, today):
+            continue
+        scenario.setdefault(promo.segment_id, []).append((promo.promotion_type, float(promo.promotion_value)))
+    return scenario
+
+
+def parse_scenario(promotions):
+    """
+    Validasi list promosi [{'segment_id', 'promotion_type', 'promotion_value'}, ...] menjadi
+    dict segment_id -> [(type, value)]. Aturan nilai sama dengan form promosi.
+    """
+    scenario = {}
+    for promo in promotions:
+        try:
+            segment_id = int(promo['segment_id'])
+            promotion_type = promo['promotion_type']
+            value = float(promo['promotion_value'])
+        except (KeyError, TypeError, ValueError):
+            raise SimulationError('Setiap promosi wajib punya segment_id, promotion_type, dan promotion_value angka.')
+        if promotion_type not in PROMOTION_TYPES:
+            raise SimulationError(f'Jenis promosi tidak dikenal: {promotion_type}')
+        if value < 0:
+            raise SimulationError('Nilai promosi tidak boleh negatif.')
+        if promotion_type == 'percentage_discount' and value > 100:
+            raise SimulationError('Diskon persentase tidak boleh lebih dari 100%.')
+        scenario.setdefault(segment_id, []).append((promotion_type, value))
+    return scenario
+
+
+def simulate(history, scenarios):
+    """
+    Evaluasi semua `scenarios` (list dict segment_id -> [(type, value)]) dalam satu lintasan vektor.
+    Mengembalikan list dict per skenario: discount_total, net_turnover, discounted_transactions.
+    """
+    import numpy as np
+
+    segment_ids = history['segment_ids']
+    member = history['member']
+    gross = history['gross']
+
+    # Persen sebagai basis poin, nilai tetap sebagai rupiah (sama dengan compile_promotions)
+    percent = np.zeros((len(scenarios), len(segment_ids)), dtype=np.int64)
+    fixed = np.zeros((len(scenarios), len(segment_ids)), dtype=np.int64)
+    for i, scenario in enumerate(scenarios):
+        for segment_id, rules in scenario.items():
+            column = np.searchsorted(segment_ids, segment_id)
+            if column >= len(segment_ids) or segment_ids[column] != segment_id:
+                continue  # segmen sudah dihapus
+            for promotion_type, value in rules:
+                # Beberapa aturan di segmen yang sama: cukup nilai terbesar per jenis
+                if promotion_type == 'percentage_discount':
+                    percent[i, column] = max(percent[i, column], to_basis_points(value))
+                else:
+                    fixed[i, column] = max(fixed[i, column], to_rupiah(value))
+
+    # Promo terbaik per pelanggan (skenario × pelanggan): maksimum di antara segmen yang diikuti
+    best_percent = np.where(member[None, :, :], percent[:, None, :], 0).max(axis=2, initial=0)
+    best_fixed = np.where(member[None, :, :], fixed[:, None, :], 0).max(axis=2, initial=0)
+
+    # Sama dengan api_checkout: diskon terbesar (persen vs tetap), tidak melebihi total.
+    # Persen dibulatkan half-up ke rupiah seperti utils.money.percent_of
+    position = history['customer_pos']
+    by_percent = (2 * gross * best_percent[:, position] + BASIS_POINTS) // (2 * BASIS_POINTS)
+    discount = np.minimum(np.maximum(by_percent, best_fixed[:, position]), gross)
+
+    gross_total = int(gross.sum())
+    results = []
+    for i in range(len(scenarios)):
+        discount_total = int(discount[i].sum())
+        results.append({
+            'discount_total': discount_total,
+            'net_turnover': gross_total - discount_total,
+            'discounted_transactions': int(np.count_nonzero(discount[i]))
+        })
+    return results
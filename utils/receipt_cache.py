@@ -0,0 +1,172 @@
+"""
+Cache struk transaksi yang sudah di-render.
+
+Transaksi yang sudah di-commit tidak pernah berubah, jadi struk (HTML untuk halaman detail,
+JSON ringkas untuk printer POS) di-render sekali dan di-cache per (ID, created_at) tanpa TTL:
+di memori proses (maksimal MAX_CACHED_RECEIPTS, yang terlama dibuang lebih dulu) dan,
+jika RECEIPT_CACHE_DIR diisi, di disk agar dipakai bersama semua worker dan bertahan restart.
+Cache diisi `api_checkout` tepat setelah commit, sehingga cetak ulang tidak menyentuh database.
+
+Struk adalah snapshot saat transaksi dibuat (nama produk/pelanggan saat itu). Satu-satunya
+penghapusan transaksi adalah reset data massal (`flask seed-db`, proses CLI terpisah), setelah
+itu ID bisa dipakai ulang. Karena itu kunci cache menyertakan created_at: pemanggil membaca
+created_at transaksi (satu lookup primary key) sebelum mengambil struk, sehingga struk milik
+transaksi lama dengan ID yang sama di worker lain tidak pernah cocok lagi dan hanya menunggu
+dibuang. Proses yang menghapus juga langsung mengosongkan cache-nya dan direktori disk.
+"""
+import json
+import os
+import threading
+from flask import current_app, render_template
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models.transaction import Transaction
+
+# Batas jumlah struk di memori per proses
+MAX_CACHED_RECEIPTS = 5000
+
+_lock = threading.Lock()
+_receipts = {}  # receipt_key -> (html, json bytes), urutan sisip = urutan buang
+
+
+def build_receipt(transaction):
+    """
+    Data struk (dict siap JSON) dari objek Transaction beserta items, produk, pelanggan,
+    dan kasir. Di checkout semua relasi sudah ada di identity map, jadi tanpa query tambahan.
+    """
+    customer = transaction.customer
+    items = [{
+        'name': item.product.name,
+        'price': item.price,
+        'qty': item.quantity,
+        'subtotal': item.price * item.quantity
+    } for item in transaction.items]
+    return {
+        'id': transaction.id,
+        'date': transaction.created_at.strftime('%d/%m/%Y'),
+        'time': transaction.created_at.strftime('%H:%M'),
+        'cashier': transaction.user.username.capitalize() if transaction.user else 'Admin',
+        'customer': {
+            'id': customer.id,
+            'name': customer.name,
+            'phone': customer.phone,
+            'address': customer.address
+        } if customer else None,
+        'payment_method': transaction.payment_method,
+        'notes': transaction.notes,
+        'items': items,
+        'gross': sum(item['subtotal'] for item in items),
+        'discount': transaction.discount_amount or 0,
+        'total': transaction.total_amount
+    }
+
+
+def receipt_key(transaction_id, created_at):
+    """
+    Kunci cache (juga nama file di disk): ID saja tidak unik setelah reset data. Presisi detik:
+    DATETIME MySQL tidak menyimpan pecahan detik, jadi nilai di session saat checkout dan nilai
+    yang dibaca ulang saat cetak ulang harus menghasilkan kunci yang sama.
+    """
+    return f'{transaction_id}_{created_at:%Y%m%d%H%M%S}'
+
+
+def store_receipt(receipt, created_at):
+    """
+    Render struk (HTML + JSON ringkas), simpan ke cache, kembalikan (html, json bytes).
+    `created_at`: Transaction.created_at persis seperti tersimpan (bagian kunci cache).
+    """
+    entry = (
+        render_template('sales/_receipt.html', receipt=receipt),
+        json.dumps(receipt, separators=(',', ':')).encode()
+    )
+    key = receipt_key(receipt['id'], created_at)
+    _remember(key, entry)
+    _write_disk(key, entry)
+    return entry
+
+
+def get_receipt(transaction_id, created_at):
+    """(html, json bytes) dari memori atau disk, atau None jika belum di-cache."""
+    key = receipt_key(transaction_id, created_at)
+    with _lock:
+        entry = _receipts.get(key)
+    if entry is None:
+        entry = _read_disk(key)
+        if entry is not None:
+            _remember(key, entry)
+    return entry
+
+
+def clear_receipts():
+    """Kosongkan cache memori proses ini dan file struk di disk."""
+    with _lock:
+        _receipts.clear()
+    root = _store_dir()
+    if not root or not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        if name.endswith(('.html', '.json')):
+            try:
+                os.remove(os.path.join(root, name))
+            except OSError:
+                pass
+
+
+def _remember(key, entry):
+    with _lock:
+        _receipts[key] = entry
+        while len(_receipts) > MAX_CACHED_RECEIPTS:
+            del _receipts[next(iter(_receipts))]
+
+
+# --- Penyimpanan disk (opsional) ---
+
+def _store_dir():
+    return current_app.config.get('RECEIPT_CACHE_DIR')
+
+
+def _paths(root, key):
+    return os.path.join(root, f'{key}.html'), os.path.join(root, f'{key}.json')
+
+
+def _write_disk(key, entry):
+    root = _store_dir()
+    if not root:
+        return
+    try:
+        os.makedirs(root, exist_ok=True)
+        # Tulis ke file sementara lalu ganti atomik: pembaca tidak pernah melihat file setengah jadi.
+        # JSON ditulis terakhir dan menjadi penanda struk lengkap.
+        for path, data in zip(_paths(root, key), (entry[0].encode(), entry[1])):
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+    except OSError as e:
+        # Kegagalan tulis tidak membatalkan checkout; struk masih ada di memori
+        current_app.logger.warning('Gagal menulis cache struk %s: %s', key, e)
+
+
+def _read_disk(key):
+    root = _store_dir()
+    if not root:
+        return None
+    html_path, json_path = _paths(root, key)
+    try:
+        with open(json_path, 'rb') as f:
+            receipt_json = f.read()
+        with open(html_path, 'rb') as f:
+            html = f.read().decode()
+    except OSError:
+        return None
+    return html, receipt_json
+
+
+# --- Reset data: ID transaksi bisa dipakai ulang ---
+
+@event.listens_for(Session, 'do_orm_execute')
+def _bulk_transaction_delete(orm_execute_state):
+    if orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is Transaction:
+            clear_receipts()
@@ -0,0 +1,135 @@
+import calendar
+from datetime import datetime
+import numpy as np
+from models.transaction import Transaction
+
+# Label untuk pelanggan yang belum bertransaksi pada titik waktu tertentu
+NOT_YET_LABEL = 'Belum Bertransaksi'
+
+
+def month_ends(start, end):
+    """Daftar akhir bulan (23:59:59) dari bulan `start` s/d bulan `end`, inklusif."""
+    result = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        last_day = calendar.monthrange(year, month)[1]
+        result.append(datetime(year, month, last_day, 23, 59, 59))
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return result
+
+
+def iter_rfm_snapshots(cutoffs):
+    """
+    Hitung RFM semua pelanggan di setiap titik `cutoffs` (urut naik) dalam satu kali lintasan.
+
+    Transaksi diambil sekali, diurutkan menurut waktu, lalu setiap potongan di antara dua
+    cutoff ditambahkan ke akumulator per pelanggan (frequency & monetary kumulatif,
+    transaksi terakhir). Setiap transaksi hanya diproses satu kali, bukan sekali per bulan.
+
+    Yield (cutoff, dict array numpy: customer_id, recency, frequency, monetary) untuk
+    pelanggan yang sudah pernah bertransaksi s/d cutoff tersebut.
+    """
+    from app import db  # Import here to avoid circular dependency
+    rows = db.session.query(
+        Transaction.customer_id,
+        Transaction.created_at,
+        Transaction.total_amount
+    ).filter(Transaction.created_at <= cutoffs[-1])\
+     .order_by(Transaction.created_at)\
+     .all()
+
+    if not rows:
+        return
+
+    customer_ids, created_at, amounts = zip(*rows)
+    unique_ids, dense_ids = np.unique(np.array(customer_ids, dtype=np.int64), return_inverse=True)
+    times = np.array(created_at, dtype='datetime64[s]')
+    amounts = np.array([float(a or 0) for a in amounts])
+
+    frequency = np.zeros(len(unique_ids), dtype=np.int64)
+    monetary = np.zeros(len(unique_ids))
+    last_purchase = np.full(len(unique_ids), np.datetime64('NaT'), dtype='datetime64[s]')
+
+    start = 0
+    for cutoff in cutoffs:
+        cutoff64 = np.datetime64(cutoff, 's')
+        stop = np.searchsorted(times, cutoff64, side='right')
+
+        chunk = dense_ids[start:stop]
+        np.add.at(frequency, chunk, 1)
+        np.add.at(monetary, chunk, amounts[start:stop])
+        # Transaksi sudah urut waktu: ambil kemunculan terakhir tiap pelanggan di potongan ini.
+        # Assignment dengan index ganda tidak menjamin urutan tulis, jadi index dibuat unik dulu.
+        customers, last_in_reversed = np.unique(chunk[::-1], return_index=True)
+        last_purchase[customers] = times[stop - 1 - last_in_reversed]
+        start = stop
+
+        active = frequency > 0
+        yield cutoff, {
+            'customer_id': unique_ids[active],
+            'recency': ((cutoff64 - last_purchase[active]) // np.timedelta64(1, 'D')).astype(np.int64),
+            'frequency': frequency[active].copy(),
+            'monetary': monetary[active].copy()
+        }
+
+
+def _label_snapshot(rfm, engine, n_clusters):
+    """Label segmen per pelanggan untuk satu snapshot: list nama segmen (urut sesuai rfm['customer_id'])."""
+    if engine == 'rfm':
+        from utils.rfm_scoring import RFMScoringService
+        service = RFMScoringService()
+        scored = service.score(rfm)
+        names = np.array([name for name, _, _ in service.rules], dtype=object)
+        return names[scored['label']]
+
+    import pandas as pd
+    from utils.kmeans_service import KMeansService
+
+    if len(rfm['customer_id']) < n_clusters:
+        return np.full(len(rfm['customer_id']), 'Cluster 1', dtype=object)
+
+    rfm_df, _ = KMeansService(n_clusters=n_clusters).perform_segmentation(pd.DataFrame(rfm), compute_score=False)
+    # cluster_sorted 0 = monetary tertinggi, sehingga label sebanding antar bulan
+    return np.array([f'Cluster {int(c) + 1}' for c in rfm_df['cluster_sorted']], dtype=object)
+
+
+def run_backtest(cutoffs, engine='kmeans', n_clusters=3):
+    """
+    Segmentasi ulang di setiap cutoff dan hitung perpindahan pelanggan antar segmen.
+
+    Mengembalikan list periode: {'as_of', 'customers', 'segments': {nama: jumlah}, 'stayed',
+    'transitions': {(dari, ke): jumlah}} dengan transisi dihitung terhadap periode sebelumnya.
+    """
+    periods = []
+    previous = {}
+
+    for cutoff, rfm in iter_rfm_snapshots(cutoffs):
+        labels = _label_snapshot(rfm, engine, n_clusters) if len(rfm['customer_id']) else np.array([], dtype=object)
+        current = dict(zip(rfm['customer_id'].tolist(), labels.tolist()))
+
+        segments = {}
+        for label in labels.tolist():
+            segments[label] = segments.get(label, 0) + 1
+
+        transitions = {}
+        stayed = 0
+        if periods:
+            for customer_id, label in current.items():
+                key = (previous.get(customer_id, NOT_YET_LABEL), label)
+                if key[0] == key[1]:
+                    stayed += 1
+                else:
+                    transitions[key] = transitions.get(key, 0) + 1
+
+        periods.append({
+            'as_of': cutoff,
+            'customers': len(current),
+            'segments': segments,
+            'stayed': stayed,
+            'transitions': transitions
+        })
+        previous = current
+
+    return periods
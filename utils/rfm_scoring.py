@@ -0,0 +1,78 @@
+from datetime import datetime
+import numpy as np
+from models.transaction import Transaction
+from sqlalchemy import func
+
+# Aturan pemetaan skor R/F/M ke segmen, dievaluasi berurutan: aturan pertama yang cocok menang.
+# Skor diberikan sebagai pecahan skor/n_bins (0..1] agar ambang tetap bermakna untuk --bins berapa pun;
+# dengan 5 bin: VIP = skor >= 4, Frequent Buyer = skor >= 3, At Risk = recency <= 2.
+# Nama & warna mengikuti segmen K-Means agar promosi per segmen tetap berlaku.
+RFM_SEGMENT_RULES = [
+    ('VIP', '#28a745', lambda r, f, m: (r >= 0.8) & (f >= 0.8) & (m >= 0.8)),
+    ('Frequent Buyer', '#007bff', lambda r, f, m: (r >= 0.6) & (f >= 0.6)),
+    ('At Risk', '#6c757d', lambda r, f, m: (r <= 0.4) & ((f >= 0.6) | (m >= 0.6))),
+    ('Occasional Shopper', '#ffc107', lambda r, f, m: np.ones(r.shape, dtype=bool)),
+]
+
+class RFMScoringService:
+    """
+    Segmentasi RFM berbasis kuantil, alternatif ringan dari KMeansService.
+    Tiap dimensi diberi skor 1..n_bins dari batas kuantil (setara NTILE, nilai sama
+    selalu mendapat skor sama), lalu dipetakan ke segmen lewat RFM_SEGMENT_RULES.
+    Kompleksitas O(n log n) tanpa iterasi model, cukup ringan untuk dijalankan tiap jam.
+    """
+
+    def __init__(self, n_bins=5, rules=RFM_SEGMENT_RULES):
+        self.n_bins = n_bins
+        self.rules = rules
+
+    def get_rfm_arrays(self, now=None):
+        """Agregasi RFM per pelanggan dalam satu query GROUP BY, dikembalikan sebagai array numpy."""
+        from app import db  # Import here to avoid circular dependency
+        now = now or datetime.now()
+        results = db.session.query(
+            Transaction.customer_id,
+            func.count(Transaction.id),
+            func.sum(Transaction.total_amount),
+            func.max(Transaction.created_at)
+        ).group_by(Transaction.customer_id).all()
+
+        if not results:
+            return None
+
+        customer_id, frequency, monetary, last_purchase = zip(*results)
+        last_purchase = np.array(last_purchase, dtype='datetime64[s]')
+        recency = (np.datetime64(now, 's') - last_purchase) // np.timedelta64(1, 'D')
+
+        return {
+            'customer_id': np.array(customer_id, dtype=np.int64),
+            'recency': recency.astype(np.int64),
+            'frequency': np.array(frequency, dtype=np.int64),
+            'monetary': np.array([float(m or 0) for m in monetary])
+        }
+
+    def quantile_scores(self, values, higher_is_better=True):
+        """Skor 1..n_bins berdasarkan batas kuantil; nilai terbaik mendapat skor n_bins."""
+        edges = np.quantile(values, np.linspace(0, 1, self.n_bins + 1)[1:-1])
+        scores = np.searchsorted(edges, values, side='right') + 1
+        return scores if higher_is_better else self.n_bins + 1 - scores
+
+    def score(self, rfm):
+        """Tambahkan skor r/f/m dan index aturan segmen (`label`) ke dict array RFM."""
+        r = self.quantile_scores(rfm['recency'], higher_is_better=False)
+        f = self.quantile_scores(rfm['frequency'])
+        m = self.quantile_scores(rfm['monetary'])
+
+        conditions = [rule(r / self.n_bins, f / self.n_bins, m / self.n_bins) for _, _, rule in self.rules]
+        label = np.select(conditions, np.arange(len(self.rules)), default=len(self.rules) - 1)
+
+        return dict(rfm, r_score=r, f_score=f, m_score=m, label=label)
+
+    def analyze(self, now=None):
+        """
+        Pipeline utama: Get Data -> Skor -> Return dict array (None jika tidak ada transaksi)
+        """
+        rfm = self.get_rfm_arrays(now)
+        if rfm is None:
+            return None
+        return self.score(rfm)
@@ -1,9 +1,8 @@
 import random
-from datetime import datetime, timedelta
-from faker import Faker
+import time
+from datetime import datetime, date, timedelta
 import json
-from sqlalchemy.orm import joinedload
-from decimal import Decimal
+from sqlalchemy import func
 
 # Helper function untuk mendapatkan tanggal acak dalam rentang
 def get_random_date(start_date, end_date):
@@ -23,6 +22,7 @@ def run_seeding(db):
     from models.transaction import Transaction, TransactionItem
     from models.analytics import CustomerSegment, CustomerSegmentMembership, Promotion
     from utils.kmeans_service import KMeansService
+    from faker import Faker  # Lazy import: hanya dibutuhkan saat seeding
 
     fake = Faker('id_ID')
     print("🌱 Memulai proses seeding database...")
@@ -35,20 +35,7 @@ def run_seeding(db):
 
 
     # Hapus data lama (Urutan penting karena Foreign Key!)
-    print("🗑️  Menghapus data lama...")
-    try:
-        db.session.query(TransactionItem).delete()
-        db.session.query(Transaction).delete()
-        db.session.query(CustomerSegmentMembership).delete()
-        db.session.query(Promotion).delete()
-        db.session.query(CustomerSegment).delete()
-        db.session.query(Customer).delete() # Customer dihapus setelah transaksi
-        db.session.query(Product).delete()
-        db.session.query(User).delete()
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        print(f"⚠️  Gagal menghapus data lama (mungkin tabel belum ada): {e}")
+    _clear_existing_data(db)
 
     # A. Buat Users
     print("👤 Membuat data user...")
@@ -174,12 +161,6 @@ def run_seeding(db):
     db.session.commit() # <--- PENTING: Commit pelanggan sebelum dipakai di transaksi
     print("✅ Pelanggan dan Produk tersimpan. Mulai generate transaksi...")
 
-    # Eager load CustomerSegment dan Promotion
-    all_segments = CustomerSegment.query.options(joinedload(CustomerSegment.promotion)).all()
-    segment_promo_map = {}
-    for seg in all_segments:
-        segment_promo_map[seg.id] = seg.promotion
-
     # --- 1. Generate Transaksi Utama per Customer ---
     transaction_count = 0
     
@@ -210,14 +191,12 @@ def run_seeding(db):
             num_items = random.randint(1, num_items_to_sample)
             items = random.sample(products, num_items)
             
-            current_total = Decimal('0')
+            current_total = 0
             transaction_items_list = []
             
             for item in items:
                 qty = random.randint(1, 3)
-                price = Decimal(str(item.price))
-                subtotal = price * qty
-                current_total += subtotal
+                current_total += item.price * qty
                 
                 transaction_item = TransactionItem(
                     product_id=item.id, quantity=qty, price=item.price
@@ -225,7 +204,7 @@ def run_seeding(db):
                 transaction_items_list.append(transaction_item)
             
             # --- Perhitungan Diskon Kondisional (Jan-Apr: NO, Mei+: YES) ---
-            discount_amount = Decimal('0')
+            discount_amount = 0
             # Logic diskon di-skip untuk seeding awal karena K-Means belum lari
             # Atau bisa diimplementasikan random diskon di sini jika diinginkan
             
@@ -279,8 +258,7 @@ def run_seeding(db):
                 # Item simple
                 item = random.choice(products)
                 qty = 1
-                price = Decimal(str(item.price))
-                total = price * qty
+                total = item.price * qty
                 
                 t_item = TransactionItem(product_id=item.id, quantity=qty, price=item.price)
                 
@@ -296,10 +274,186 @@ def run_seeding(db):
         db.session.commit()
     print("✅ Gap filling selesai.")
     
+    # E & F. Jalankan K-Means Otomatis lalu buat promosi
+    seed_segments_and_promotions(db)
+
+    # G. Index produk yang sering dibeli bersama & belanjaan biasa pelanggan (saran di POS)
+    seed_pos_suggestions(db)
+
+
+def run_bulk_seeding(db, n_customers, n_transactions, seed=42):
+    """
+    Seeder cepat untuk dataset load-test (jutaan transaksi).
+    Data dibangkitkan dengan sampling numpy tervektorisasi lalu ditulis via Core
+    executemany / COPY (PostgreSQL) tanpa objek ORM. Hasil reproducible untuk seed
+    dan tanggal jalan yang sama (rentang waktu selalu 1 Jan 2025 s/d hari ini).
+    """
+    import numpy as np
+    from faker import Faker  # Lazy import: hanya dibutuhkan saat seeding
+    from models.user import User
+    from models.customer import Customer
+    from models.product import Product
+    from models.transaction import Transaction, TransactionItem
+    from utils.bulk_writer import bulk_insert, sync_sequence
+
+    rng = np.random.default_rng(seed)
+    Faker.seed(seed)
+    fake = Faker('id_ID')
+    print(f"🌱 Bulk seeding: {n_customers:,} pelanggan, {n_transactions:,} transaksi (seed={seed})...")
+    started = time.perf_counter()
+
+    _clear_existing_data(db)
+
+    # A. Users (sedikit, cukup via ORM)
+    admin_user = User(username='admin', email='admin@pos.com', role='admin')
+    kasir_user = User(username='kasir', email='kasir@pos.com', role='cashier')
+    admin_user.set_password('password')
+    kasir_user.set_password('password')
+    db.session.add_all([admin_user, kasir_user])
+    db.session.commit()
+    user_ids = np.array([admin_user.id, kasir_user.id])
+
+    # B. Produk dari file JSON
+    try:
+        with open('seed_data/products.json', 'r', encoding='utf-8') as f:
+            products_data = json.load(f)
+    except FileNotFoundError:
+        print("❌ Gagal: File 'seed_data/products.json' tidak ditemukan.")
+        return
+
+    db.session.add_all([
+        Product(sku=f'PRD-{i+1:03}', name=p['name'], price=p['price'], stock=p['stock'],
+                category=p['category'], unit=p['unit'])
+        for i, p in enumerate(products_data)
+    ])
+    db.session.commit()
+    product_rows = db.session.query(Product.id, Product.price).order_by(Product.id).all()
+    product_ids = np.array([r.id for r in product_rows])
+    product_prices = np.array([int(r.price) for r in product_rows], dtype=np.int64)
+
+    # C. Pelanggan: nama dari pool Faker kecil, dikombinasikan acak oleh numpy
+    t0 = time.perf_counter()
+    first_names = [fake.first_name() for _ in range(500)]
+    last_names = [fake.last_name() for _ in range(500)]
+    first_idx = rng.integers(0, len(first_names), n_customers)
+    last_idx = rng.integers(0, len(last_names), n_customers)
+    phones = rng.integers(10**9, 10**10, n_customers)
+
+    bulk_insert(db, Customer, {
+        'name': [f'{first_names[i]} {last_names[j]}' for i, j in zip(first_idx.tolist(), last_idx.tolist())],
+        'phone': [f'+628{p}' for p in phones.tolist()],
+        'address': ['Limusnunggal, Sukabumi'] * n_customers,
+        'created_at': [datetime(2025, 1, 1)] * n_customers
+    })
+    db.session.commit()
+    _report_rate('customers', n_customers, t0)
+
+    customer_ids = np.array([cid for cid, in db.session.query(Customer.id).order_by(Customer.id)])
+
+    # D. Transaksi: aktivitas pelanggan mengikuti distribusi Pareto
+    # (sedikit pelanggan sangat aktif/VIP, mayoritas jarang belanja)
+    t0 = time.perf_counter()
+    activity = rng.pareto(1.5, n_customers) + 1
+    tx_customer = customer_ids[rng.choice(n_customers, size=n_transactions, p=activity / activity.sum())]
+    tx_user = user_ids[rng.integers(0, len(user_ids), n_transactions)]
+
+    start_date = np.datetime64('2025-01-01T00:00:00')
+    span_seconds = int((np.datetime64(date.today()) - start_date) / np.timedelta64(1, 's'))
+    tx_created = np.sort(start_date + rng.integers(0, span_seconds, n_transactions).astype('timedelta64[s]'))
+
+    first_tx_id = (db.session.query(func.max(Transaction.id)).scalar() or 0) + 1
+    tx_ids = np.arange(first_tx_id, first_tx_id + n_transactions)
+
+    item_count = 0
+    chunk_size = 100000
+    for start in range(0, n_transactions, chunk_size):
+        end = min(start + chunk_size, n_transactions)
+        n_chunk = end - start
+
+        # Item per transaksi: 1-5 produk, qty 1-3
+        n_items = rng.integers(1, 6, n_chunk)
+        item_product_idx = rng.integers(0, len(product_ids), int(n_items.sum()))
+        item_qty = rng.integers(1, 4, len(item_product_idx))
+        item_price = product_prices[item_product_idx]
+        offsets = np.concatenate(([0], np.cumsum(n_items)[:-1]))
+        tx_total = np.add.reduceat(item_price * item_qty, offsets)
+
+        bulk_insert(db, Transaction, {
+            'id': tx_ids[start:end],
+            'customer_id': tx_customer[start:end],
+            'user_id': tx_user[start:end],
+            'total_amount': tx_total,
+            'discount_amount': np.zeros(n_chunk, dtype=np.int64),
+            'payment_method': ['cash'] * n_chunk,
+            'created_at': tx_created[start:end]
+        })
+        bulk_insert(db, TransactionItem, {
+            'transaction_id': np.repeat(tx_ids[start:end], n_items),
+            'transaction_created_at': np.repeat(tx_created[start:end], n_items),
+            'product_id': product_ids[item_product_idx],
+            'quantity': item_qty,
+            'price': item_price
+        })
+        db.session.commit()
+        item_count += len(item_product_idx)
+        print(f"   ...{end:,}/{n_transactions:,} transaksi tersimpan")
+
+    sync_sequence(db, Transaction)
+    db.session.commit()
+    _report_rate('transactions + transaction_items', n_transactions + item_count, t0)
+
+    # E & F. Segmentasi + promosi agar POS langsung bisa dipakai untuk load test
+    seed_segments_and_promotions(db)
+    seed_pos_suggestions(db)
+
+    _report_rate('total', n_customers + n_transactions + item_count, started)
+
+
+def _report_rate(label, rows, started):
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else rows
+    print(f"⚡ {label}: {rows:,} baris dalam {elapsed:.1f} detik ({rate:,.0f} baris/detik)")
+
+
+def _clear_existing_data(db):
+    """Hapus semua data lama. Urutan penting karena Foreign Key!"""
+    from models.user import User
+    from models.customer import Customer
+    from models.product import Product, ProductAssociation, ProductAssociationBuild
+    from models.transaction import Transaction, TransactionItem
+    from models.analytics import (
+        CustomerSegment, CustomerSegmentMembership, Promotion, SegmentationRun, SegmentStatistic
+    )
+
+    print("🗑️  Menghapus data lama...")
+    try:
+        db.session.query(ProductAssociation).delete()
+        db.session.query(ProductAssociationBuild).delete()
+        db.session.query(TransactionItem).delete()
+        db.session.query(Transaction).delete()
+        db.session.query(CustomerSegmentMembership).delete()
+        db.session.query(SegmentStatistic).delete()
+        db.session.query(SegmentationRun).delete()
+        db.session.query(Promotion).delete()
+        db.session.query(CustomerSegment).delete()
+        db.session.query(Customer).delete() # Customer dihapus setelah transaksi
+        db.session.query(Product).delete()
+        db.session.query(User).delete()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️  Gagal menghapus data lama (mungkin tabel belum ada): {e}")
+
+
+def seed_segments_and_promotions(db):
+    """Jalankan K-Means pada data yang sudah ada, simpan segmen + member, lalu buat promosi default."""
+    from models.analytics import CustomerSegment, Promotion
+    from utils.kmeans_service import KMeansService
+    from utils.segmentation import persist_segmentation
+    from utils.feature_store import export_run_features
+
     # E. Jalankan K-Means Otomatis
     print("🔍 Menjalankan analisis K-Means & Sorting Segmen...")
-    
-    from utils.kmeans_service import KMeansService
     kmeans_service = KMeansService(n_clusters=3)
     rfm_df, score = kmeans_service.analyze() # Tangkap score
     
@@ -312,6 +466,9 @@ def run_seeding(db):
         segment_names = ['VIP', 'Frequent Buyer', 'Occasional Shopper']
         segment_colors = ['#28a745', '#007bff', '#ffc107'] # Green, Blue, Yellow
         
+        centroids = {}
+        segment_by_label = {}
+
         # Simpan Segmen ke DB
         for i in range(3):
             # Statistik untuk deskripsi
@@ -329,33 +486,17 @@ def run_seeding(db):
             db.session.add(seg)
             db.session.flush() # Agar dapat ID
             segment_objects.append(seg)
-            
-            # Masukkan Member
-            memberships = []
-            for _, row in cluster_data.iterrows():
-                memberships.append({
-                    'customer_id': row['customer_id'],
-                    'segment_id': seg.id
-                })
-            if memberships:
-                db.session.bulk_insert_mappings(CustomerSegmentMembership, memberships)
-        
-        # Handle Pelanggan Baru (Belum ada transaksi)
-        analyzed_ids = rfm_df['customer_id'].tolist()
-        new_customers = db.session.query(Customer).filter(Customer.id.notin_(analyzed_ids)).all()
+            if i in kmeans_service.centroids:
+                centroids[seg.id] = kmeans_service.centroids[i]
+            segment_by_label[i] = seg.id
         
-        if new_customers:
-            new_seg = CustomerSegment(
-                segment_name="New Customer", 
-                description="Customers who have not yet made any transactions", 
-                color="#17a2b8" # Cyan
-            )
-            db.session.add(new_seg)
-            db.session.flush()
-            segment_objects.append(new_seg)
-            
-            new_memberships = [{'customer_id': c.id, 'segment_id': new_seg.id} for c in new_customers]
-            db.session.bulk_insert_mappings(CustomerSegmentMembership, new_memberships)
+        # Masukkan Member (vektor), Pelanggan Baru (belum ada transaksi) + snapshot statistik
+        run, written = persist_segmentation(
+            db, rfm_df['customer_id'].values, rfm_df['cluster_sorted'].values, segment_by_label,
+            'kmeans', n_clusters=3, score=score, centroids=centroids
+        )
+        print(f"👥 {written['inserted']:,} membership segmen ditulis.")
+        segment_objects = CustomerSegment.query.order_by(CustomerSegment.id).all()
 
         # F. Buat Promosi Berdasarkan Segmen yang Sudah Terbentuk
         print("🎁 Membuat data promosi otomatis...")
@@ -378,6 +519,20 @@ def run_seeding(db):
                 ))
         
         db.session.commit()
+        export_run_features(db, run)
         print("✅ Seeding Selesai! Login: admin / password")
     else:
-        print("⚠️  Tidak ada data RFM yang dihasilkan, promosi tidak dibuat.")
\ No newline at end of file
+        print("⚠️  Tidak ada data RFM yang dihasilkan, promosi tidak dibuat.")
+
+
+def seed_pos_suggestions(db):
+    """Bangun index co-occurrence produk dan belanjaan biasa pelanggan dari transaksi hasil seeding."""
+    from utils.product_associations import refresh_associations
+    from utils.usual_basket import refresh_usual_baskets
+
+    print("🛒 Menghitung saran produk untuk POS...")
+    build = refresh_associations(db, full=True)
+    result = refresh_usual_baskets(db)
+    db.session.commit()
+    print(f"✅ Index dibangun untuk {build.product_count:,} produk dari {build.transaction_count:,} transaksi, "
+          f"belanjaan biasa untuk {result['customers']:,} pelanggan.")
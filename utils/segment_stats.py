@@ -0,0 +1,180 @@
+import math
+from datetime import datetime
+from sqlalchemy import func, cast, extract, literal, text, Integer, DateTime
+from models.customer import Customer
+from models.transaction import Transaction
+from utils.money import money_sum
+from models.analytics import (
+    CustomerSegment, CustomerSegmentMembership, SegmentationRun, SegmentStatistic
+)
+
+RFM_METRICS = ('recency', 'frequency', 'monetary')
+
+
+def days_since(db, column, now):
+    """Ekspresi SQL jumlah hari penuh sejak `column` s/d `now` (setara pandas `.dt.days`)."""
+    now_param = literal(now, DateTime)
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        days = func.floor(extract('epoch', now_param - column) / 86400)
+    elif dialect == 'mysql':
+        days = func.timestampdiff(text('DAY'), column, now_param)
+    else:
+        days = func.julianday(now_param) - func.julianday(column)
+    return cast(days, Integer)
+
+
+def segment_rfm_query(db, now):
+    """
+    Query dasar RFM per anggota segmen: transaksi diagregasi dulu per customer
+    (subquery), baru di-join ke membership, sehingga tidak ada join membership x semua transaksi.
+    """
+    tx_agg = db.session.query(
+        Transaction.customer_id.label('customer_id'),
+        func.count(Transaction.id).label('frequency'),
+        func.sum(Transaction.total_amount).label('monetary'),
+        func.max(Transaction.created_at).label('last_purchase')
+    ).group_by(Transaction.customer_id).subquery()
+
+    return db.session.query(
+        CustomerSegment.id.label('segment_id'),
+        CustomerSegment.segment_name.label('segment_name'),
+        CustomerSegment.color.label('color'),
+        Customer.id.label('customer_id'),
+        Customer.name.label('customer_name'),
+        func.coalesce(tx_agg.c.frequency, 0).label('frequency'),
+        func.coalesce(tx_agg.c.monetary, 0).label('monetary'),
+        days_since(db, tx_agg.c.last_purchase, now).label('recency')
+    ).select_from(CustomerSegmentMembership)\
+     .join(CustomerSegment, CustomerSegmentMembership.segment_id == CustomerSegment.id)\
+     .join(Customer, CustomerSegmentMembership.customer_id == Customer.id)\
+     .outerjoin(tx_agg, tx_agg.c.customer_id == Customer.id)
+
+
+def sample_std(n, total, sum_sq):
+    """Standar deviasi sampel (ddof=1, seperti pandas) dari count, sum, dan sum of squares."""
+    if not n or n < 2 or total is None or sum_sq is None:
+        return 0
+    variance = (float(sum_sq) - float(total) ** 2 / n) / (n - 1)
+    return math.sqrt(variance) if variance > 0 else 0
+
+
+def segment_summary_rows(db, now):
+    """
+    Agregat RFM per segmen dalam satu query GROUP BY.
+    Mengembalikan list dict: segment_id, segment_name, color, count, dan
+    {metric: (mean, min, max, std)} atau None jika segmen tidak punya transaksi.
+    """
+    base = segment_rfm_query(db, now).subquery()
+
+    columns = [base.c.segment_id, base.c.segment_name, base.c.color, func.count(base.c.customer_id)]
+    for metric in RFM_METRICS:
+        col = base.c[metric]
+        columns += [func.count(col), func.sum(col), func.min(col), func.max(col), func.sum(col * col)]
+
+    rows = db.session.query(*columns)\
+        .group_by(base.c.segment_id, base.c.segment_name, base.c.color)\
+        .order_by(base.c.segment_name)\
+        .all()
+
+    summary = []
+    for row in rows:
+        item = {'segment_id': row[0], 'segment_name': row[1], 'color': row[2], 'count': row[3]}
+        for i, metric in enumerate(RFM_METRICS):
+            n, total, min_val, max_val, sum_sq = row[4 + i * 5: 9 + i * 5]
+            if not n:
+                item[metric] = None
+                continue
+            item[metric] = (float(total) / n, float(min_val), float(max_val), sample_std(n, total, sum_sq))
+        summary.append(item)
+    return summary
+
+
+def record_segmentation_run(db, method, n_clusters=None, score=None, centroids=None, now=None,
+                            feature_columns=None):
+    """
+    Simpan snapshot statistik per segmen dari membership yang baru ditulis (sudah di-flush).
+    `centroids` opsional: dict segment_id -> (recency, frequency, monetary).
+    Commit diserahkan ke pemanggil.
+    """
+    now = now or datetime.now()
+    centroids = centroids or {}
+
+    summary = segment_summary_rows(db, now)
+
+    # Total diskon historis per segmen s/d transaksi terakhir saat ini; transaksi sesudahnya
+    # dijumlahkan saat dibaca (segment_discount_total), checkout tidak menulis ke snapshot
+    last_transaction_id = db.session.query(func.coalesce(func.max(Transaction.id), 0)).scalar()
+    discount_rows = db.session.query(
+        CustomerSegmentMembership.segment_id,
+        money_sum(Transaction.discount_amount),
+        func.count(Transaction.id)
+    ).join(Transaction, Transaction.customer_id == CustomerSegmentMembership.customer_id)\
+     .filter(Transaction.discount_amount > 0, Transaction.id <= last_transaction_id)\
+     .group_by(CustomerSegmentMembership.segment_id)\
+     .all()
+    discounts = {segment_id: (total, count) for segment_id, total, count in discount_rows}
+
+    run = SegmentationRun(
+        method=method,
+        n_clusters=n_clusters,
+        silhouette_score=float(score) if score is not None else None,
+        feature_columns=','.join(feature_columns) if feature_columns else None,
+        customer_count=sum(item['count'] for item in summary),
+        last_transaction_id=last_transaction_id
+    )
+    db.session.add(run)
+
+    for item in summary:
+        stat = SegmentStatistic(segment_id=item['segment_id'], customer_count=item['count'])
+        for metric in RFM_METRICS:
+            if item[metric] is not None:
+                mean, min_val, max_val, std = item[metric]
+                setattr(stat, f'{metric}_mean', mean)
+                setattr(stat, f'{metric}_min', min_val)
+                setattr(stat, f'{metric}_max', max_val)
+                setattr(stat, f'{metric}_std', std)
+
+        centroid = centroids.get(item['segment_id'])
+        if centroid is not None:
+            stat.centroid_recency, stat.centroid_frequency, stat.centroid_monetary = (float(v) for v in centroid)
+
+        stat.discount_total, stat.discount_count = discounts.get(item['segment_id'], (0, 0))
+        run.statistics.append(stat)
+
+    db.session.flush()
+    return run
+
+
+def latest_run():
+    return SegmentationRun.query.order_by(SegmentationRun.id.desc()).first()
+
+
+def latest_segment_statistics(db):
+    """
+    Snapshot run terakhir: dict segment_id -> SegmentStatistic.
+    Mengembalikan None jika belum pernah ada run (pemanggil memakai query langsung).
+    """
+    run_id = db.session.query(func.max(SegmentationRun.id)).scalar()
+    if run_id is None:
+        return None
+    rows = SegmentStatistic.query.filter_by(run_id=run_id).all()
+    return {row.segment_id: row for row in rows}
+
+
+def segment_discount_total(db, stat):
+    """
+    Total diskon segmen: angka snapshot `stat` ditambah diskon transaksi anggota segmen setelah
+    run-nya (id > last_transaction_id). Yang dibaca hanya transaksi sejak run terakhir, sehingga
+    checkout tidak perlu meng-UPDATE baris segment_statistics yang sama (baris panas).
+    """
+    last_transaction_id = stat.run.last_transaction_id
+    if last_transaction_id is None:
+        return stat.discount_total
+    since_run = db.session.query(money_sum(Transaction.discount_amount))\
+        .join(CustomerSegmentMembership, CustomerSegmentMembership.customer_id == Transaction.customer_id)\
+        .filter(CustomerSegmentMembership.segment_id == stat.segment_id,
+                Transaction.id > last_transaction_id,
+                Transaction.discount_amount > 0)\
+        .scalar()
+    return stat.discount_total + since_run
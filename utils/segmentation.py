@@ -0,0 +1,144 @@
+from datetime import datetime
+from models.customer import Customer
+from models.analytics import CustomerSegment, CustomerSegmentMembership
+from utils.bulk_writer import bulk_insert, DEFAULT_CHUNK_SIZE
+from utils.segment_stats import record_segmentation_run
+
+NEW_CUSTOMER_SEGMENT = 'New Customer'
+
+# Ukuran chunk DELETE ... WHERE id IN (...): di bawah batas variabel SQLite versi lama (999)
+DELETE_CHUNK_SIZE = 900
+
+
+def get_or_create_segment(db, name, color, description=None):
+    """Cari segmen berdasarkan nama; buat baru jika belum ada. Deskripsi selalu diperbarui jika diberikan."""
+    segment = CustomerSegment.query.filter_by(segment_name=name).first()
+    if not segment:
+        segment = CustomerSegment(segment_name=name, description=description, color=color)
+        db.session.add(segment)
+        db.session.flush()
+    elif description is not None:
+        segment.description = description
+    return segment
+
+
+def write_memberships(db, customer_ids, segment_ids, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Samakan tabel membership dengan hasil segmentasi: pelanggan `customer_ids[i]` masuk
+    segmen `segment_ids[i]` (array numpy / list, panjang sama), pelanggan lain dikeluarkan.
+
+    Hanya baris yang berubah yang ditulis: pasangan (customer, segment) yang sudah ada tidak
+    disentuh, pasangan lama dihapus per chunk ID, pasangan baru ditulis via bulk_insert
+    (COPY di PostgreSQL, executemany per chunk di database lain).
+    Mengembalikan dict jumlah baris: inserted, deleted, unchanged. Commit diserahkan ke pemanggil.
+    """
+    import numpy as np  # Lazy import: numpy hanya untuk analitik
+
+    customer_ids = np.asarray(customer_ids, dtype=np.int64)
+    segment_ids = np.asarray(segment_ids, dtype=np.int64)
+
+    existing = db.session.query(
+        CustomerSegmentMembership.id,
+        CustomerSegmentMembership.customer_id,
+        CustomerSegmentMembership.segment_id
+    ).all()
+    if existing:
+        existing_id, existing_customer, existing_segment = (np.array(col, dtype=np.int64) for col in zip(*existing))
+    else:
+        existing_id = existing_customer = existing_segment = np.array([], dtype=np.int64)
+
+    # Pasangan (customer, segment) dikodekan jadi satu int64 agar bisa dibandingkan dengan np.isin
+    desired_keys = (customer_ids << 32) | segment_ids
+    existing_keys = (existing_customer << 32) | existing_segment
+
+    stale_ids = existing_id[~np.isin(existing_keys, desired_keys)]
+    new_rows = ~np.isin(desired_keys, existing_keys)
+
+    for start in range(0, len(stale_ids), DELETE_CHUNK_SIZE):
+        chunk = stale_ids[start:start + DELETE_CHUNK_SIZE].tolist()
+        db.session.query(CustomerSegmentMembership)\
+            .filter(CustomerSegmentMembership.id.in_(chunk))\
+            .delete(synchronize_session=False)
+
+    inserted = bulk_insert(db, CustomerSegmentMembership, {
+        'customer_id': customer_ids[new_rows],
+        'segment_id': segment_ids[new_rows],
+        # COPY tidak menjalankan default Python, jadi assigned_at diisi eksplisit
+        'assigned_at': [datetime.utcnow()] * int(new_rows.sum())
+    }, chunk_size=chunk_size)
+
+    return {
+        'inserted': inserted,
+        'deleted': int(len(stale_ids)),
+        'unchanged': int(len(existing_id) - len(stale_ids))
+    }
+
+
+def persist_segmentation(db, customer_ids, labels, segment_by_label, method,
+                         n_clusters=None, score=None, centroids=None, feature_columns=None):
+    """
+    Jalur penyimpanan bersama untuk semua engine segmentasi (K-Means, skor RFM):
+    pelanggan `customer_ids[i]` masuk segmen `segment_by_label[labels[i]]`, pelanggan
+    tanpa transaksi masuk segmen 'New Customer', lalu snapshot statistik run disimpan.
+
+    Commit diserahkan ke pemanggil. Mengembalikan (SegmentationRun, jumlah baris dari write_memberships).
+    """
+    import numpy as np  # Lazy import: numpy hanya untuk analitik
+
+    customer_ids = np.asarray(customer_ids, dtype=np.int64)
+    labels = np.asarray(labels, dtype=np.int64)
+
+    lookup = np.full(int(labels.max()) + 1 if len(labels) else 1, -1, dtype=np.int64)
+    for label, segment_id in segment_by_label.items():
+        if label < len(lookup):
+            lookup[label] = segment_id
+    segment_ids = lookup[labels]
+
+    # Pelanggan yang belum pernah bertransaksi tidak ikut dianalisis.
+    # Selisih dihitung di numpy: NOT IN / NOT EXISTS besar lambat tanpa index customer_id.
+    all_customer_ids = np.array([c.id for c in db.session.query(Customer.id).all()], dtype=np.int64)
+    new_customer_ids = np.setdiff1d(all_customer_ids, customer_ids)
+
+    if len(new_customer_ids):
+        zero_segment = get_or_create_segment(db, NEW_CUSTOMER_SEGMENT, '#17a2b8')
+        if not zero_segment.description:
+            zero_segment.description = "Pelanggan yang belum pernah melakukan transaksi"
+
+        customer_ids = np.concatenate([customer_ids, new_customer_ids])
+        segment_ids = np.concatenate([segment_ids, np.full(len(new_customer_ids), zero_segment.id, dtype=np.int64)])
+
+    written = write_memberships(db, customer_ids, segment_ids)
+
+    db.session.flush()
+    run = record_segmentation_run(db, method, n_clusters=n_clusters, score=score, centroids=centroids,
+                                  feature_columns=feature_columns)
+    return run, written
+
+
+def run_rfm_segmentation(db, n_bins=5):
+    """
+    Segmentasi dengan skor kuantil RFM lalu simpan lewat jalur yang sama dengan K-Means.
+    Mengembalikan (SegmentationRun, jumlah baris), atau None jika belum ada transaksi.
+    Commit diserahkan ke pemanggil.
+    """
+    from utils.rfm_scoring import RFMScoringService  # Lazy import: numpy hanya untuk analitik
+
+    service = RFMScoringService(n_bins=n_bins)
+    result = service.analyze()
+    if result is None:
+        return None
+
+    segment_by_label = {}
+    for index, (name, color, _) in enumerate(service.rules):
+        mask = result['label'] == index
+        if not mask.any():
+            continue
+
+        description = f'Skor RFM: rata-rata belanja Rp {result["monetary"][mask].mean():,.0f}, ' \
+                      f'frekuensi {result["frequency"][mask].mean():.1f}x, ' \
+                      f'terakhir transaksi {result["recency"][mask].mean():.0f} hari lalu.'
+        segment_by_label[index] = get_or_create_segment(db, name, color, description=description).id
+
+    return persist_segmentation(db, result['customer_id'], result['label'], segment_by_label,
+                                'rfm_quantile', n_clusters=len(segment_by_label),
+                                feature_columns=['recency', 'frequency', 'monetary'])
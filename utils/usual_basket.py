@@ -0,0 +1,148 @@
+"""
+"Belanjaan biasa" per pelanggan untuk isi keranjang sekali klik di POS.
+
+Job ini mengelompokkan transaction_items per pasangan (pelanggan, produk) secara vektor
+(numpy, kunci pasangan int64), mengambil N produk yang paling sering dibeli setiap pelanggan
+beserta jumlah yang biasa dibeli (median per transaksi), lalu menyimpannya ringkas di kolom
+`customers.usual_basket` sebagai "product_id:qty,product_id:qty,...".
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import func, update
+from models.customer import Customer
+from models.product import Product
+from models.transaction import Transaction, TransactionItem
+
+# Jumlah produk per pelanggan (cukup pendek agar muat di kolom String(255))
+BASKET_SIZE = 8
+
+# Produk dianggap "biasa" jika dibeli di minimal sekian transaksi berbeda
+MIN_PURCHASES = 2
+
+# Hanya transaksi dalam rentang ini yang dihitung, agar kebiasaan lama tidak mendominasi
+LOOKBACK_DAYS = 180
+
+UPDATE_CHUNK_SIZE = 5000
+
+
+def encode_basket(items):
+    """[(product_id, qty), ...] -> "product_id:qty,..." (None jika kosong)."""
+    return ','.join(f'{product_id}:{qty}' for product_id, qty in items) or None
+
+
+def decode_basket(value):
+    """Kebalikan encode_basket; string kosong/None -> []."""
+    if not value:
+        return []
+    items = []
+    for part in value.split(','):
+        product_id, _, qty = part.partition(':')
+        items.append((int(product_id), int(qty or 1)))
+    return items
+
+
+def compute_usual_baskets(db, now=None, size=BASKET_SIZE, min_purchases=MIN_PURCHASES,
+                          lookback_days=LOOKBACK_DAYS):
+    """
+    Hitung belanjaan biasa semua pelanggan. Mengembalikan dict customer_id -> string terenkode
+    (hanya pelanggan yang punya minimal satu produk yang memenuhi `min_purchases`).
+    """
+    import numpy as np  # Lazy import: hanya dibutuhkan batch job
+
+    now = now or datetime.now()
+    since = now - timedelta(days=lookback_days)
+    # Satu baris per (transaksi, produk): baris item ganda di transaksi yang sama dijumlahkan dulu.
+    # Join lewat kunci lengkap dan filter tanggal di kedua tabel agar partisi item ikut terpangkas.
+    rows = db.session.query(
+        Transaction.customer_id,
+        TransactionItem.product_id,
+        func.sum(TransactionItem.quantity)
+    ).join(Transaction, (Transaction.id == TransactionItem.transaction_id)
+                        & (Transaction.created_at == TransactionItem.transaction_created_at))\
+     .filter(Transaction.customer_id.isnot(None),
+             Transaction.created_at >= since,
+             TransactionItem.transaction_created_at >= since)\
+     .group_by(TransactionItem.transaction_id, Transaction.customer_id, TransactionItem.product_id)\
+     .all()
+    if not rows:
+        return {}
+
+    customer, product, qty = (np.array(col, dtype=np.int64) for col in zip(*rows))
+
+    # Group-by pasangan (customer, product): urutkan menurut kunci lalu qty,
+    # sehingga setiap grup berurutan dan median bisa diambil dari posisinya
+    keys = (customer << 32) | product
+    order = np.lexsort((qty, keys))
+    keys, qty = keys[order], qty[order]
+    pair_keys, starts, purchases = np.unique(keys, return_index=True, return_counts=True)
+    typical_qty = np.maximum(qty[starts + (purchases - 1) // 2], 1)  # median bawah
+
+    keep = purchases >= min_purchases
+    pair_keys, purchases, typical_qty = pair_keys[keep], purchases[keep], typical_qty[keep]
+    pair_customer = pair_keys >> 32
+    pair_product = pair_keys & 0xFFFFFFFF
+
+    # Peringkat per pelanggan: paling sering dibeli dulu, seri diurutkan menurut ID produk
+    order = np.lexsort((pair_product, -purchases, pair_customer))
+    pair_customer, pair_product, typical_qty = pair_customer[order], pair_product[order], typical_qty[order]
+    rank = np.arange(len(pair_customer)) - np.searchsorted(pair_customer, pair_customer, side='left')
+    top = rank < size
+    pair_customer, pair_product, typical_qty = pair_customer[top], pair_product[top], typical_qty[top]
+    if not len(pair_customer):
+        return {}
+
+    # Potong array yang sudah urut per pelanggan menjadi satu keranjang per pelanggan
+    bounds = np.flatnonzero(np.diff(pair_customer)) + 1
+    return {
+        int(customer_id): encode_basket(zip(products.tolist(), quantities.tolist()))
+        for customer_id, products, quantities in zip(
+            pair_customer[np.r_[0, bounds]], np.split(pair_product, bounds), np.split(typical_qty, bounds)
+        )
+    }
+
+
+def refresh_usual_baskets(db, now=None):
+    """
+    Hitung ulang belanjaan biasa dan tulis hanya baris pelanggan yang berubah.
+    Mengembalikan dict: customers (punya belanjaan biasa), updated. Commit diserahkan ke pemanggil.
+    """
+    baskets = compute_usual_baskets(db, now=now)
+
+    changed = [
+        {'id': customer_id, 'usual_basket': baskets.get(customer_id)}
+        for customer_id, current in db.session.query(Customer.id, Customer.usual_basket)
+        if baskets.get(customer_id) != current
+    ]
+    for start in range(0, len(changed), UPDATE_CHUNK_SIZE):
+        # ORM bulk UPDATE by primary key: satu executemany per chunk
+        db.session.execute(update(Customer), changed[start:start + UPDATE_CHUNK_SIZE])
+
+    return {'customers': len(baskets), 'updated': len(changed)}
+
+
+def basket_products(db, customer):
+    """
+    Produk belanjaan biasa `customer` yang masih ada stoknya, siap dimasukkan ke keranjang POS:
+    list dict id, name, sku, price, stock, qty (qty dibatasi stok). Satu query produk by primary key.
+    """
+    items = decode_basket(customer.usual_basket)
+    if not items:
+        return []
+
+    products = {
+        product.id: product
+        for product in db.session.query(Product).filter(Product.id.in_([product_id for product_id, _ in items]))
+    }
+    basket = []
+    for product_id, qty in items:
+        product = products.get(product_id)
+        if product is None or not product.stock or product.stock <= 0:
+            continue
+        basket.append({
+            'id': product.id,
+            'name': product.name,
+            'sku': product.sku,
+            'price': product.price,
+            'stock': product.stock,
+            'qty': min(qty, product.stock)
+        })
+    return basket